@@ -0,0 +1,52 @@
+# Import time of the todoApp package, and of everything create_app pulls in, measured with python -X importtime
+# in fresh interpreters. Exits with status 1 if importing the package goes over its budget, so it can be run as a
+# regression check.
+# Run from the repo root with: python -m benchmarks.bench_import_time [--budget-ms 30]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 10
+# what `import todoApp` may cost before this reports a regression. It only loads the config, so anything near
+# the cost of importing Flask or SQLAlchemy (hundreds of ms) means a heavy import has crept back in
+IMPORT_BUDGET_MS = 30
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time_ms(statement):
+    # total cumulative time of the todoApp modules the statement imports, summed over the top level entries of
+    # -X importtime output so nothing they pull in is counted twice
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2][1:].startswith("todoApp"):
+            total_us += int(fields[1])
+    return total_us / 1000
+
+
+def median_import_time_ms(statement):
+    return statistics.median(import_time_ms(statement) for _ in range(RUNS))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    budget_ms = parser.parse_args().budget_ms
+
+    package_ms = median_import_time_ms("import todoApp")
+    # create_app imports both blueprints, which between them bring in the models, Flask and SQLAlchemy
+    app_ms = median_import_time_ms("import todoApp.blueprints.todo_routes, todoApp.blueprints.user_routes")
+    print(f"median over {RUNS} fresh interpreters")
+    print(f"import todoApp:             {package_ms:7.1f} ms (budget {budget_ms:.0f} ms)")
+    print(f"imports done by create_app: {app_ms:7.1f} ms")
+    if package_ms > budget_ms:
+        print("import todoApp is over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# Compares response encoding throughput of the stdlib JSON provider and the orjson one on todo listings.
+# Run from the repo root with: python -m benchmarks.bench_json_provider
+import timeit
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from todoApp.extensions.json_provider import OrjsonProvider, orjson
+
+LIST_SIZES = [10, 1000, 10000]
+REPEATS = 20
+
+
+def make_todo_payload(size):
+    # the shape GET /todos returns: serialized todos with child counts, a third of them without a description
+    return [{"id": index, "title": f"Todo number {index}", "user_id": 42, "checked": index % 4 == 0,
+             **({"description": "Pick up the dry cleaning before the shop shuts at six"} if index % 3 else {}),
+             "child_count": index % 7, "checked_child_count": index % 3} for index in range(size)]
+
+
+def main():
+    if orjson is None:
+        print("orjson is not installed, nothing to compare")
+        return
+    app = Flask(__name__)
+    providers = {"stdlib": DefaultJSONProvider(app), "orjson": OrjsonProvider(app)}
+    with app.app_context():
+        for size in LIST_SIZES:
+            payload = make_todo_payload(size)
+            assert providers["stdlib"].response(payload).get_data() == providers["orjson"].response(payload).get_data()
+            timings = {name: min(timeit.repeat(lambda: provider.response(payload), number=1, repeat=REPEATS))
+                       for name, provider in providers.items()}
+            throughput = {name: size / timing for name, timing in timings.items()}
+            print(f"{size} todos: stdlib {timings['stdlib'] * 1000:.3f} ms ({throughput['stdlib']:,.0f} todos/s), "
+                  f"orjson {timings['orjson'] * 1000:.3f} ms ({throughput['orjson']:,.0f} todos/s), "
+                  f"{timings['stdlib'] / timings['orjson']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
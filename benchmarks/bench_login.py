@@ -0,0 +1,71 @@
+# Login throughput under concurrency for each PASSWORD_HASH_EXECUTOR setting, along with how long a cheap
+# authenticated request takes while the login storm is going on.
+# Run from the repo root with: python -m benchmarks.bench_login
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from todoApp import create_app
+from todoApp.blueprints.user_routes import make_token
+from todoApp.config import TestConfig
+from todoApp.extensions.db import db
+from todoApp.models.User import User
+
+ITERATIONS = 200000
+CONCURRENT_CLIENTS = 16
+LOGINS = 64
+CHEAP_REQUESTS = 50
+
+
+def run_storm(executor_type, database_path):
+    class BenchmarkConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database_path}"
+        SQLALCHEMY_ECHO = False
+        PASSWORD_HASH_ITERATIONS = ITERATIONS
+        PASSWORD_HASH_EXECUTOR = executor_type
+        PASSWORD_HASH_WORKERS = 4
+        USER_CACHE_TTL = 0
+        TOKEN_CACHE_SIZE = 0
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        user = User(first_name="Jan", last_name="West", username="janwest", password_plaintext="Password123")
+        db.session.add(user)
+        db.session.commit()
+        token = make_token(user.public_id)
+
+    def login(_):
+        response = app.test_client().post('/login', auth=("janwest", "Password123"))
+        assert response.status_code == 200
+
+    def cheap_request(_):
+        started = time.perf_counter()
+        response = app.test_client().get('/todos', headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_CLIENTS + 1) as clients:
+        started = time.perf_counter()
+        logins = [clients.submit(login, index) for index in range(LOGINS)]
+        cheap_latencies = list(clients.map(cheap_request, range(CHEAP_REQUESTS)))
+        for future in logins:
+            future.result()
+        elapsed = time.perf_counter() - started
+    app.extensions['password_hasher'].shutdown()
+    return LOGINS / elapsed, statistics.median(cheap_latencies)
+
+
+def main():
+    print(f"{LOGINS} logins from {CONCURRENT_CLIENTS} concurrent clients, pbkdf2 with {ITERATIONS} iterations, "
+          f"{os.cpu_count()} CPUs")
+    for executor_type in [None, "thread", "process"]:
+        with tempfile.TemporaryDirectory() as directory:
+            logins_per_second, cheap_latency = run_storm(executor_type, os.path.join(directory, "bench.db"))
+        print(f"executor {str(executor_type):>7}: {logins_per_second:6.1f} logins/s, "
+              f"median GET /todos during the storm {cheap_latency * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# Latency percentiles, throughput and query counts for /signup, /login and every todo route, run against data
+# built by todoApp.utils.data_generator: many users, a wide flat list, a deep chain and a bushy tree.
+# Requests are sent one at a time through the Flask test client, so the numbers are server-side costs
+# without any network in front of them.
+# Run from the repo root with: python -m benchmarks.bench_routes [--output results.json] [--compare old.json]
+import argparse
+import base64
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+
+import sqlalchemy
+from sqlalchemy import event
+
+from todoApp import create_app
+from todoApp.config import TestConfig
+from todoApp.extensions.db import db
+from todoApp.utils.data_generator import commit_generated_data, insert_todo_forest, insert_users
+
+# A scenario is one route hit with a series of requests. make_request(index) returns the path, plus the JSON body
+# and extra headers to send, if any. Routes that change data are given fresh rows or alternating values on each
+# request, so every request does the same amount of work
+Scenario = namedtuple("Scenario", ["name", "method", "make_request", "expected_status"])
+
+DELETE_BATCH_SIZE = 5
+CHECK_BATCH_SIZE = 50
+TODO_BATCH_SIZE = 20
+
+
+def build_data(options):
+    # The benchmark user, user_0, owns every shape; the other users get a small forest each so the tables
+    # aren't just the benchmark user's rows
+    user_ids = insert_users(options.users)
+    for user_id in user_ids[1:]:
+        insert_todo_forest(user_id, roots=20, fan_out=2, depth=3, checked_ratio=0.3)
+    bench_user_id = user_ids[0]
+    requests_per_scenario = options.warmup + options.iterations
+    data = {
+        "wide": insert_todo_forest(bench_user_id, roots=options.wide, title_prefix="Wide")[0],
+        "chain": [level[0] for level in insert_todo_forest(bench_user_id, roots=1, fan_out=1,
+                                                           depth=options.chain_depth, title_prefix="Chain")],
+        "bushy_root": insert_todo_forest(bench_user_id, roots=1, fan_out=options.bushy_fan_out,
+                                         depth=options.bushy_depth, title_prefix="Bushy")[0][0],
+        # small trees that the delete scenarios use up, one or DELETE_BATCH_SIZE per request
+        "delete_pool": insert_todo_forest(bench_user_id, roots=requests_per_scenario * (1 + DELETE_BATCH_SIZE),
+                                          fan_out=2, depth=2, title_prefix="Delete")[0],
+    }
+    commit_generated_data()
+    return data
+
+
+def make_scenarios(data, options, get_etag):
+    wide, chain, delete_pool = data["wide"], data["chain"], data["delete_pool"]
+    single_deletes = delete_pool[:options.warmup + options.iterations]
+    batch_deletes = delete_pool[len(single_deletes):]
+    signup_data = {"first_name": "Bench", "last_name": "User", "password_plaintext": "Password123",
+                   "confirm_password": "Password123"}
+
+    def todo_batch(index):
+        # half top-level todos, half children of them
+        half = TODO_BATCH_SIZE // 2
+        return ([{"temp_id": position, "title": f"Batch {index}.{position}"} for position in range(half)] +
+                [{"temp_id": half + position, "title": "Batch child", "parent_temp_id": position}
+                 for position in range(half)])
+
+    return [
+        Scenario("signup", "post", lambda index: ("/signup", {**signup_data, "username": f"signup_{index}"}, None),
+                 201),
+        Scenario("login", "post", lambda index: ("/login", None, {"Authorization": basic_auth("user_0")}), 200),
+        Scenario("add_todo", "post", lambda index: ("/todos", {"title": f"Added {index}"}, None), 201),
+        Scenario("add_todo_batch", "post", lambda index: ("/todos/batch", todo_batch(index), None), 201),
+        Scenario("get_all_todos", "get", lambda index: ("/todos", None, None), 200),
+        Scenario("get_all_todos_page", "get", lambda index: ("/todos?limit=50", None, None), 200),
+        Scenario("get_all_todos_not_modified", "get",
+                 lambda index: ("/todos", None, {"If-None-Match": get_etag("/todos")}), 304),
+        Scenario("get_todo", "get", lambda index: (f"/todos/{wide[0]}", None, None), 200),
+        Scenario("get_todo_tree_bushy", "get", lambda index: (f"/todos/{data['bushy_root']}/tree", None, None), 200),
+        Scenario("get_todo_tree_chain", "get", lambda index: (f"/todos/{chain[0]}/tree", None, None), 200),
+        Scenario("edit_todo", "patch", lambda index: (f"/todos/{wide[1]}", {"title": f"Edited {index}"}, None), 200),
+        # moves everything below the top of the chain out from under it and back again
+        Scenario("toggle_parent_chain", "patch",
+                 lambda index: (f"/todos/{chain[1]}/toggle_parent",
+                                {"parent_id": wide[2] if index % 2 == 0 else chain[0]}, None), 200),
+        # checking cascades down the whole chain, unchecking only touches the top
+        Scenario("check_todo_chain", "patch",
+                 lambda index: (f"/todos/{chain[0]}/check", {"checked": index % 2 == 0}, None), 200),
+        Scenario("check_todos_bulk", "patch",
+                 lambda index: ("/todos/check", {"ids": wide[:CHECK_BATCH_SIZE], "checked": index % 2 == 0}, None),
+                 200),
+        Scenario("delete_todo", "delete", lambda index: (f"/todos/{single_deletes[index]}", None, None), 200),
+        Scenario("delete_todos_bulk", "delete",
+                 lambda index: ("/todos", {"ids": batch_deletes[index * DELETE_BATCH_SIZE:
+                                                                (index + 1) * DELETE_BATCH_SIZE]}, None), 200),
+    ]
+
+
+def basic_auth(username, password="Password123"):
+    return "Basic " + base64.b64encode(f"{username}:{password}".encode()).decode()
+
+
+def percentile(sorted_values, fraction):
+    # nearest-rank percentile
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_scenario(app, client, token, scenario, options, statements):
+    latencies, query_counts = [], []
+    for index in range(options.warmup + options.iterations):
+        path, body, headers = scenario.make_request(index)
+        headers = {"Authorization": f"Bearer {token}", **(headers or {})}
+        statements.clear()
+        started = time.perf_counter()
+        response = getattr(client, scenario.method)(path, json=body, headers=headers)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        if response.status_code != scenario.expected_status:
+            raise RuntimeError(f"{scenario.name}: expected {scenario.expected_status}, got "
+                               f"{response.status_code} {response.get_data(as_text=True)[:200]}")
+        if index >= options.warmup:
+            latencies.append(elapsed)
+            query_counts.append(len(statements))
+    latencies.sort()
+    return {
+        "method": scenario.method.upper(),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_rps": round(len(latencies) / sum(latencies), 1),
+        "queries_per_request": round(statistics.fmean(query_counts), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    class BenchmarkConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = options.database_uri
+        SQLALCHEMY_ECHO = False
+        # long enough that PyJWT doesn't warn on every token
+        SECRET_KEY = "route benchmark secret key, not for real use"
+        TODO_CLOSURE_TABLE = options.closure_table
+        PASSWORD_HASH_ITERATIONS = options.hash_iterations
+        PASSWORD_HASH_EXECUTOR = None
+
+    app = create_app(BenchmarkConfig)
+    results = {}
+    with app.app_context():
+        data = build_data(options)
+        client = app.test_client()
+        login_response = client.post("/login", headers={"Authorization": basic_auth("user_0")})
+        token = login_response.json["token"]
+
+        def get_etag(path):
+            return client.get(path, headers={"Authorization": f"Bearer {token}"}).headers["ETag"]
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        for scenario in make_scenarios(data, options, get_etag):
+            if options.only and scenario.name not in options.only:
+                continue
+            results[scenario.name] = run_scenario(app, client, token, scenario, options, statements)
+            print(format_result(scenario.name, results[scenario.name]))
+    app.extensions['password_hasher'].shutdown()
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "database": options.database_uri.split(":", 1)[0],
+            "iterations": options.iterations,
+            "data": {"users": options.users, "wide": options.wide, "chain_depth": options.chain_depth,
+                     "bushy_fan_out": options.bushy_fan_out, "bushy_depth": options.bushy_depth,
+                     "closure_table": options.closure_table, "hash_iterations": options.hash_iterations},
+        },
+        "routes": results,
+    }
+
+
+def format_result(name, result):
+    return (f"{name:>28} {result['method']:>6}  p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+            f"p99 {result['p99_ms']:8.2f} ms  {result['throughput_rps']:8.1f} req/s  "
+            f"{result['queries_per_request']:6.2f} queries")
+
+
+def compare(baseline, current):
+    # p50 and query count changes for routes in both runs
+    print(f"\nchanges since {baseline['meta'].get('commit')}")
+    for name, result in current["routes"].items():
+        old = baseline["routes"].get(name)
+        if old is None:
+            continue
+        change = (result["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0.0
+        print(f"{name:>28}  p50 {old['p50_ms']:8.2f} -> {result['p50_ms']:8.2f} ms ({change:+6.1f}%)  "
+              f"queries {old['queries_per_request']:6.2f} -> {result['queries_per_request']:6.2f}")
+
+
+def parse_options():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-uri", help="defaults to a SQLite file in a temporary directory")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--wide", type=int, default=1000, help="top-level todos in the wide flat list")
+    parser.add_argument("--chain-depth", type=int, default=600)
+    parser.add_argument("--bushy-fan-out", type=int, default=4)
+    parser.add_argument("--bushy-depth", type=int, default=6)
+    parser.add_argument("--closure-table", action="store_true", help="turn TODO_CLOSURE_TABLE on")
+    # login and signup are all hashing at the production cost, which drowns out everything else they do
+    parser.add_argument("--hash-iterations", type=int, default=TestConfig.PASSWORD_HASH_ITERATIONS)
+    parser.add_argument("--only", nargs="*", help="scenario names to run")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    return parser.parse_args()
+
+
+def main():
+    options = parse_options()
+    with tempfile.TemporaryDirectory() as directory:
+        if options.database_uri is None:
+            options.database_uri = f"sqlite:///{directory}/bench.db"
+        results = run(options)
+    if options.output:
+        with open(options.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+            output_file.write("\n")
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            compare(json.load(baseline_file), results)
+
+
+if __name__ == "__main__":
+    main()
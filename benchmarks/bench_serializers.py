@@ -0,0 +1,55 @@
+# Compares the reflective serialize_model with the per-model serializers built by make_model_serializer.
+# Run from the repo root with: python -m benchmarks.bench_serializers
+import timeit
+
+from todoApp import create_app
+from todoApp.config import TestConfig
+from todoApp.extensions.db import db
+from todoApp.models.Todo import Todo, serialize_todo_columns
+from todoApp.models.User import User, serialize_user_columns
+from todoApp.utils.serialize_function import serialize_model
+
+NUMBER_OF_TODOS = 1000
+REPEATS = 20
+
+
+def make_sample_todos():
+    user = User(first_name="Jan", last_name="West", username="janwest", password_plaintext="Password123")
+    db.session.add(user)
+    db.session.commit()
+    todos = [Todo(title=f"Todo {index}", user_id=user.id, description=None if index % 3 else "Some description",
+                  parent_id=None) for index in range(NUMBER_OF_TODOS)]
+    db.session.add_all(todos)
+    db.session.commit()
+    # load every row so neither serializer pays for a lazy load
+    db.session.refresh(user)
+    return user, db.session.scalars(db.select(Todo)).all()
+
+
+def best_time(function):
+    return min(timeit.repeat(function, number=1, repeat=REPEATS))
+
+
+def main():
+    class BenchmarkConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+        SQLALCHEMY_ECHO = False
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        user, todos = make_sample_todos()
+        assert [serialize_model(todo, Todo) for todo in todos] == [serialize_todo_columns(todo) for todo in todos]
+
+        reflective = best_time(lambda: [serialize_model(todo, Todo) for todo in todos])
+        compiled = best_time(lambda: [serialize_todo_columns(todo) for todo in todos])
+        print(f"Todo x{NUMBER_OF_TODOS}: serialize_model {reflective * 1000:.2f} ms, "
+              f"compiled {compiled * 1000:.2f} ms, {reflective / compiled:.1f}x faster")
+
+        reflective = best_time(lambda: [serialize_model(user, User) for _ in range(NUMBER_OF_TODOS)])
+        compiled = best_time(lambda: [serialize_user_columns(user) for _ in range(NUMBER_OF_TODOS)])
+        print(f"User x{NUMBER_OF_TODOS}: serialize_model {reflective * 1000:.2f} ms, "
+              f"compiled {compiled * 1000:.2f} ms, {reflective / compiled:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# POST /todos throughput against a file-backed SQLite database, with and without ProductionConfig's connection
+# pragmas, from one client and from several concurrent ones.
+# Run from the repo root with: python -m benchmarks.bench_sqlite_writes
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from todoApp import create_app
+from todoApp.blueprints.user_routes import make_token
+from todoApp.config import Config, ProductionConfig, TestConfig
+from todoApp.extensions.db import db
+from todoApp.models.User import User
+
+WRITES = 400
+CONCURRENT_CLIENTS = 8
+
+
+def run_writes(sqlite_pragmas, database_path, clients):
+    class BenchmarkConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database_path}"
+        SQLALCHEMY_ECHO = False
+        SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": clients, "max_overflow": 0}
+        SQLITE_PRAGMAS = sqlite_pragmas
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        user = User(first_name="Jan", last_name="West", username="janwest", password_plaintext="Password123")
+        db.session.add(user)
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {make_token(user.public_id)}"}
+
+    def add_todo(index):
+        response = app.test_client().post('/todos', json={"title": f"Todo {index}"}, headers=headers)
+        assert response.status_code == 201, response.json
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        started = time.perf_counter()
+        list(pool.map(add_todo, range(WRITES)))
+        elapsed = time.perf_counter() - started
+    app.extensions['password_hasher'].shutdown()
+    with app.app_context():
+        db.engine.dispose()
+    return WRITES / elapsed
+
+
+def main():
+    print(f"{WRITES} POST /todos per run, {os.cpu_count()} CPUs")
+    for clients in [1, CONCURRENT_CLIENTS]:
+        for name, sqlite_pragmas in [("default pragmas", Config.SQLITE_PRAGMAS),
+                                     ("production pragmas", ProductionConfig().SQLITE_PRAGMAS)]:
+            with tempfile.TemporaryDirectory() as directory:
+                writes_per_second = run_writes(sqlite_pragmas, os.path.join(directory, "bench.db"), clients)
+            print(f"{clients} client(s), {name:>18}: {writes_per_second:7.1f} writes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# How long create_app takes with each SCHEMA_STARTUP mode, against a file-backed SQLite database that either
+# doesn't exist yet or already has the current schema. Imports are done before timing starts.
+# Run from the repo root with: python -m benchmarks.bench_startup
+import os
+import statistics
+import tempfile
+import time
+
+from todoApp import create_app
+from todoApp.config import TestConfig
+from todoApp.extensions.db import db
+
+RUNS = 20
+
+
+def time_create_app(schema_startup, database_path):
+    class BenchmarkConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database_path}"
+        SQLALCHEMY_ECHO = False
+        SCHEMA_STARTUP = schema_startup
+
+    started = time.perf_counter()
+    app = create_app(BenchmarkConfig)
+    elapsed = time.perf_counter() - started
+    with app.app_context():
+        db.engine.dispose()
+    return elapsed
+
+
+def measure(schema_startup, existing_database):
+    timings = []
+    for _ in range(RUNS):
+        with tempfile.TemporaryDirectory() as directory:
+            database_path = os.path.join(directory, "bench.db")
+            if existing_database:
+                time_create_app("create_missing", database_path)
+            timings.append(time_create_app(schema_startup, database_path))
+    return statistics.median(timings)
+
+
+def main():
+    print(f"median create_app time over {RUNS} runs")
+    for schema_startup, existing_database in [("recreate", True), ("create_missing", False),
+                                              ("create_missing", True), ("none", True)]:
+        database = "current database" if existing_database else "new database"
+        print(f"{schema_startup:>14}, {database:>16}: {measure(schema_startup, existing_database) * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
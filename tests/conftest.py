@@ -1,9 +1,11 @@
 import copy
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 import jwt
 import pytest
 from flask import current_app
+from sqlalchemy import event
 
 from todoApp import Todo
 from todoApp import create_app
@@ -23,6 +25,33 @@ def app():
     test_app = create_app(TestConfig)
     with test_app.app_context():
         yield test_app
+    test_app.extensions['password_hasher'].shutdown()
+
+
+# TODO_CLOSURE_TABLE is off in TestConfig, as it is by default; these switch it on before any todos are added
+@pytest.fixture()
+def closure_table(app):
+    app.config['TODO_CLOSURE_TABLE'] = True
+
+
+@pytest.fixture(params=[False, True], ids=["closure_off", "closure_on"])
+def closure_table_setting(request, app):
+    app.config['TODO_CLOSURE_TABLE'] = request.param
+    return request.param
+
+
+# MySQL can't read the table an UPDATE or DELETE is changing in a subquery; these run such statements the way
+# they are run there, fetching the ids first
+@pytest.fixture()
+def without_target_table_subqueries(monkeypatch):
+    monkeypatch.setattr("todoApp.extensions.db.SUBQUERY_ON_TARGET_UNSUPPORTED_DIALECTS", ("sqlite",))
+
+
+@pytest.fixture(params=[True, False], ids=["target_table_subqueries", "no_target_table_subqueries"])
+def target_table_subqueries_setting(request, monkeypatch):
+    if not request.param:
+        request.getfixturevalue("without_target_table_subqueries")
+    return request.param
 
 
 @pytest.fixture()
@@ -160,6 +189,28 @@ def make_test_token(public_user_id, current_time, expiry_time):
     return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm="HS256")
 
 
+@contextmanager
+def count_queries():
+    # Records every SQL statement sent to the database inside the with block
+    statements = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record_statement)
+
+
+def split_closure_statements(statements):
+    # Separates the statements that maintain the closure table from the rest, so query counts can be checked
+    # whichever way TODO_CLOSURE_TABLE is set
+    closure_statements = [statement for statement in statements if "todo_closure" in statement]
+    return [statement for statement in statements if "todo_closure" not in statement], closure_statements
+
+
 def assert_successful_response_generic(response, expected_status_code, expected_json):
     assert response.status_code == expected_status_code
     assert response.json == expected_json
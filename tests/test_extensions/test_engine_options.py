@@ -0,0 +1,88 @@
+import pytest
+
+from tests.conftest import *
+from todoApp.extensions.engine_options import make_engine_options
+
+
+def make_file_database_app(tmp_path, sqlite_pragmas):
+    class FileDatabaseConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'todo.db'}"
+        SQLALCHEMY_ECHO = False
+        SQLITE_PRAGMAS = sqlite_pragmas
+
+    test_app = create_app(FileDatabaseConfig)
+    test_app.extensions['password_hasher'].shutdown()
+    return test_app
+
+
+def read_pragma(name):
+    return db.session.execute(db.text(f"PRAGMA {name}")).scalar()
+
+
+def test_sqlite_pragmas_applied_to_every_connection(tmp_path):
+
+    test_app = make_file_database_app(tmp_path, ProductionConfig().SQLITE_PRAGMAS)
+
+    with test_app.app_context():
+        assert read_pragma("journal_mode") == "wal"
+        # NORMAL
+        assert read_pragma("synchronous") == 1
+        assert read_pragma("busy_timeout") == 5000
+        assert read_pragma("cache_size") == -64000
+        db.engine.dispose()
+    with test_app.app_context():
+        assert read_pragma("busy_timeout") == 5000
+
+
+def test_no_pragmas_by_default(tmp_path):
+
+    test_app = make_file_database_app(tmp_path, Config.SQLITE_PRAGMAS)
+
+    with test_app.app_context():
+        assert read_pragma("journal_mode") == "delete"
+        # FULL
+        assert read_pragma("synchronous") == 2
+
+
+def test_engine_options_from_environment():
+
+    engine_options = make_engine_options("postgresql://localhost/todo", {
+        "DB_POOL_SIZE": "5", "DB_MAX_OVERFLOW": "0", "DB_POOL_RECYCLE": "600", "DB_POOL_PRE_PING": "false",
+        "DB_STATEMENT_TIMEOUT_MS": "2000",
+    })
+
+    assert engine_options == {"pool_size": 5, "max_overflow": 0, "pool_timeout": 30, "pool_recycle": 600,
+                              "pool_pre_ping": False,
+                              "connect_args": {"options": "-c statement_timeout=2000"}}
+
+
+@pytest.mark.parametrize("database_uri, connect_args", [
+    ("mysql+pymysql://localhost/todo", {"init_command": "SET SESSION max_execution_time=2000"}),
+    ("mariadb+pymysql://localhost/todo", {"init_command": "SET SESSION max_statement_time=2.0"}),
+])
+def test_statement_timeout_on_mysql(database_uri, connect_args):
+
+    engine_options = make_engine_options(database_uri, {"DB_STATEMENT_TIMEOUT_MS": "2000"})
+
+    assert engine_options["connect_args"] == connect_args
+
+
+def test_statement_timeout_can_be_switched_off():
+
+    engine_options = make_engine_options("mysql+pymysql://localhost/todo", {"DB_STATEMENT_TIMEOUT_MS": "0"})
+
+    assert "connect_args" not in engine_options
+
+
+def test_engine_option_defaults_for_sqlite_file():
+
+    engine_options = make_engine_options("sqlite:////var/lib/todo/todo.db", {})
+
+    assert engine_options == {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30, "pool_recycle": 1800,
+                              "pool_pre_ping": True}
+
+
+@pytest.mark.parametrize("database_uri", [None, "sqlite://", "sqlite:///:memory:"])
+def test_no_engine_options_for_in_memory_sqlite(database_uri):
+
+    assert make_engine_options(database_uri, {"DB_POOL_SIZE": "5"}) == {}
@@ -0,0 +1,80 @@
+import decimal
+import uuid
+from datetime import datetime
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from tests.conftest import *
+from todoApp.extensions.json_provider import OrjsonProvider, make_json_provider
+
+orjson = pytest.importorskip("orjson")
+
+
+def make_nested(depth):
+    node = {"id": depth, "children": []}
+    for level in range(depth - 1, -1, -1):
+        node = {"id": level, "children": [node]}
+    return node
+
+
+SAMPLE_PAYLOADS = {
+    "todo_list": [{"id": index, "title": f"Todo {index}", "checked": index % 2 == 0, "user_id": 1,
+                   "child_count": index, "checked_child_count": 0} for index in range(50)],
+    "error_message": "Error: Your todo title must be unique.",
+    "control_characters": {"description": "tab\there\nnew line \"quoted\" back\\slash \x01"},
+    "non_ascii": {"title": "Café ☕"},
+    "deeply_nested": make_nested(400),
+    "large_integer": {"id": 2 ** 70},
+    "flask_default_types": {"when": datetime(2024, 1, 2, 3, 4, 5), "amount": decimal.Decimal("1.50"),
+                            "public_id": uuid.UUID("12345678-1234-5678-1234-567812345678")},
+    "nothing": None,
+}
+
+
+@pytest.mark.parametrize("payload_name", SAMPLE_PAYLOADS.keys())
+def test_orjson_response_byte_identical_to_stdlib(app, payload_name):
+
+    payload = SAMPLE_PAYLOADS[payload_name]
+
+    orjson_response = OrjsonProvider(app).response(payload)
+    stdlib_response = DefaultJSONProvider(app).response(payload)
+
+    assert orjson_response.get_data() == stdlib_response.get_data()
+    assert orjson_response.mimetype == stdlib_response.mimetype
+
+
+@pytest.mark.parametrize("payload_name", SAMPLE_PAYLOADS.keys())
+def test_orjson_dumps_identical_to_stdlib(app, payload_name):
+
+    payload = SAMPLE_PAYLOADS[payload_name]
+
+    for kwargs in [{"separators": (",", ":")}, {}, {"indent": 2}]:
+        assert OrjsonProvider(app).dumps(payload, **kwargs) == DefaultJSONProvider(app).dumps(payload, **kwargs)
+
+
+def test_route_response_byte_identical_to_stdlib(app, authenticated_client, multiple_sample_todos):
+
+    app.json = OrjsonProvider(app)
+    orjson_data = authenticated_client.get("/todos").get_data()
+    app.json = DefaultJSONProvider(app)
+    stdlib_data = authenticated_client.get("/todos").get_data()
+
+    assert orjson_data == stdlib_data
+
+
+@pytest.mark.parametrize("provider_name, provider_class", [("auto", OrjsonProvider), ("orjson", OrjsonProvider),
+                                                           ("stdlib", DefaultJSONProvider)])
+def test_make_json_provider(app, provider_name, provider_class):
+
+    app.config['JSON_PROVIDER'] = provider_name
+
+    assert type(make_json_provider(app)) is provider_class
+
+
+def test_make_json_provider_unknown_name(app):
+
+    app.config['JSON_PROVIDER'] = "simplejson"
+
+    with pytest.raises(ValueError):
+        make_json_provider(app)
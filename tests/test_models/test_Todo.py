@@ -80,3 +80,78 @@ def test_serialize_function_WITH_CHILDREN_parent_todo(app):
     assert serialized_todo_with_children == {**expected_data_parent, "children": [expected_data_child]}
 
 
+
+
+# Backends without a unique index on top-level titles, such as MariaDB: duplicates are caught by
+# check_top_level_titles instead
+@pytest.fixture
+def without_partial_title_index(app, monkeypatch):
+    monkeypatch.setattr("todoApp.models.Todo.PARTIAL_INDEX_DIALECTS", ())
+    db.session.execute(db.text(f"DROP INDEX {TOP_LEVEL_TITLE_INDEX}"))
+    db.session.commit()
+
+
+@pytest.mark.parametrize("url, server_version, expected_index", [
+    ("sqlite://", None, "ON todo (user_id, title) WHERE parent_id IS NULL"),
+    ("postgresql://", None, "ON todo (user_id, title) WHERE parent_id IS NULL"),
+    ("mysql://", (8, 0, 36), "ON todo (user_id, (CASE WHEN parent_id IS NULL THEN title END))"),
+    ("mysql://", (5, 7, 44), None),
+    ("mariadb://", (10, 11, 6), None),
+])
+def test_top_level_title_index_per_backend(app, url, server_version, expected_index):
+    from sqlalchemy import create_mock_engine
+    from sqlalchemy.schema import CreateIndex
+
+    statements = []
+    engine = create_mock_engine(url, lambda statement, *args, **kwargs: statements.append(statement))
+    engine.dialect.server_version_info = server_version
+    Todo.__table__.create(engine, checkfirst=False)
+    created_indexes = {statement.element.name: str(statement.compile(dialect=engine.dialect))
+                       for statement in statements if isinstance(statement, CreateIndex)}
+    if expected_index is None:
+        assert TOP_LEVEL_TITLE_INDEX not in created_indexes
+        # check_top_level_titles' SELECT gets an index of its own instead
+        assert "ix_todo_user_id_parent_id_title" in created_indexes
+    else:
+        assert created_indexes[TOP_LEVEL_TITLE_INDEX].strip().endswith(expected_index)
+        assert "ix_todo_user_id_parent_id_title" not in created_indexes
+
+
+def test_mysql_duplicate_top_level_title_is_a_validation_error(app):
+    from sqlalchemy.exc import IntegrityError
+
+    mysql_error = Exception(1062, f"Duplicate entry '1-Taken' for key 'todo.{TOP_LEVEL_TITLE_INDEX}'")
+    with pytest.raises(ValidationException, match="Your todo title must be unique"):
+        with unique_top_level_title("Your todo title must be unique"):
+            raise IntegrityError("INSERT INTO todo ...", {}, mysql_error)
+
+
+def test_duplicate_titles_without_partial_index(authenticated_client, create_todo, without_partial_title_index):
+
+    parent_todo = create_todo(title="Parent Todo")
+    baby_todo = create_todo(title="Taken Title", parent_id=parent_todo.id)
+    create_todo(title="Taken Title")
+    other_todo = create_todo(title="Other Todo")
+
+    add_response = authenticated_client.post("/todos", json={"title": "Taken Title"})
+    batch_response = authenticated_client.post("/todos/batch", json=[{"temp_id": 1, "title": "Taken Title"}])
+    edit_response = authenticated_client.patch(f"/todos/{other_todo.id}", json={"title": "Taken Title"})
+    toggle_response = authenticated_client.patch(f"/todos/{baby_todo.id}/toggle_parent", json={"parent_id": None})
+
+    assert_unsuccessful_response_generic(add_response, 400, "Error: Your todo title must be unique.")
+    assert_unsuccessful_response_generic(batch_response, 400, "Error: Your todo title must be unique.")
+    assert_unsuccessful_response_generic(edit_response, 400, "Error: Your todo must have a unique title.")
+    assert_unsuccessful_response_generic(toggle_response, 400, "Error: Your todo title must be unique.")
+
+
+def test_sub_todos_share_titles_without_partial_index(authenticated_client, create_todo, without_partial_title_index):
+
+    parent_todo = create_todo(title="Parent Todo")
+    top_level_todo = create_todo(title="Shared Title")
+
+    add_response = authenticated_client.post("/todos", json={"title": "Shared Title", "parent_id": parent_todo.id})
+    # keeping its own title isn't a clash
+    edit_response = authenticated_client.patch(f"/todos/{top_level_todo.id}", json={"title": "Shared Title"})
+
+    assert add_response.status_code == 201
+    assert edit_response.status_code == 200
@@ -175,6 +175,47 @@ def test_cannot_add_todo_with_duplicate_title(client, create_todo):
         assert_unauthenticated_response(client, response)
 
 
+def test_duplicate_title_is_caught_without_checking_first(authenticated_client, create_todo):
+
+    create_todo(title="Test Title")
+    authenticated_client.get("/todos")
+
+    with count_queries() as statements:
+        response = authenticated_client.post('/todos', json={"title": "Test Title"})
+
+    assert_unsuccessful_response_generic(response, 400, DUPLICATE_TITLE_ERROR)
+    # the unique index rejects the INSERT, with no SELECT on the title beforehand
+    assert not [statement for statement in statements if statement.startswith("SELECT")]
+
+
+def test_sub_todos_can_share_titles(authenticated_client, create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+    create_todo(title="Test Title")
+
+    response = authenticated_client.post('/todos', json={"title": "Test Title", "parent_id": parent_todo.id})
+    second_response = authenticated_client.post('/todos', json={"title": "Test Title", "parent_id": parent_todo.id})
+
+    assert response.status_code == 201
+    assert second_response.status_code == 201
+
+
+def test_add_todo_does_not_read_todo_back(closure_table_setting, authenticated_client):
+
+    authenticated_client.get("/todos")
+
+    with count_queries() as statements:
+        response = authenticated_client.post('/todos', json={"title": "Test Title"})
+
+    assert response.status_code == 201
+    assert response.json == {"id": 1, "title": "Test Title", "checked": False, "user_id": 1}
+    # the INSERT and the todo version bump, plus its closure row when that's on, and no reload once they're
+    # committed
+    todo_statements, closure_statements = split_closure_statements(statements)
+    assert len(todo_statements) == 2
+    assert len(closure_statements) == (1 if closure_table_setting else 0)
+
+
 def test_cannot_add_todo_deleted_user(client):
 
     expected_id = 1
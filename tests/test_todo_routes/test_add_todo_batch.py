@@ -0,0 +1,159 @@
+import pytest
+
+from todoApp.models.Todo import *
+from tests.conftest import *
+
+
+SAMPLE_BATCH = [
+    {"temp_id": "project", "title": "Project", "description": "Top of the tree"},
+    {"temp_id": "step 1", "title": "Step 1", "parent_temp_id": "project"},
+    {"temp_id": "step 1a", "title": "Step 1a", "parent_temp_id": "step 1"},
+    {"temp_id": "step 2", "title": "Step 2", "parent_temp_id": "project"},
+    {"temp_id": 5, "title": "Separate Todo"},
+]
+
+
+def assert_no_todos_added(user_id):
+    assert db.session.scalars(db.select(Todo).filter_by(user_id=user_id)).all() == []
+
+
+def test_successful_add_todo_batch(client):
+
+    response = client.post("/todos/batch", json=SAMPLE_BATCH)
+
+    if client.authenticated:
+        assert response.status_code == 201
+        temp_ids = response.json["temp_ids"]
+        assert set(temp_ids.keys()) == {"project", "step 1", "step 1a", "step 2", "5"}
+        for todo_data, serialized_todo in zip(SAMPLE_BATCH, response.json["todos"]):
+            added_todo = db.session.get(Todo, temp_ids[str(todo_data["temp_id"])])
+            assert serialized_todo == serialize_todo(added_todo)
+            assert added_todo.title == todo_data["title"]
+            assert added_todo.user_id == client.current_user.id
+            parent_temp_id = todo_data.get("parent_temp_id")
+            assert added_todo.parent_id == (temp_ids[parent_temp_id] if parent_temp_id else None)
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_add_todo_batch_under_existing_parent(client, create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+    batch = [{"temp_id": "child", "title": "Child", "parent_id": parent_todo.id},
+             {"temp_id": "grandchild", "title": "Grandchild", "parent_temp_id": "child"}]
+
+    response = client.post("/todos/batch", json=batch)
+
+    if client.authenticated:
+        assert response.status_code == 201
+        child_todo = db.session.get(Todo, response.json["temp_ids"]["child"])
+        grandchild_todo = db.session.get(Todo, response.json["temp_ids"]["grandchild"])
+        assert child_todo.parent_id == parent_todo.id
+        assert grandchild_todo.parent_id == child_todo.id
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_add_todo_batch_temp_ids_compared_as_strings(authenticated_client):
+
+    batch = [{"temp_id": "1", "title": "Parent"}, {"temp_id": 2, "title": "Child", "parent_temp_id": 1}]
+
+    response = authenticated_client.post("/todos/batch", json=batch)
+
+    assert response.status_code == 201
+    temp_ids = response.json["temp_ids"]
+    assert set(temp_ids) == {"1", "2"}
+    assert db.session.get(Todo, temp_ids["2"]).parent_id == temp_ids["1"]
+
+
+def test_add_todo_batch_uses_constant_queries(closure_table_setting, authenticated_client):
+
+    batch = [{"temp_id": index, "title": f"Todo {index}"} for index in range(50)]
+    batch += [{"temp_id": f"child {index}", "title": "Child", "parent_temp_id": index} for index in range(50)]
+    authenticated_client.get("/todos")
+
+    with count_queries() as statements:
+        response = authenticated_client.post("/todos/batch", json=batch)
+
+    assert response.status_code == 201
+    # one INSERT for each of the two levels, then the todo version bump; the unique index checks the titles.
+    # With the closure table on, each level adds two INSERT ... SELECTs for its closure rows
+    todo_statements, closure_statements = split_closure_statements(statements)
+    assert len(todo_statements) == 3
+    assert len(closure_statements) == (4 if closure_table_setting else 0)
+
+
+@pytest.mark.parametrize("batch, error_message", [
+    ([], "Error: Todos must be sent as a non-empty list."),
+    ({"temp_id": 1, "title": "Not A List"}, "Error: Todos must be sent as a non-empty list."),
+    (["not an object"], "Error: Each todo in the batch must be an object."),
+    ([{"title": "No Temp Id"}], "Error: Every todo in the batch needs a temp_id."),
+    ([{"temp_id": 1, "title": "Todo 1"}, {"temp_id": 1, "title": "Todo 2"}], "Error: Todo temp_ids must be unique."),
+    ([{"temp_id": 1, "title": "Todo 1"}, {"temp_id": "1", "title": "Todo 2"}], "Error: Todo temp_ids must be unique."),
+    ([{"temp_id": 1, "title": "Todo 1", "parent_id": [1]}], "Error: Parent ID must be an integer."),
+    ([{"temp_id": 1, "title": "Todo 1", "parent_id": "1"}], "Error: Parent ID must be an integer."),
+    ([{"temp_id": 1, "title": "Todo 1", "parent_id": True}], "Error: Parent ID must be an integer."),
+    ([{"temp_id": 1, "title": "Todo 1", "parent_id": 10**30}], f"Error: Parent ID must be between 1 and {2**63 - 1}."),
+    ([{"temp_id": 1, "title": "Todo 1", "parent_id": 0}], f"Error: Parent ID must be between 1 and {2**63 - 1}."),
+    ([{"temp_id": 1, "title": "Todo 1"}, {"temp_id": 2, "title": "Todo 2", "parent_temp_id": [1]}],
+     "Error: Parent temp_id must be a string or an integer."),
+    ([{"temp_id": 1, "title": "Orphan", "parent_temp_id": 2}],
+     "Error: Parent temp_id 2 does not match any todo in the batch."),
+    ([{"temp_id": 1, "title": "Todo 1", "parent_temp_id": 2}, {"temp_id": 2, "title": "Todo 2", "parent_temp_id": 1}],
+     "Error: Cannot create circular parent-child relationship."),
+    ([{"temp_id": 1, "title": "Todo 1", "parent_id": 1, "parent_temp_id": 2}, {"temp_id": 2, "title": "Todo 2"}],
+     "Error: A todo cannot have both a parent_id and a parent_temp_id."),
+    ([{"temp_id": 1, "title": "Todo 1"}, {"temp_id": 2, "title": None, "parent_temp_id": 1}],
+     "Error: Your todo needs a title."),
+    ([{"temp_id": 1, "title": "Same Title"}, {"temp_id": 2, "title": "Same Title"}],
+     "Error: Your todo title must be unique."),
+])
+def test_cannot_add_invalid_batch(client, batch, error_message):
+
+    response = client.post("/todos/batch", json=batch)
+
+    if client.authenticated:
+        assert_unsuccessful_response_generic(response, 400, error_message)
+        assert_no_todos_added(client.current_user.id)
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_cannot_add_batch_with_existing_title(client, create_todo):
+
+    create_todo(title="Existing Title")
+
+    response = client.post("/todos/batch", json=[{"temp_id": 1, "title": "New Title"},
+                                                 {"temp_id": 2, "title": "Existing Title"}])
+
+    if client.authenticated:
+        assert_unsuccessful_response_generic(response, 400, "Error: Your todo title must be unique.")
+        assert db.session.scalars(db.select(Todo).filter_by(title="New Title")).first() is None
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_cannot_add_batch_with_nonexistent_parent(client, create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+
+    response = client.post("/todos/batch", json=[{"temp_id": 1, "title": "Child 1", "parent_id": parent_todo.id},
+                                                 {"temp_id": 2, "title": "Child 2", "parent_id": 99}])
+
+    if client.authenticated:
+        assert_unsuccessful_response_generic(response, 404, "Error: Parent todo does not exist.")
+        assert db.session.scalars(db.select(Todo).filter_by(title="Child 1")).first() is None
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_cannot_add_batch_over_size_limit(client):
+
+    batch = [{"temp_id": index, "title": f"Todo {index}"} for index in range(1001)]
+
+    response = client.post("/todos/batch", json=batch)
+
+    if client.authenticated:
+        assert_unsuccessful_response_generic(response, 400, "Error: A batch can contain at most 1000 todos.")
+    else:
+        assert_unauthenticated_response(client, response)
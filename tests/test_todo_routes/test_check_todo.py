@@ -11,6 +11,12 @@ def assert_todo_check_toggled(todo, original_values):
 def assert_todo_check_not_toggled(todo, original_values):
     assert todo.checked == original_values["checked"]
 
+# Every test runs with the cascade done by one UPDATE and with the fallback that walks the tree in the ORM
+@pytest.fixture(autouse=True, params=[True, False], ids=["cascade_in_sql", "cascade_in_orm"])
+def cascade_check_in_sql(request, app):
+    app.config['CASCADE_CHECK_IN_SQL'] = request.param
+    return request.param
+
 def assert_successful_response_toggle_check(response, original_values):
 
     expected_json = {**original_values, "checked": not original_values["checked"]}
@@ -76,6 +82,30 @@ def test_check_parent_todo_cascade(client, create_todo):
 
 
 
+def test_check_parent_todo_cascade_multi_level(client, create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+    baby_todo = create_todo(title="Baby Todo", parent_id=parent_todo.id)
+    grandchild_todo = create_todo(title="Grandchild Todo", parent_id=baby_todo.id)
+    great_grandchild_todo = create_todo(title="Great Grandchild Todo", parent_id=grandchild_todo.id)
+    descendant_todos = [baby_todo, grandchild_todo, great_grandchild_todo]
+
+    parent_original_values = get_original_values_todo(parent_todo)
+    descendant_original_values_list = [get_original_values_todo(descendant) for descendant in descendant_todos]
+
+    response = client.patch(f"/todos/{parent_todo.id}/check", json={"checked": True})
+
+    if client.authenticated:
+        assert_successful_response_toggle_check(response, parent_original_values)
+        for descendant, descendant_original_values in zip(descendant_todos, descendant_original_values_list):
+            assert_todo_check_toggled(descendant, descendant_original_values)
+    else:
+        assert_unauthenticated_response(client, response)
+        for descendant, descendant_original_values in zip(descendant_todos, descendant_original_values_list):
+            assert_todo_check_not_toggled(descendant, descendant_original_values)
+
+
+
 # def test_check_last_non_matching_child_checks_parent(client, create_todo):
 #
 #     parent_todo = create_todo(title="Parent Todo")
@@ -150,3 +180,19 @@ def test_uncheck_last_non_matching_child_unchecks_parent(client, create_todo):
 #         assert_todo_check_not_toggled(baby_todo_1, baby_todo_1_original_values)
 #         assert_todo_check_not_toggled(baby_todo_2, baby_todo_2_original_values)
 #         assert_unauthenticated_response(client, response)
+
+
+@pytest.mark.parametrize("checked", [True, False])
+def test_check_todo_does_not_read_todo_back(authenticated_client, create_todo, checked, cascade_check_in_sql):
+
+    parent_todo = create_todo(title="Parent Todo", checked=not checked)
+    baby_todo = create_todo(title="Baby Todo", parent_id=parent_todo.id, checked=not checked)
+    authenticated_client.get("/todos")
+
+    with count_queries() as statements:
+        response = authenticated_client.patch(f"/todos/{baby_todo.id}/check", json={"checked": checked})
+
+    assert response.json["checked"] is checked
+    # finding the todo, one UPDATE ... RETURNING for it (and its parent when unchecking), the todo version bump.
+    # The ORM fallback loads the subtree and then flushes an UPDATE for it instead
+    assert len(statements) == (4 if checked and not cascade_check_in_sql else 3)
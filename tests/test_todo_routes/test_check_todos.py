@@ -0,0 +1,119 @@
+import pytest
+
+from todoApp.models.Todo import *
+from tests.conftest import *
+
+
+def test_check_multiple_todos(client, create_todo):
+
+    todo_1 = create_todo(title="Todo 1")
+    todo_2 = create_todo(title="Todo 2")
+    untouched_todo = create_todo(title="Untouched Todo")
+
+    response = client.patch("/todos/check", json={"ids": [todo_1.id, todo_2.id], "checked": True})
+
+    if client.authenticated:
+        assert response.status_code == 200
+        assert [serialized_todo["id"] for serialized_todo in response.json] == [todo_1.id, todo_2.id]
+        assert all(serialized_todo["checked"] is True for serialized_todo in response.json)
+        assert todo_1.checked is True
+        assert todo_2.checked is True
+        assert untouched_todo.checked is False
+    else:
+        assert_unauthenticated_response(client, response)
+        assert todo_1.checked is False
+        assert todo_2.checked is False
+
+
+def test_check_multiple_todos_cascades_to_children(authenticated_client, create_todo):
+
+    parent_todo_1 = create_todo(title="Parent Todo 1")
+    child_todo = create_todo(title="Child Todo", parent_id=parent_todo_1.id)
+    grandchild_todo = create_todo(title="Grandchild Todo", parent_id=child_todo.id)
+    parent_todo_2 = create_todo(title="Parent Todo 2")
+    other_child_todo = create_todo(title="Other Child Todo", parent_id=parent_todo_2.id)
+
+    # grandchild_todo sits under parent_todo_1 as well as being sent itself
+    response = authenticated_client.patch("/todos/check", json={
+        "ids": [parent_todo_1.id, parent_todo_2.id, grandchild_todo.id], "checked": True
+    })
+
+    assert response.status_code == 200
+    for todo in [parent_todo_1, child_todo, grandchild_todo, parent_todo_2, other_child_todo]:
+        assert todo.checked is True
+
+
+def test_uncheck_multiple_todos_unchecks_parents(authenticated_client, create_todo):
+
+    parent_todo = create_todo(title="Parent Todo", checked=True)
+    child_todo = create_todo(title="Child Todo", parent_id=parent_todo.id, checked=True)
+    grandchild_todo = create_todo(title="Grandchild Todo", parent_id=child_todo.id, checked=True)
+    sibling_todo = create_todo(title="Sibling Todo", parent_id=parent_todo.id, checked=True)
+    top_level_todo = create_todo(title="Top Level Todo", checked=True)
+
+    response = authenticated_client.patch("/todos/check", json={
+        "ids": [grandchild_todo.id, top_level_todo.id], "checked": False
+    })
+
+    assert response.status_code == 200
+    assert grandchild_todo.checked is False
+    assert top_level_todo.checked is False
+    # only the direct parent is unchecked, as with a single todo
+    assert child_todo.checked is False
+    assert parent_todo.checked is True
+    assert sibling_todo.checked is True
+
+
+def test_check_multiple_todos_uses_constant_queries(authenticated_client, create_todo):
+
+    todo_ids = []
+    parent_id = None
+    for index in range(20):
+        todo = create_todo(title=f"Todo {index}", parent_id=parent_id)
+        todo_ids.append(todo.id)
+        parent_id = todo.id if index % 2 == 0 else None
+    authenticated_client.get("/todos")
+
+    with count_queries() as statements:
+        response = authenticated_client.patch("/todos/check", json={"ids": todo_ids, "checked": True})
+
+    assert response.status_code == 200
+    # loading the todos, one UPDATE ... RETURNING that refreshes them, then the todo version bump
+    assert len(statements) == 3
+
+
+def test_check_multiple_todos_is_all_or_nothing(authenticated_client, create_todo, create_user_flex):
+
+    todo = create_todo(title="My Todo")
+    other_user = create_user_flex(username="otheruser")
+    other_user_todo = create_todo(title="Other User Todo", user_id=other_user.id)
+
+    response = authenticated_client.patch("/todos/check", json={
+        "ids": [todo.id, other_user_todo.id, 1000], "checked": True
+    })
+
+    assert_unsuccessful_response_generic(
+        response, 404, f"Error: No result found for todo IDs {other_user_todo.id}, 1000."
+    )
+    assert todo.checked is False
+    assert other_user_todo.checked is False
+
+
+@pytest.mark.parametrize("data, error_message", [
+    ({"checked": True}, "Error: Todo IDs must be sent as a non-empty list of integers."),
+    ([1, 2], "Error: Todo IDs must be sent as a non-empty list of integers."),
+    ("ids", "Error: Todo IDs must be sent as a non-empty list of integers."),
+    ({"ids": [], "checked": True}, "Error: Todo IDs must be sent as a non-empty list of integers."),
+    ({"ids": ["1"], "checked": True}, "Error: Todo IDs must be sent as a non-empty list of integers."),
+    ({"ids": [True], "checked": True}, "Error: Todo IDs must be sent as a non-empty list of integers."),
+    ({"ids": [1, 10**30], "checked": True}, f"Error: Todo IDs must be between 1 and {2**63 - 1}."),
+    ({"ids": [0], "checked": True}, f"Error: Todo IDs must be between 1 and {2**63 - 1}."),
+    ({"ids": list(range(1, 1002)), "checked": True}, "Error: A request can contain at most 1000 todo IDs."),
+    ({"ids": [1]}, "Error: Checked must be true or false."),
+    ({"ids": [1], "checked": "yes"}, "Error: Checked must be true or false."),
+])
+def test_cannot_check_todos_with_invalid_data(authenticated_client, data, error_message):
+
+    response = authenticated_client.patch("/todos/check", json=data)
+
+    assert_unsuccessful_response_generic(response, 400, error_message)
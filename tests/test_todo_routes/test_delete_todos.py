@@ -0,0 +1,115 @@
+import pytest
+
+from todoApp.models.Todo import *
+from todoApp.models.TodoClosure import TodoClosure
+from tests.conftest import *
+
+
+def assert_record_deleted(todo_id):
+    assert db.session.get(Todo, todo_id) is None
+
+
+def test_successful_delete_multiple_todos(client, create_todo):
+
+    todo_1 = create_todo(title="Todo 1")
+    todo_2 = create_todo(title="Todo 2")
+    remaining_todo = create_todo(title="Remaining Todo")
+    todo_ids = [todo_1.id, todo_2.id]
+    remaining_original_values = get_original_values_todo(remaining_todo)
+
+    response = client.delete("/todos", json={"ids": todo_ids})
+
+    if client.authenticated:
+        assert_successful_response_generic(response, 200, "Todos successfully deleted.")
+        db.session.expunge_all()
+        for todo_id in todo_ids:
+            assert_record_deleted(todo_id)
+        assert db.session.get(Todo, remaining_original_values["id"]) is not None
+    else:
+        assert_unauthenticated_response(client, response)
+        assert_record_unchanged(remaining_todo, remaining_original_values)
+        for todo_id in todo_ids:
+            assert db.session.get(Todo, todo_id) is not None
+
+
+def test_delete_multiple_todos_also_deletes_descendants(closure_table, authenticated_client, create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+    child_todo = create_todo(title="Child Todo", parent_id=parent_todo.id)
+    grandchild_todo = create_todo(title="Grandchild Todo", parent_id=child_todo.id)
+    other_parent_todo = create_todo(title="Other Parent Todo")
+    other_child_todo = create_todo(title="Other Child Todo", parent_id=other_parent_todo.id)
+    deleted_ids = [parent_todo.id, child_todo.id, grandchild_todo.id, other_child_todo.id]
+    other_parent_id = other_parent_todo.id
+
+    # child_todo is under parent_todo as well as being sent itself
+    response = authenticated_client.delete("/todos", json={"ids": [parent_todo.id, child_todo.id,
+                                                                    other_child_todo.id]})
+
+    assert response.status_code == 200
+    db.session.expunge_all()
+    for todo_id in deleted_ids:
+        assert_record_deleted(todo_id)
+    assert db.session.get(Todo, other_parent_id) is not None
+    # no closure rows are left pointing at the deleted todos
+    assert db.session.scalars(db.select(TodoClosure).where(
+        db.or_(TodoClosure.ancestor_id.in_(deleted_ids), TodoClosure.descendant_id.in_(deleted_ids))
+    )).all() == []
+    assert db.session.get(TodoClosure, (other_parent_id, other_parent_id)) is not None
+
+
+def test_delete_multiple_todos_uses_constant_queries(closure_table_setting, authenticated_client, create_todo):
+
+    todo_ids = []
+    parent_id = None
+    for index in range(20):
+        todo = create_todo(title=f"Todo {index}", parent_id=parent_id)
+        todo_ids.append(todo.id)
+        parent_id = todo.id
+    authenticated_client.get("/todos")
+
+    with count_queries() as statements:
+        response = authenticated_client.delete("/todos", json={"ids": todo_ids[:1]})
+
+    assert response.status_code == 200
+    # id check, the DELETE of the todos, then the todo version bump, plus one DELETE for the closure rows
+    todo_statements, closure_statements = split_closure_statements(statements)
+    assert len(todo_statements) == 3
+    assert len(closure_statements) == (1 if closure_table_setting else 0)
+    db.session.expunge_all()
+    assert db.session.scalars(db.select(Todo)).all() == []
+
+
+def test_delete_multiple_todos_is_all_or_nothing(authenticated_client, create_todo, create_user_flex):
+
+    todo = create_todo(title="My Todo")
+    other_user = create_user_flex(username="otheruser")
+    other_user_todo = create_todo(title="Other User Todo", user_id=other_user.id)
+
+    response = authenticated_client.delete("/todos", json={"ids": [todo.id, other_user_todo.id]})
+
+    assert_unsuccessful_response_generic(
+        response, 404, f"Error: Cannot delete todos, no result found for todo IDs {other_user_todo.id}."
+    )
+    assert db.session.get(Todo, todo.id) is not None
+    assert db.session.get(Todo, other_user_todo.id) is not None
+
+
+@pytest.mark.parametrize("data", [{}, {"ids": []}, {"ids": "1"}, {"ids": [1.5]}, [1, 2], "ids"])
+def test_cannot_delete_todos_with_invalid_ids(authenticated_client, data):
+
+    response = authenticated_client.delete("/todos", json=data)
+
+    assert_unsuccessful_response_generic(response, 400,
+                                         "Error: Todo IDs must be sent as a non-empty list of integers.")
+
+
+@pytest.mark.parametrize("todo_id", [0, 10**30])
+def test_cannot_delete_todos_with_out_of_range_ids(authenticated_client, create_todo, todo_id):
+
+    todo = create_todo()
+
+    response = authenticated_client.delete("/todos", json={"ids": [todo.id, todo_id]})
+
+    assert_unsuccessful_response_generic(response, 400, f"Error: Todo IDs must be between 1 and {2**63 - 1}.")
+    assert db.session.get(Todo, todo.id) is not None
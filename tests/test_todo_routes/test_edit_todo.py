@@ -179,6 +179,31 @@ def test_cannot_edit_to_invalid_title_or_description(client, data, error_message
         assert_unauthenticated_response(client, response)
 
 
+def test_sub_todo_can_take_title_used_at_top_level(authenticated_client, create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+    baby_todo = create_todo(title="Baby Todo", parent_id=parent_todo.id)
+
+    response = authenticated_client.patch(f"/todos/{baby_todo.id}", json={"title": "Parent Todo"})
+
+    assert response.status_code == 200
+    assert baby_todo.title == "Parent Todo"
+
+
+def test_edit_todo_does_not_read_todo_back(authenticated_client, create_todo):
+
+    todo = create_todo()
+    authenticated_client.get("/todos")
+
+    with count_queries() as statements:
+        response = authenticated_client.patch(f"/todos/{todo.id}", json={"title": "Edited Title"})
+
+    assert response.json["title"] == "Edited Title"
+    # finding the todo, its UPDATE and the todo version bump
+    assert len(statements) == 3
+    assert statements[-1].startswith("UPDATE user")
+
+
 def test_cannot_edit_todo_deleted_user(client, create_todo):
 
     todo = create_todo()
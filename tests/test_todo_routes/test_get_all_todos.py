@@ -3,11 +3,16 @@ import json
 import pytest
 
 from tests.conftest import *
+from todoApp.utils.pagination import encode_cursor
 
 
 def assert_successful_response_get_all_todos(response, todo_values_list=[]):
     assert_successful_response_generic(response, 200, todo_values_list)
 
+
+def with_child_counts(todo_values, child_count=0, checked_child_count=0):
+    return {**todo_values, "child_count": child_count, "checked_child_count": checked_child_count}
+
 def test_returns_empty_if_no_todos_exist(client):
 
     response = client.get('/todos')
@@ -21,7 +26,7 @@ def test_returns_empty_if_no_todos_exist(client):
 def test_returns_single_todo(client, create_todo):
 
     todo = create_todo()
-    original_values_list = [get_original_values_todo(todo)]
+    original_values_list = [with_child_counts(get_original_values_todo(todo))]
 
     response = client.get('/todos')
 
@@ -33,7 +38,7 @@ def test_returns_single_todo(client, create_todo):
 def test_returns_list_of_multiple_todos(client, multiple_sample_todos):
 
     todos = multiple_sample_todos
-    original_values_list = [get_original_values_todo(todo) for todo in todos]
+    original_values_list = [with_child_counts(get_original_values_todo(todo)) for todo in todos]
 
     response = client.get("/todos")
 
@@ -49,7 +54,7 @@ def test_does_not_return_child_todos(client, create_todo):
     child_todo_1 = create_todo(title="Child Todo 1", parent_id=parent_todo.id)
     child_todo_2 = create_todo(title="Child Todo 2", parent_id=parent_todo.id)
 
-    parent_todo_original_values = get_original_values_todo(parent_todo)
+    parent_todo_original_values = with_child_counts(get_original_values_todo(parent_todo), child_count=2)
     child_todo_1_original_values = get_original_values_todo(child_todo_1)
     child_todo_2_original_values = get_original_values_todo(child_todo_2)
 
@@ -69,6 +74,34 @@ def test_does_not_return_child_todos(client, create_todo):
         assert_unauthenticated_response(client, response)
 
 
+def test_returns_child_counts(client, create_todo):
+
+    parent_todo_1 = create_todo(title="Parent Todo 1")
+    create_todo(title="Child Todo 1", parent_id=parent_todo_1.id, checked=True)
+    create_todo(title="Child Todo 2", parent_id=parent_todo_1.id)
+    child_todo_3 = create_todo(title="Child Todo 3", parent_id=parent_todo_1.id, checked=True)
+    # grandchildren are not counted as children of the top-level todo
+    create_todo(title="Grandchild Todo", parent_id=child_todo_3.id)
+    parent_todo_2 = create_todo(title="Parent Todo 2")
+    create_todo(title="Child Todo 4", parent_id=parent_todo_2.id, checked=True)
+    empty_todo = create_todo(title="Empty Todo")
+
+    expected_values_list = [
+        with_child_counts(get_original_values_todo(parent_todo_1), child_count=3, checked_child_count=2),
+        with_child_counts(get_original_values_todo(parent_todo_2), child_count=1, checked_child_count=1),
+        with_child_counts(get_original_values_todo(empty_todo)),
+    ]
+
+    with count_queries() as statements:
+        response = client.get("/todos")
+
+    if client.authenticated:
+        assert_successful_response_get_all_todos(response, expected_values_list)
+        # user lookup, todo version, top-level todos, child counts
+        assert len(statements) == 4
+    else:
+        assert_unauthenticated_response(client, response)
+
 
 def test_cannot_get_all_todos_deleted_user(client, multiple_sample_todos):
 
@@ -85,4 +118,114 @@ def test_cannot_get_all_todos_deleted_user(client, multiple_sample_todos):
             assert db.session.get(Todo, todo.id) is None
         assert_unsuccessful_response_generic(response, 404, "Error: User not found.")
     else:
-        assert_unauthenticated_response(client, response)
\ No newline at end of file
+        assert_unauthenticated_response(client, response)
+
+def test_paginates_todos_with_cursor(client, create_todo):
+
+    todos = [create_todo(title=f"Test Title {index}") for index in range(5)]
+    child_todo = create_todo(title="Child Todo", parent_id=todos[0].id)
+    original_values_list = [with_child_counts(get_original_values_todo(todo)) for todo in todos]
+    original_values_list[0]["child_count"] = 1
+
+    response_pages = [client.get("/todos?limit=2")]
+    while client.authenticated and response_pages[-1].json["next_cursor"]:
+        response_pages.append(client.get(f"/todos?limit=2&cursor={response_pages[-1].json['next_cursor']}"))
+
+    if client.authenticated:
+        assert [len(response.json["todos"]) for response in response_pages] == [2, 2, 1]
+        assert [todo for response in response_pages for todo in response.json["todos"]] == original_values_list
+        assert response_pages[-1].json["next_cursor"] is None
+        assert child_todo.id not in [todo["id"] for response in response_pages for todo in response.json["todos"]]
+    else:
+        assert_unauthenticated_response(client, response_pages[0])
+
+
+def test_page_exactly_filled_has_no_next_cursor(client, multiple_sample_todos):
+
+    response = client.get("/todos?limit=3")
+
+    if client.authenticated:
+        assert response.status_code == 200
+        assert len(response.json["todos"]) == 3
+        assert response.json["next_cursor"] is None
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "a", "501"])
+def test_cannot_use_invalid_limit(client, limit):
+
+    response = client.get(f"/todos?limit={limit}")
+
+    if client.authenticated:
+        assert_unsuccessful_response_generic(response, 400, "Error: Limit must be an integer between 1 and 500.")
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "bm90IGpzb24=", "eyJpZCI6ICIxIn0=",
+                                    encode_cursor(True), encode_cursor(0), encode_cursor(10**30)])
+def test_cannot_use_invalid_cursor(client, cursor):
+
+    response = client.get(f"/todos?limit=2&cursor={cursor}")
+
+    if client.authenticated:
+        assert_unsuccessful_response_generic(response, 400, "Error: Invalid cursor.")
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+@pytest.fixture
+def streaming_app(app):
+    app.config['STREAM_TODO_LISTS'] = True
+    app.config['STREAM_BATCH_SIZE'] = 2
+    return app
+
+
+def test_streams_list_of_todos(streaming_app, client, create_todo):
+
+    todos = [create_todo(title=f"Test Title {index}") for index in range(5)]
+    create_todo(title="Child Todo 1", parent_id=todos[1].id, checked=True)
+    create_todo(title="Child Todo 2", parent_id=todos[1].id)
+    original_values_list = [with_child_counts(get_original_values_todo(todo)) for todo in todos]
+    original_values_list[1] = {**original_values_list[1], "child_count": 2, "checked_child_count": 1}
+
+    with count_queries() as statements:
+        response = client.get("/todos")
+        is_streamed = response.is_streamed
+        # the body is only generated as it is read
+        response.get_data()
+
+    if client.authenticated:
+        assert is_streamed
+        assert_successful_response_get_all_todos(response, original_values_list)
+        # user lookup and todo version, then for each batch of two a query for the todos and one for their
+        # child counts
+        assert len(statements) == 2 + 3 * 2
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_streams_list_in_whole_batches(streaming_app, authenticated_client, create_todo):
+
+    todos = [create_todo(title=f"Test Title {index}") for index in range(4)]
+
+    with count_queries() as statements:
+        response = authenticated_client.get("/todos")
+        response.get_data()
+
+    assert_successful_response_get_all_todos(response, [with_child_counts(get_original_values_todo(todo))
+                                                        for todo in todos])
+    # two full batches, then an empty one to find the end; the empty batch needs no child counts
+    assert len(statements) == 2 + 2 * 2 + 1
+    assert all("LIMIT" in statement for statement in statements[2::2])
+
+
+def test_streams_empty_list(streaming_app, client):
+
+    response = client.get("/todos")
+
+    if client.authenticated:
+        assert_successful_response_get_all_todos(response)
+    else:
+        assert_unauthenticated_response(client, response)
@@ -0,0 +1,160 @@
+import json
+import sys
+
+import pytest
+
+from todoApp.extensions.json_provider import make_json_provider
+from todoApp.models.Todo import *
+from todoApp.utils.data_generator import insert_todo_forest
+from tests.conftest import *
+
+
+def with_children(todo_values, children):
+    return {**todo_values, "children": children}
+
+
+@pytest.fixture
+def sample_tree(create_todo):
+    parent_todo = create_todo(title="Parent Todo")
+    baby_todo_1 = create_todo(title="Baby Todo 1", parent_id=parent_todo.id)
+    baby_todo_2 = create_todo(title="Baby Todo 2", parent_id=parent_todo.id, checked=True)
+    grandchild_todo = create_todo(title="Grandchild Todo", parent_id=baby_todo_1.id)
+    return [parent_todo, baby_todo_1, baby_todo_2, grandchild_todo]
+
+
+def test_successful_get_todo_tree(client, sample_tree):
+
+    parent_values, baby_1_values, baby_2_values, grandchild_values = [get_original_values_todo(todo)
+                                                                      for todo in sample_tree]
+    expected_json = with_children(parent_values, [
+        with_children(baby_1_values, [with_children(grandchild_values, [])]),
+        with_children(baby_2_values, []),
+    ])
+
+    response = client.get(f"/todos/{sample_tree[0].id}/tree")
+
+    if client.authenticated:
+        assert_successful_response_generic(response, 200, expected_json)
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_get_todo_tree_with_depth(client, sample_tree):
+
+    parent_values, baby_1_values, baby_2_values, grandchild_values = [get_original_values_todo(todo)
+                                                                      for todo in sample_tree]
+    # todos at the depth cut-off are not expanded, so have no children key
+    expected_json = with_children(parent_values, [baby_1_values, baby_2_values])
+
+    response = client.get(f"/todos/{sample_tree[0].id}/tree?depth=1")
+
+    if client.authenticated:
+        assert_successful_response_generic(response, 200, expected_json)
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_get_todo_tree_depth_zero(client, sample_tree):
+
+    parent_values = get_original_values_todo(sample_tree[0])
+
+    response = client.get(f"/todos/{sample_tree[0].id}/tree?depth=0")
+
+    if client.authenticated:
+        assert_successful_response_generic(response, 200, parent_values)
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_deep_tree_loaded_with_constant_queries(client, create_todo):
+
+    chain = [create_todo(title="Chain Todo 0")]
+    for index in range(1, 200):
+        chain.append(create_todo(title=f"Chain Todo {index}", parent_id=chain[-1].id))
+
+    root_id = chain[0].id
+
+    with count_queries() as statements:
+        response = client.get(f"/todos/{root_id}/tree")
+
+    if client.authenticated:
+        assert response.status_code == 200
+        node, depth = response.json, 0
+        while node["children"]:
+            node, depth = node["children"][0], depth + 1
+        assert depth == 199
+        # user lookup, todo version, root todo, whole subtree
+        assert len(statements) == 4
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_todo_tree_matches_jsonify(authenticated_client, sample_tree):
+
+    response = authenticated_client.get(f"/todos/{sample_tree[0].id}/tree")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    assert response.get_data(as_text=True) == json.dumps(response.json, separators=(",", ":"), sort_keys=True) + "\n"
+
+
+@pytest.mark.parametrize("provider_name", ["stdlib", "orjson"])
+def test_very_deep_tree(app, authenticated_client, provider_name):
+
+    # deep enough that json.dumps and orjson would both give up on the nesting
+    app.config['JSON_PROVIDER'] = provider_name
+    app.json = make_json_provider(app)
+    chain = [level[0] for level in insert_todo_forest(authenticated_client.current_user.id, roots=1, fan_out=1,
+                                                      depth=600)]
+    db.session.commit()
+
+    response = authenticated_client.get(f"/todos/{chain[0]}/tree")
+
+    assert response.status_code == 200
+    # json.loads recurses as well, so reading the response back needs more room than the default limit
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(10000)
+    try:
+        node = json.loads(response.get_data(as_text=True))
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+    node_ids = [node["id"]]
+    while node["children"]:
+        node = node["children"][0]
+        node_ids.append(node["id"])
+    assert node_ids == chain
+
+
+def test_todo_tree_not_found(client):
+
+    nonexistant_id = 1
+
+    response = client.get(f"/todos/{nonexistant_id}/tree")
+
+    if client.authenticated:
+        assert_no_result_found_response(response, nonexistant_id)
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+def test_cannot_use_invalid_route_parameter_type(client):
+
+    invalid_id = "a"
+
+    response = client.get(f"/todos/{invalid_id}/tree")
+
+    if client.authenticated:
+        assert_bad_parameter_response(response)
+    else:
+        assert_unauthenticated_response(client, response)
+
+
+@pytest.mark.parametrize("depth", ["-1", "a", "10001", "99999999999999999999"])
+def test_cannot_use_invalid_depth(client, sample_tree, depth):
+
+    response = client.get(f"/todos/{sample_tree[0].id}/tree?depth={depth}")
+
+    if client.authenticated:
+        assert_unsuccessful_response_generic(response, 400, "Error: Depth must be an integer between 0 and 10000.")
+    else:
+        assert_unauthenticated_response(client, response)
@@ -1,5 +1,3 @@
-import pytest
-
 from tests.conftest import *
 
 def assert_current_parent_relationship(baby_todo, parent_todo):
@@ -74,6 +72,34 @@ def test_remove_parent_todo_from_existing_todo(client, create_todo):
         assert_unauthenticated_response(client, response)
 
 
+def test_cannot_move_todo_to_top_level_with_taken_title(authenticated_client, create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+    baby_todo = create_todo(title="Test Title", parent_id=parent_todo.id)
+    create_todo(title="Test Title")
+    baby_original_values = get_original_values_todo(baby_todo)
+
+    response = authenticated_client.patch(f"/todos/{baby_todo.id}/toggle_parent", json={"parent_id": None})
+
+    assert_unsuccessful_response_generic(response, 400, "Error: Your todo title must be unique.")
+    assert_record_unchanged(baby_todo, baby_original_values)
+
+
+def test_toggle_parent_does_not_read_todo_back(authenticated_client, create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+    baby_todo = create_todo(title="Baby Todo", parent_id=parent_todo.id)
+    authenticated_client.get("/todos")
+
+    with count_queries() as statements:
+        response = authenticated_client.patch(f"/todos/{baby_todo.id}/toggle_parent", json={"parent_id": None})
+
+    assert response.status_code == 200
+    assert "parent_id" not in response.json
+    # nothing is read once the changes have been written
+    assert statements[-1].startswith("UPDATE user")
+
+
 def test_replace_parent_todo_on_existing_todo(client, create_todo):
 
     parent_todo = create_todo(title="Parent Todo")
@@ -186,4 +212,22 @@ def test_cannot_create_circular_relationship_multi_level(client, create_todo):
     else:
         assert_record_unchanged(great_grandchild_todo, great_grandchild_original_values)
         assert_record_unchanged(parent_todo, parent_original_values)
-        assert_unauthenticated_response(client, response)
\ No newline at end of file
+        assert_unauthenticated_response(client, response)
+
+def test_move_todo_to_other_branch_of_same_tree(client, create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+    baby_todo_1 = create_todo(title="Baby Todo 1", parent_id=parent_todo.id)
+    baby_todo_2 = create_todo(title="Baby Todo 2", parent_id=parent_todo.id)
+    grandchild_todo = create_todo(title="Grandchild Todo", parent_id=baby_todo_1.id)
+
+    grandchild_original_values = get_original_values_todo(grandchild_todo)
+
+    response = client.patch(f"/todos/{grandchild_todo.id}/toggle_parent", json={"parent_id": baby_todo_2.id})
+
+    if client.authenticated:
+        assert_successful_response_add_parent(response, grandchild_original_values, baby_todo_2)
+        assert grandchild_todo.parent_id == baby_todo_2.id
+    else:
+        assert_record_unchanged(grandchild_todo, grandchild_original_values)
+        assert_unauthenticated_response(client, response)
@@ -0,0 +1,154 @@
+import jwt
+import pytest
+from flask import current_app
+from sqlalchemy.orm.attributes import set_committed_value
+
+from tests.conftest import *
+from todoApp.blueprints import user_routes
+from todoApp.models.RefreshToken import RefreshToken
+
+
+@pytest.fixture
+def login_response(not_logged_in_client, create_user):
+    response = not_logged_in_client.post('/login', auth=("janwest", "Password123"))
+    assert response.status_code == 200
+    return response.json
+
+
+def assert_valid_access_token(token, public_id):
+    assert jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])["sub"] == public_id
+
+
+def test_login_returns_refresh_token(login_response):
+
+    assert login_response["refresh_token"]
+    stored_tokens = db.session.scalars(db.select(RefreshToken)).all()
+    assert len(stored_tokens) == 1
+    # only a digest of the token is kept
+    assert stored_tokens[0].token_hash != login_response["refresh_token"]
+
+
+def test_successful_refresh(not_logged_in_client, create_user, login_response, monkeypatch):
+
+    password_hasher = current_app.extensions['password_hasher']
+    monkeypatch.setattr(password_hasher, "check_password", None)
+
+    response = not_logged_in_client.post('/refresh', json={"refresh_token": login_response["refresh_token"]})
+
+    assert response.status_code == 200
+    assert_valid_access_token(response.json["token"], create_user.public_id)
+    assert response.json["refresh_token"] != login_response["refresh_token"]
+    authenticated_response = not_logged_in_client.get('/todos',
+                                                      headers={"Authorization": f"Bearer {response.json['token']}"})
+    assert authenticated_response.status_code == 200
+
+
+def test_refresh_token_rotates(not_logged_in_client, login_response):
+
+    first_refresh = not_logged_in_client.post('/refresh', json={"refresh_token": login_response["refresh_token"]})
+    second_refresh = not_logged_in_client.post('/refresh', json={"refresh_token": first_refresh.json["refresh_token"]})
+
+    assert first_refresh.status_code == 200
+    assert second_refresh.status_code == 200
+
+
+def test_reused_refresh_token_revokes_family(not_logged_in_client, login_response):
+
+    first_refresh = not_logged_in_client.post('/refresh', json={"refresh_token": login_response["refresh_token"]})
+
+    reused_response = not_logged_in_client.post('/refresh', json={"refresh_token": login_response["refresh_token"]})
+    replacement_response = not_logged_in_client.post('/refresh',
+                                                     json={"refresh_token": first_refresh.json["refresh_token"]})
+
+    assert_unsuccessful_response_generic(reused_response, 401, "Error: Invalid refresh token.")
+    assert_unsuccessful_response_generic(replacement_response, 401, "Error: Invalid refresh token.")
+
+
+def test_refresh_token_claimed_by_concurrent_refresh(not_logged_in_client, login_response, monkeypatch):
+
+    # another /refresh with the same token commits its rotation after this one has read the token as unrevoked
+    find_refresh_token = user_routes.find_refresh_token
+
+    def find_then_lose_race(refresh_token):
+        found_refresh_token = find_refresh_token(refresh_token)
+        db.session.execute(db.update(RefreshToken).values(revoked=True)
+                           .execution_options(synchronize_session=False))
+        db.session.add(RefreshToken(token_hash="winner", family_id=found_refresh_token[0].family_id,
+                                    user_id=found_refresh_token[0].user_id,
+                                    expires_at=datetime.utcnow() + timedelta(days=1)))
+        db.session.commit()
+        # as this request saw it, before the other one committed
+        set_committed_value(found_refresh_token[0], "revoked", False)
+        return found_refresh_token
+
+    monkeypatch.setattr(user_routes, "find_refresh_token", find_then_lose_race)
+
+    response = not_logged_in_client.post('/refresh', json={"refresh_token": login_response["refresh_token"]})
+
+    assert_unsuccessful_response_generic(response, 401, "Error: Invalid refresh token.")
+    # no new token was issued, and the one the other request got is revoked along with the rest of the family
+    stored_tokens = db.session.scalars(db.select(RefreshToken)).all()
+    assert len(stored_tokens) == 2
+    assert all(stored_token.revoked for stored_token in stored_tokens)
+
+
+def test_expired_refresh_token(not_logged_in_client, login_response):
+
+    stored_token = db.session.scalars(db.select(RefreshToken)).one()
+    stored_token.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    response = not_logged_in_client.post('/refresh', json={"refresh_token": login_response["refresh_token"]})
+
+    assert_unsuccessful_response_generic(response, 401, "Error: Refresh token has expired.")
+
+
+@pytest.mark.parametrize("request_json, error_message", [({}, "Error: Refresh token is missing."),
+                                                         ({"refresh_token": "made up"},
+                                                          "Error: Invalid refresh token.")])
+def test_cannot_refresh_without_valid_token(not_logged_in_client, login_response, request_json, error_message):
+
+    response = not_logged_in_client.post('/refresh', json=request_json)
+
+    assert_unsuccessful_response_generic(response, 401, error_message)
+
+
+@pytest.mark.parametrize("route", ["/refresh", "/logout"])
+@pytest.mark.parametrize("request_json, error_message", [
+    ([], "Error: Request body must be a JSON object."),
+    ("refresh_token", "Error: Request body must be a JSON object."),
+    ({"refresh_token": ["made up"]}, "Error: Refresh token must be a string."),
+])
+def test_cannot_send_malformed_body(not_logged_in_client, login_response, route, request_json, error_message):
+
+    response = not_logged_in_client.post(route, json=request_json)
+
+    assert_unsuccessful_response_generic(response, 400, error_message)
+    assert db.session.scalars(db.select(RefreshToken.revoked)).all() == [False]
+
+
+def test_logout_revokes_refresh_token(not_logged_in_client, login_response):
+
+    logout_response = not_logged_in_client.post('/logout', json={"refresh_token": login_response["refresh_token"]})
+    refresh_response = not_logged_in_client.post('/refresh', json={"refresh_token": login_response["refresh_token"]})
+
+    assert_successful_response_generic(logout_response, 200, "Refresh token revoked.")
+    assert_unsuccessful_response_generic(refresh_response, 401, "Error: Invalid refresh token.")
+
+
+def test_logout_only_revokes_own_login(not_logged_in_client, create_user, login_response):
+
+    other_login = not_logged_in_client.post('/login', auth=("janwest", "Password123")).json
+
+    not_logged_in_client.post('/logout', json={"refresh_token": login_response["refresh_token"]})
+    response = not_logged_in_client.post('/refresh', json={"refresh_token": other_login["refresh_token"]})
+
+    assert response.status_code == 200
+
+
+def test_deleting_user_deletes_refresh_tokens(app, create_user, login_response):
+
+    db.session.delete(create_user)
+    db.session.commit()
+
+    assert db.session.scalars(db.select(RefreshToken)).all() == []
@@ -0,0 +1,169 @@
+import pytest
+
+from tests.conftest import *
+from todoApp.utils.cascading_functions import check_todo_subtree, is_in_todo_subtree, load_todo_subtree
+
+
+def make_chain(create_todo, length):
+    chain = [create_todo(title="Chain Todo 0")]
+    for index in range(1, length):
+        chain.append(create_todo(title=f"Chain Todo {index}", parent_id=chain[-1].id))
+    return chain
+
+
+def test_load_subtree_builds_children_in_memory(create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+    baby_todo_1 = create_todo(title="Baby Todo 1", parent_id=parent_todo.id)
+    baby_todo_2 = create_todo(title="Baby Todo 2", parent_id=parent_todo.id)
+    grandchild_todo = create_todo(title="Grandchild Todo", parent_id=baby_todo_1.id)
+    create_todo(title="Unrelated Todo")
+    db.session.expire_all()
+
+    with count_queries() as statements:
+        load_todo_subtree(parent_todo)
+        child_ids = [child.id for child in parent_todo.children]
+        grandchild_ids = [[grandchild.id for grandchild in child.children] for child in parent_todo.children]
+        great_grandchild_ids = [child.id for child in parent_todo.children[0].children[0].children]
+
+    assert child_ids == [baby_todo_1.id, baby_todo_2.id]
+    assert grandchild_ids == [[grandchild_todo.id], []]
+    assert great_grandchild_ids == []
+    # one statement to refresh the expired parent, one for the whole subtree
+    assert len(statements) == 2
+
+
+def test_load_subtree_query_count_does_not_grow_with_depth(create_todo):
+
+    chain = make_chain(create_todo, 20)
+    root = chain[0]
+    db.session.refresh(root)
+
+    with count_queries() as statements:
+        load_todo_subtree(root)
+        node = root
+        depth = 0
+        while node.children:
+            node = node.children[0]
+            depth += 1
+
+    assert depth == 19
+    assert len(statements) == 1
+
+
+def test_load_subtree_only_loads_own_todos(create_todo, create_user_flex):
+
+    other_user = create_user_flex(username="otheruser")
+    parent_todo = create_todo(title="Parent Todo")
+    create_todo(title="Other User Todo", user_id=other_user.id, parent_id=parent_todo.id)
+    db.session.refresh(parent_todo)
+
+    load_todo_subtree(parent_todo)
+
+    assert parent_todo.children == []
+
+
+def test_check_subtree_is_one_statement_and_scoped_to_subtree(create_todo):
+
+    chain = make_chain(create_todo, 20)
+    sibling_todo = create_todo(title="Sibling Todo", parent_id=chain[0].id)
+    unrelated_todo = create_todo(title="Unrelated Todo")
+    root = chain[1]
+    db.session.refresh(root)
+
+    with count_queries() as statements:
+        check_todo_subtree(root)
+    db.session.commit()
+
+    assert len(statements) == 1
+    assert chain[0].checked is False
+    assert sibling_todo.checked is False
+    assert unrelated_todo.checked is False
+    assert all(todo.checked for todo in chain[1:])
+
+
+def test_is_in_subtree_walks_ancestors(create_todo):
+
+    chain = make_chain(create_todo, 5)
+    branch_todo = create_todo(title="Branch Todo", parent_id=chain[1].id)
+    user_id = chain[0].user_id
+
+    assert is_in_todo_subtree(chain[4].id, chain[0].id, user_id)
+    assert is_in_todo_subtree(chain[4].id, chain[4].id, user_id)
+    assert is_in_todo_subtree(branch_todo.id, chain[1].id, user_id)
+    assert not is_in_todo_subtree(branch_todo.id, chain[2].id, user_id)
+    assert not is_in_todo_subtree(chain[0].id, chain[4].id, user_id)
+
+
+def test_is_in_subtree_does_not_visit_subtree(create_todo):
+
+    parent_todo = create_todo(title="Parent Todo")
+    for index in range(30):
+        create_todo(title=f"Baby Todo {index}", parent_id=parent_todo.id)
+    lone_todo = create_todo(title="Lone Todo")
+    lone_todo_id, parent_todo_id, user_id = lone_todo.id, parent_todo.id, parent_todo.user_id
+
+    with count_queries() as statements:
+        result = is_in_todo_subtree(lone_todo_id, parent_todo_id, user_id)
+
+    assert result is False
+    assert len(statements) == 1
+
+
+def statements_changing_todos(statements):
+    # statements with a CTE start with WITH RECURSIVE, so the UPDATE or DELETE can come further in
+    return [statement for statement in statements
+            if any(change in statement for change in ("UPDATE todo SET", "DELETE FROM todo "))]
+
+
+def test_cascades_without_target_table_subqueries(without_target_table_subqueries, closure_table_setting,
+                                                   authenticated_client, create_todo):
+
+    chain = make_chain(create_todo, 4)
+    other_todo = create_todo(title="Other Todo")
+    other_child_id = create_todo(title="Other Child", parent_id=other_todo.id).id
+
+    with count_queries() as statements:
+        single_response = authenticated_client.patch(f"/todos/{chain[1].id}/check", json={"checked": True})
+        check_response = authenticated_client.patch("/todos/check", json={"ids": [other_todo.id], "checked": True})
+        uncheck_response = authenticated_client.patch("/todos/check", json={"ids": [chain[3].id], "checked": False})
+        delete_response = authenticated_client.delete("/todos", json={"ids": [chain[2].id, other_todo.id]})
+
+    assert [response.status_code for response in (single_response, check_response, uncheck_response)] == [200] * 3
+    assert delete_response.status_code == 200
+    assert all("SELECT" not in statement for statement in statements_changing_todos(statements))
+    remaining_todos = db.session.scalars(db.select(Todo).order_by(Todo.id)).all()
+    assert [(todo.id, todo.checked) for todo in remaining_todos] == [(chain[0].id, False), (chain[1].id, True)]
+    assert db.session.get(Todo, other_child_id) is None
+
+
+@pytest.mark.parametrize("foreign_keys_checked_per_row", [False, True])
+def test_delete_forest_with_foreign_keys_checked(monkeypatch, closure_table_setting, authenticated_client,
+                                                 create_todo, foreign_keys_checked_per_row):
+
+    # TestConfig turns SQLite's foreign key checks on; with foreign_keys_checked_per_row each level has to be
+    # deletable on its own, as it does on MySQL
+    if foreign_keys_checked_per_row:
+        monkeypatch.setattr("todoApp.extensions.db.FOREIGN_KEYS_CHECKED_PER_ROW_DIALECTS", ("sqlite",))
+    assert db.session.execute(db.text("PRAGMA foreign_keys")).scalar() == 1
+    chain = make_chain(create_todo, 4)
+    other_todo = create_todo(title="Other Todo")
+    other_children = [create_todo(title=f"Other Child {index}", parent_id=other_todo.id) for index in range(2)]
+    create_todo(title="Other Grandchild", parent_id=other_children[0].id)
+    # a todo with a lower id than its parent, so deleting in id order wouldn't work either
+    moved_todo = create_todo(title="Moved Todo")
+    remaining_todo = create_todo(title="Remaining Todo")
+    assert authenticated_client.patch(f"/todos/{moved_todo.id}/toggle_parent",
+                                      json={"parent_id": other_children[1].id}).status_code == 200
+    chain_ids, other_todo_id = [todo.id for todo in chain], other_todo.id
+
+    with count_queries() as statements:
+        single_response = authenticated_client.delete(f"/todos/{chain_ids[1]}")
+        bulk_response = authenticated_client.delete("/todos", json={"ids": [other_children[0].id, other_todo_id]})
+
+    assert single_response.status_code == 200
+    assert bulk_response.status_code == 200
+    todo_deletes = [statement for statement in statements if "DELETE FROM todo WHERE" in statement]
+    # the chain below chain[1] is three levels deep, and the other tree is too
+    assert len(todo_deletes) == (6 if foreign_keys_checked_per_row else 2)
+    assert db.session.scalars(db.select(Todo.id).order_by(Todo.id)).all() == [chain_ids[0], remaining_todo.id]
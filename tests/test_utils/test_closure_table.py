@@ -0,0 +1,133 @@
+import pytest
+
+from tests.conftest import *
+from todoApp.models.TodoClosure import TodoClosure
+from todoApp.utils.cascading_functions import is_in_todo_subtree, load_todo_subtree, todo_ancestor_ids
+from todoApp.utils.closure_table import closure_ancestor_ids, closure_descendant_ids, \
+    closure_is_in_subtree, closure_todo_depth
+
+
+@pytest.fixture(autouse=True)
+def closure_table_on(closure_table):
+    pass
+
+
+@pytest.fixture
+def sample_forest(create_todo):
+    # two trees: a bushy one and a chain, plus a lone top-level todo
+    root_1 = create_todo(title="Root 1")
+    child_1 = create_todo(title="Child 1", parent_id=root_1.id)
+    child_2 = create_todo(title="Child 2", parent_id=root_1.id)
+    grandchild_1 = create_todo(title="Grandchild 1", parent_id=child_1.id)
+    grandchild_2 = create_todo(title="Grandchild 2", parent_id=child_1.id)
+    create_todo(title="Great Grandchild", parent_id=grandchild_2.id)
+    create_todo(title="Grandchild 3", parent_id=child_2.id)
+    chain = [create_todo(title="Root 2")]
+    for index in range(6):
+        chain.append(create_todo(title=f"Chain {index}", parent_id=chain[-1].id))
+    create_todo(title="Lone Todo")
+    return db.session.scalars(db.select(Todo).order_by(Todo.id)).all()
+
+
+def adjacency_descendant_ids(todo):
+    load_todo_subtree(todo)
+    descendant_ids = []
+    nodes = list(todo.children)
+    while nodes:
+        node = nodes.pop()
+        descendant_ids.append(node.id)
+        nodes.extend(node.children)
+    return sorted(descendant_ids)
+
+
+def adjacency_ancestor_ids(todo):
+    ancestor_ids = todo_ancestor_ids(todo.id, todo.user_id)
+    rows = db.session.execute(db.select(ancestor_ids.c.id, ancestor_ids.c.parent_id)).all()
+    parent_by_id = {row.id: row.parent_id for row in rows}
+    chain = []
+    parent_id = parent_by_id[todo.id]
+    while parent_id is not None:
+        chain.append(parent_id)
+        parent_id = parent_by_id[parent_id]
+    return chain
+
+
+def assert_closure_matches_adjacency(todos):
+    db.session.expire_all()
+    for todo in todos:
+        assert closure_descendant_ids(todo.id) == adjacency_descendant_ids(todo)
+        assert closure_ancestor_ids(todo.id) == adjacency_ancestor_ids(todo)
+        assert closure_todo_depth(todo.id) == len(adjacency_ancestor_ids(todo))
+        for other_todo in todos:
+            assert closure_is_in_subtree(other_todo.id, todo.id) == \
+                   is_in_todo_subtree(other_todo.id, todo.id, todo.user_id)
+
+
+def test_closure_matches_adjacency_after_inserts(sample_forest):
+
+    assert_closure_matches_adjacency(sample_forest)
+
+
+def test_closure_matches_adjacency_after_moves(target_table_subqueries_setting, authenticated_client, sample_forest):
+
+    todos_by_title = {todo.title: todo for todo in sample_forest}
+
+    # move a subtree into the chain, a chain segment to the top level and a lone todo under a leaf
+    moves = [("Child 1", "Chain 3"), ("Chain 1", None), ("Lone Todo", "Great Grandchild")]
+    with count_queries() as statements:
+        for child_title, parent_title in moves:
+            parent_id = todos_by_title[parent_title].id if parent_title else None
+            response = authenticated_client.patch(f"/todos/{todos_by_title[child_title].id}/toggle_parent",
+                                                  json={"parent_id": parent_id})
+            assert response.status_code == 200
+
+    assert_closure_matches_adjacency(sample_forest)
+    closure_deletes = [statement for statement in statements if statement.startswith("DELETE FROM todo_closure")]
+    assert len(closure_deletes) == 3
+    assert all((statement.count("FROM todo_closure") > 1) == target_table_subqueries_setting
+               for statement in closure_deletes)
+
+
+def test_closure_matches_adjacency_after_deletes(authenticated_client, sample_forest):
+
+    todos_by_title = {todo.title: todo for todo in sample_forest}
+    deleted_ids = {todos_by_title[title].id for title in ["Child 1", "Grandchild 1", "Grandchild 2", "Great Grandchild",
+                                                          "Chain 4", "Chain 5"]}
+    remaining_todos = [todo for todo in sample_forest if todo.id not in deleted_ids]
+
+    for title in ["Child 1", "Chain 4"]:
+        response = authenticated_client.delete(f"/todos/{todos_by_title[title].id}")
+        assert response.status_code == 200
+
+    assert_closure_matches_adjacency(remaining_todos)
+    assert db.session.scalar(db.select(db.func.count()).select_from(TodoClosure).where(
+        db.or_(TodoClosure.ancestor_id.in_(deleted_ids), TodoClosure.descendant_id.in_(deleted_ids))
+    )) == 0
+
+
+def test_closure_detects_circular_relationship(authenticated_client, sample_forest):
+
+    todos_by_title = {todo.title: todo for todo in sample_forest}
+
+    response = authenticated_client.patch(f"/todos/{todos_by_title['Root 1'].id}/toggle_parent",
+                                          json={"parent_id": todos_by_title["Great Grandchild"].id})
+
+    assert_unsuccessful_response_generic(response, 400, "Error: Cannot create circular parent-child relationship.")
+
+
+def test_backfill_rebuilds_closure(app, sample_forest):
+
+    expected_rows = db.session.execute(db.select(TodoClosure.ancestor_id, TodoClosure.descendant_id,
+                                                 TodoClosure.depth).order_by(TodoClosure.ancestor_id,
+                                                                             TodoClosure.descendant_id)).all()
+    db.session.execute(db.delete(TodoClosure))
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["backfill-todo-closure"])
+
+    assert result.exit_code == 0
+    assert "deepest todo is 6 levels down" in result.output
+    assert db.session.execute(db.select(TodoClosure.ancestor_id, TodoClosure.descendant_id,
+                                        TodoClosure.depth).order_by(TodoClosure.ancestor_id,
+                                                                    TodoClosure.descendant_id)).all() == expected_rows
+    assert_closure_matches_adjacency(sample_forest)
@@ -0,0 +1,116 @@
+from tests.conftest import *
+from todoApp.models.TodoClosure import TodoClosure
+from todoApp.utils.closure_table import closure_descendant_ids
+from todoApp.utils.data_generator import commit_generated_data, insert_todo_forest, insert_todo_forests, \
+    insert_users
+from todoApp.utils.password_hashing import get_password_hasher
+
+
+def test_insert_users(app):
+    user_ids = insert_users(3, username_prefix="bench")
+    commit_generated_data()
+    users = db.session.scalars(db.select(User).order_by(User.id)).all()
+    assert [user.id for user in users] == user_ids
+    assert [user.username for user in users] == ["bench_0", "bench_1", "bench_2"]
+    assert len({user.public_id for user in users}) == 3
+    assert all(get_password_hasher().check_password(user._password, "Password123") for user in users)
+
+
+def test_insert_users_after_existing_users(app, create_user, not_logged_in_client):
+    # ids are handed out without RETURNING, carrying on from the users that already exist
+    user_ids = insert_users(2)
+    commit_generated_data()
+    assert user_ids == [create_user.id + 1, create_user.id + 2]
+    assert db.session.get(User, user_ids[1]).username == "user_1"
+    response = not_logged_in_client.post("/signup", json={"first_name": "After", "last_name": "Seeding",
+                                                          "username": "afterseeding",
+                                                          "password_plaintext": "Password123",
+                                                          "confirm_password": "Password123"})
+    assert response.status_code == 201
+    assert db.session.scalars(db.select(User.id).filter_by(username="afterseeding")).one() == create_user.id + 3
+
+
+def test_insert_todo_forest_shape(app):
+    user_id = insert_users(1)[0]
+    levels = insert_todo_forest(user_id, roots=2, fan_out=3, depth=3)
+    commit_generated_data()
+    assert [len(level) for level in levels] == [2, 6, 18]
+    todos = {todo.id: todo for todo in db.session.scalars(db.select(Todo))}
+    assert len(todos) == 26
+    assert all(todos[todo_id].parent_id is None for todo_id in levels[0])
+    for parent_level, child_level in zip(levels, levels[1:]):
+        assert {todos[todo_id].parent_id for todo_id in child_level} == set(parent_level)
+    assert len({todos[todo_id].title for todo_id in levels[0]}) == 2
+
+
+def test_insert_todo_forest_chain(app):
+    user_id = insert_users(1)[0]
+    chain = [level[0] for level in insert_todo_forest(user_id, roots=1, fan_out=1, depth=50)]
+    commit_generated_data()
+    assert len(chain) == 50
+    assert [db.session.get(Todo, todo_id).parent_id for todo_id in chain] == [None, *chain[:-1]]
+
+
+def test_insert_todo_forest_after_existing_todos(app, create_todo):
+    existing_todo = create_todo()
+    levels = insert_todo_forest(existing_todo.user_id, roots=2, fan_out=2, depth=2)
+    commit_generated_data()
+    assert levels == [[existing_todo.id + 1, existing_todo.id + 2], list(range(existing_todo.id + 3,
+                                                                                existing_todo.id + 7))]
+    assert create_todo(title="After Seeding").id == existing_todo.id + 7
+
+
+def test_insert_todo_forest_checked_ratio(app):
+    user_id = insert_users(1)[0]
+    insert_todo_forest(user_id, roots=200, checked_ratio=0.5)
+    commit_generated_data()
+    checked_count = db.session.scalar(db.select(db.func.count()).select_from(Todo).filter_by(checked=True))
+    assert 60 < checked_count < 140
+
+
+def test_commit_generated_data_fills_closure_table(app, closure_table):
+    user_id = insert_users(1)[0]
+    levels = insert_todo_forest(user_id, roots=1, fan_out=2, depth=3)
+    commit_generated_data()
+    root_id = levels[0][0]
+    assert closure_descendant_ids(root_id) == sorted(levels[1] + levels[2])
+    # one row per todo for itself plus one per ancestor
+    assert db.session.scalar(db.select(db.func.count()).select_from(TodoClosure)) == 1 + 2 * 2 + 4 * 3
+
+
+def test_insert_todo_forests(app, create_todo):
+    # ids continue from todos that already exist
+    existing_todo = create_todo()
+    user_ids = insert_users(2, username_prefix="bench")
+    todo_count = insert_todo_forests(user_ids, roots=3, fan_out=2, depth=3, checked_ratio=0.5, chunk_size=7)
+    commit_generated_data()
+    assert todo_count == 2 * 3 * 7
+    for user_id in user_ids:
+        todos = db.session.scalars(db.select(Todo).filter_by(user_id=user_id).order_by(Todo.id)).all()
+        assert len(todos) == 21
+        assert min(todo.id for todo in todos) > existing_todo.id
+        roots = [todo for todo in todos if todo.parent_id is None]
+        assert len(roots) == 3
+        assert all(len(todo.children) == 2 for todo in roots)
+    # the new ids are free for ordinary inserts afterwards
+    assert create_todo(title="After Seeding").id == existing_todo.id + todo_count + 1
+
+
+def test_seed_command(app, closure_table):
+    result = app.test_cli_runner().invoke(args=["seed", "--users", "3", "--roots", "2", "--fan-out", "2",
+                                                "--depth", "3", "--username-prefix", "seeded"])
+    assert result.exit_code == 0
+    assert "Created 3 users and 42 todos" in result.output
+    assert db.session.scalar(db.select(db.func.count()).select_from(Todo)) == 42
+    users = db.session.scalars(db.select(User).order_by(User.id)).all()
+    assert [user.username for user in users] == ["seeded_0", "seeded_1", "seeded_2"]
+    # every todo and every ancestor pair is in the closure table
+    assert db.session.scalar(db.select(db.func.count()).select_from(TodoClosure)) == 3 * (2 + 2 * 2 * 2 + 4 * 2 * 3)
+
+
+def test_seed_command_taken_usernames(app):
+    app.test_cli_runner().invoke(args=["seed", "--users", "2", "--depth", "1"])
+    result = app.test_cli_runner().invoke(args=["seed", "--users", "2", "--depth", "1"])
+    assert result.exit_code == 1
+    assert "Usernames starting user_ are already taken" in result.output
+    assert db.session.scalar(db.select(db.func.count()).select_from(User)) == 2
@@ -0,0 +1,67 @@
+import pytest
+
+from tests.conftest import *
+from todoApp.utils.password_hashing import PasswordHasher
+
+
+@pytest.mark.parametrize("executor_type", [None, "thread", "process"])
+def test_hash_and_check_password(executor_type):
+
+    password_hasher = PasswordHasher(1000, executor_type, workers=2)
+
+    password_hash = password_hasher.hash_password("Password123")
+
+    assert password_hash.startswith("pbkdf2:sha256:1000$")
+    assert password_hasher.check_password(password_hash, "Password123") is True
+    assert password_hasher.check_password(password_hash, "Password1234") is False
+    password_hasher.shutdown()
+
+
+def test_needs_rehash():
+
+    password_hasher = PasswordHasher(1000)
+
+    assert password_hasher.needs_rehash(PasswordHasher(1000).hash_password("Password123")) is False
+    assert password_hasher.needs_rehash(PasswordHasher(2000).hash_password("Password123")) is True
+    assert password_hasher.needs_rehash("scrypt:32768:8:1$salt$hash") is True
+
+
+def test_unknown_executor_type():
+
+    with pytest.raises(ValueError):
+        PasswordHasher(1000, "fibre")
+
+
+def test_login_upgrades_password_hash(app, not_logged_in_client, create_user):
+
+    app.extensions['password_hasher'] = PasswordHasher(2000, "thread")
+
+    response = not_logged_in_client.post('/login', auth=("janwest", "Password123"))
+
+    db.session.refresh(create_user)
+    assert response.status_code == 200
+    assert create_user._password.startswith("pbkdf2:sha256:2000$")
+    assert create_user.check_password("Password123") is True
+
+
+def test_login_keeps_current_password_hash(not_logged_in_client, create_user):
+
+    original_hash = create_user._password
+
+    response = not_logged_in_client.post('/login', auth=("janwest", "Password123"))
+
+    db.session.refresh(create_user)
+    assert response.status_code == 200
+    assert create_user._password == original_hash
+
+
+def test_failed_login_does_not_upgrade_password_hash(app, not_logged_in_client, create_user):
+
+    original_hash = create_user._password
+    app.extensions['password_hasher'] = PasswordHasher(2000, "thread")
+
+    response = not_logged_in_client.post('/login', auth=("janwest", "Password1234"))
+
+    db.session.refresh(create_user)
+    assert response.status_code == 401
+    assert create_user._password == original_hash
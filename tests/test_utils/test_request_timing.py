@@ -0,0 +1,105 @@
+import json
+import logging
+import time
+
+import pytest
+from flask import g
+
+from tests.conftest import *
+from todoApp.utils.request_timing import RequestTiming, timed
+
+
+class RequestTimingConfig(TestConfig):
+    REQUEST_TIMING = True
+
+
+# every test in this module gets an app with the instrumentation switched on
+@pytest.fixture()
+def app():
+    test_app = create_app(RequestTimingConfig)
+    with test_app.app_context():
+        yield test_app
+    test_app.extensions['password_hasher'].shutdown()
+
+
+def parse_server_timing(response):
+    metrics = {}
+    for metric in response.headers["Server-Timing"].split(", "):
+        name, *params = metric.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+def test_request_timing_off_by_default():
+    default_app = create_app(TestConfig)
+    with default_app.app_context():
+        response = default_app.test_client().get('/todos')
+    default_app.extensions['password_hasher'].shutdown()
+    assert response.status_code == 401
+    assert "Server-Timing" not in response.headers
+
+
+def test_server_timing_counts_statements(authenticated_client, create_todo):
+    parent = create_todo(title="Parent")
+    create_todo(title="Child", parent_id=parent.id)
+    with count_queries() as statements:
+        response = authenticated_client.get('/todos')
+    assert response.status_code == 200
+    metrics = parse_server_timing(response)
+    assert list(metrics) == ["db", "total", "jwt", "hash", "serialize"]
+    assert metrics["db"]["desc"] == f'"{len(statements)} queries"'
+    assert float(metrics["serialize"]["dur"]) > 0
+    assert float(metrics["hash"]["dur"]) == 0
+    assert float(metrics["total"]["dur"]) >= float(metrics["db"]["dur"])
+
+
+def test_server_timing_on_login(not_logged_in_client, create_user):
+    response = not_logged_in_client.post('/login', auth=(create_user.username, "Password123"))
+    assert response.status_code == 200
+    metrics = parse_server_timing(response)
+    assert float(metrics["hash"]["dur"]) > 0
+    assert float(metrics["jwt"]["dur"]) > 0
+
+
+def test_server_timing_on_error_response(authenticated_client):
+    response = authenticated_client.get('/todos/1000')
+    assert response.status_code == 404
+    assert "db" in parse_server_timing(response)
+
+
+def test_request_timing_log_line(authenticated_client, create_todo, caplog):
+    todo = create_todo()
+    with caplog.at_level(logging.INFO, logger="todoApp.request_timing"):
+        response = authenticated_client.patch(f'/todos/{todo.id}/check', json={"checked": True})
+    assert response.status_code == 200
+    [record] = [record for record in caplog.records if record.name == "todoApp.request_timing"]
+    logged = json.loads(record.getMessage())
+    assert logged["method"] == "PATCH"
+    assert logged["path"] == f"/todos/{todo.id}/check"
+    assert logged["endpoint"] == "todos.check_todo"
+    assert logged["status"] == 200
+    assert logged["db_statements"] == int(parse_server_timing(response)["db"]["desc"].split()[0].strip('"'))
+    assert set(logged) >= {"total_ms", "db_ms", "jwt_ms", "hash_ms", "serialize_ms"}
+
+
+def test_statements_after_request_not_counted(authenticated_client):
+    authenticated_client.get('/todos')
+    assert "request_timing" not in g
+    db.session.scalars(db.select(Todo)).all()
+
+
+def test_timed_leaves_out_sql_and_nested_steps(app, create_user):
+    with app.test_request_context():
+        g.request_timing = request_timing = RequestTiming()
+        started = time.perf_counter()
+        with timed("serialize"):
+            time.sleep(0.01)
+            # already being timed, so not counted twice
+            with timed("serialize"):
+                time.sleep(0.01)
+            db.session.scalar(db.select(db.func.count()).select_from(User))
+        elapsed = time.perf_counter() - started
+    assert request_timing.statement_count == 1
+    assert request_timing.db_time > 0
+    assert 0.02 <= request_timing.step_times["serialize"] <= elapsed - request_timing.db_time
+    assert request_timing.step_times["jwt"] == 0
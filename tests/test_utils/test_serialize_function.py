@@ -0,0 +1,40 @@
+import pytest
+
+from tests.conftest import *
+from todoApp.models.Todo import serialize_todo_columns
+from todoApp.models.User import serialize_user_columns
+from todoApp.utils.serialize_function import serialize_model
+
+
+def test_compiled_serializer_matches_serialize_model(create_todo):
+
+    todos = [create_todo(), create_todo(title="No Description", description=None, checked=True)]
+    todos.append(create_todo(title="Child Todo", parent_id=todos[0].id))
+
+    for todo in todos:
+        db.session.refresh(todo)
+        assert serialize_todo_columns(todo) == serialize_model(todo, Todo)
+
+
+def test_compiled_serializer_skips_private_columns(app, create_user):
+
+    db.session.refresh(create_user)
+    serialized_user = serialize_user_columns(create_user)
+
+    assert serialized_user == serialize_model(create_user, User)
+    assert "_password" not in serialized_user
+
+
+def test_compiled_serializer_loads_expired_attributes(create_todo):
+
+    todo = create_todo()
+    original_values = get_original_values_todo(todo)
+    db.session.expire(todo)
+
+    assert serialize_todo_columns(todo) == original_values
+
+
+def test_compiled_serializer_rejects_other_types(app, create_user):
+
+    with pytest.raises(TypeError):
+        serialize_todo_columns(create_user)
@@ -0,0 +1,174 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from tests.conftest import *
+from todoApp.models.SchemaVersion import SCHEMA_VERSION, SchemaVersion
+
+
+def make_file_database_app(database_path, schema_startup):
+    class FileDatabaseConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database_path}"
+        SQLALCHEMY_ECHO = False
+        SCHEMA_STARTUP = schema_startup
+
+    test_app = create_app(FileDatabaseConfig)
+    test_app.extensions['password_hasher'].shutdown()
+    return test_app
+
+
+@contextmanager
+def count_startup_queries():
+    # create_app makes a new engine, so listen on every engine rather than db.engine
+    statements = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record_statement)
+
+
+def test_create_missing_sets_up_new_database(tmp_path):
+
+    test_app = make_file_database_app(tmp_path / "todo.db", "create_missing")
+
+    with test_app.app_context():
+        assert {"user", "todo", "todo_closure", "refresh_token", "schema_version"} <= \
+               set(inspect(db.engine).get_table_names())
+        assert db.session.get(SchemaVersion, 1).version == SCHEMA_VERSION
+
+
+def test_create_missing_keeps_data_and_skips_ddl_when_current(tmp_path):
+
+    test_app = make_file_database_app(tmp_path / "todo.db", "create_missing")
+    with test_app.app_context():
+        db.session.add(User(first_name="Jan", last_name="West", username="janwest", password_plaintext="Password123"))
+        db.session.commit()
+        db.engine.dispose()
+
+    with count_startup_queries() as statements:
+        restarted_app = make_file_database_app(tmp_path / "todo.db", "create_missing")
+
+    # just the schema version lookup
+    assert len(statements) == 1
+    with restarted_app.app_context():
+        assert db.session.scalars(db.select(User.username)).all() == ["janwest"]
+
+
+def test_create_missing_adds_missing_indexes(tmp_path):
+
+    test_app = make_file_database_app(tmp_path / "todo.db", "create_missing")
+    with test_app.app_context():
+        db.session.execute(db.text("DROP INDEX uq_todo_user_id_top_level_title"))
+        db.session.execute(db.text("DROP TABLE refresh_token"))
+        db.session.execute(db.update(SchemaVersion).values(version=SCHEMA_VERSION - 1))
+        db.session.commit()
+        db.engine.dispose()
+
+    restarted_app = make_file_database_app(tmp_path / "todo.db", "create_missing")
+
+    with restarted_app.app_context():
+        assert "uq_todo_user_id_top_level_title" in [index["name"] for index in inspect(db.engine).get_indexes("todo")]
+        assert "refresh_token" in inspect(db.engine).get_table_names()
+        assert db.session.get(SchemaVersion, 1).version == SCHEMA_VERSION
+
+
+def test_create_missing_refuses_newer_schema(tmp_path):
+
+    test_app = make_file_database_app(tmp_path / "todo.db", "create_missing")
+    with test_app.app_context():
+        db.session.execute(db.update(SchemaVersion).values(version=SCHEMA_VERSION + 1))
+        db.session.commit()
+        db.engine.dispose()
+
+    with pytest.raises(RuntimeError):
+        make_file_database_app(tmp_path / "todo.db", "create_missing")
+
+
+def test_no_schema_startup_leaves_database_alone(tmp_path):
+
+    test_app = make_file_database_app(tmp_path / "todo.db", "none")
+
+    with test_app.app_context():
+        assert inspect(db.engine).get_table_names() == []
+
+
+def test_unknown_schema_startup(tmp_path):
+
+    with pytest.raises(ValueError):
+        make_file_database_app(tmp_path / "todo.db", "wipe")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_worker_gets_its_own_connections(tmp_path):
+
+    test_app = make_file_database_app(tmp_path / "todo.db", "create_missing")
+    with test_app.app_context():
+        db.session.execute(db.select(User.id)).all()
+        db.session.close()
+        assert db.engine.pool.checkedin() == 1
+
+    pid = os.fork()
+    if pid == 0:
+        with test_app.app_context():
+            os._exit(0 if db.engine.pool.checkedin() == 0 else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    with test_app.app_context():
+        # the parent's pooled connection is still there
+        assert db.engine.pool.checkedin() == 1
+
+
+def run_in_fresh_interpreter(code, cwd):
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONPATH": package_root})
+    return result.stdout.strip()
+
+
+def test_importing_package_does_not_load_dependencies(tmp_path):
+
+    loaded = run_in_fresh_interpreter(
+        "import sys, todoApp; "
+        "print(sorted({name.split('.')[0] for name in sys.modules} & "
+        "{'flask', 'flask_cors', 'flask_sqlalchemy', 'sqlalchemy', 'jwt', 'dotenv', 'werkzeug'}))",
+        tmp_path
+    )
+
+    assert loaded == "[]"
+
+
+def test_dotenv_only_read_by_create_app(tmp_path):
+
+    (tmp_path / ".env").write_text("TODO_APP_DOTENV_CHECK=loaded\n")
+
+    values = run_in_fresh_interpreter(
+        "import os, todoApp\n"
+        "from todoApp.config import TestConfig\n"
+        "print(os.environ.get('TODO_APP_DOTENV_CHECK'))\n"
+        "todoApp.create_app(type('Config', (TestConfig,), {'SQLALCHEMY_DATABASE_URI': 'sqlite://', "
+        "'SQLALCHEMY_ECHO': False}))\n"
+        "print(os.environ.get('TODO_APP_DOTENV_CHECK'))",
+        tmp_path
+    )
+
+    assert values.split() == ["None", "loaded"]
+
+
+def test_environment_settings_read_when_app_created(monkeypatch, tmp_path):
+
+    # TestConfig was imported long before this variable was set
+    monkeypatch.setenv("TEST_URI", f"sqlite:///{tmp_path / 'todo.db'}")
+    test_app = create_app(TestConfig)
+    test_app.extensions['password_hasher'].shutdown()
+
+    assert test_app.config["SQLALCHEMY_DATABASE_URI"] == f"sqlite:///{tmp_path / 'todo.db'}"
@@ -0,0 +1,26 @@
+import json
+
+import pytest
+from flask import current_app
+
+from tests.conftest import *
+from todoApp.utils import streaming
+from todoApp.utils.streaming import encode_json_tree
+
+
+@pytest.mark.parametrize("sort_keys", [True, False])
+@pytest.mark.parametrize("encode_whole_height", [0, 1, 100])
+def test_encode_json_tree_matches_json_dumps(app, monkeypatch, sort_keys, encode_whole_height):
+    # with a height of 0 every dict is written on its own
+    monkeypatch.setattr(streaming, "ENCODE_WHOLE_HEIGHT", encode_whole_height)
+    app.json.sort_keys = sort_keys
+    tree = {"title": "Root", "id": 1, "children": [
+        {"title": "Child", "id": 2, "children": [], "checked": True},
+        {"id": 3, "children": [{"id": 4, "title": "Leaf é"}], "user_id": 1},
+    ], "checked": False}
+
+    assert encode_json_tree(tree) == json.dumps(tree, separators=(",", ":"), sort_keys=sort_keys)
+
+
+def test_encode_json_tree_without_children(app):
+    assert encode_json_tree({"id": 1}) == current_app.json.dumps({"id": 1}, separators=(",", ":"))
@@ -0,0 +1,97 @@
+import pytest
+
+from tests.conftest import *
+from todoApp.utils.todo_versions import bump_todo_version, get_todo_etag
+
+
+def get_etag(authenticated_client, url="/todos"):
+    return authenticated_client.get(url).headers["ETag"]
+
+
+@pytest.mark.parametrize("url", ["/todos", "/todos?limit=1", "/todos/{todo_id}", "/todos/{todo_id}/tree"])
+def test_unchanged_todos_answer_if_none_match_with_304(authenticated_client, create_todo, url):
+
+    todo = create_todo()
+    url = url.format(todo_id=todo.id)
+    response = authenticated_client.get(url)
+    etag = response.headers["ETag"]
+
+    with count_queries() as statements:
+        not_modified_response = authenticated_client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert "Authorization" in response.headers["Vary"]
+    assert not_modified_response.status_code == 304
+    assert not_modified_response.headers["ETag"] == etag
+    assert not_modified_response.get_data() == b""
+    # the user comes from the user cache, so the only query is the version lookup
+    assert len(statements) == 1
+
+
+def test_stale_etag_gets_full_response(authenticated_client, create_todo):
+
+    etag = get_etag(authenticated_client)
+    authenticated_client.post("/todos", json={"title": "New Todo"})
+
+    response = authenticated_client.get("/todos", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json[0]["title"] == "New Todo"
+
+
+@pytest.mark.parametrize("method, url, data", [
+    ("post", "/todos", {"title": "New Todo"}),
+    ("post", "/todos/batch", [{"temp_id": 1, "title": "New Todo"}]),
+    ("patch", "/todos/{todo_id}", {"title": "Edited Title"}),
+    ("patch", "/todos/{todo_id}/check", {"checked": True}),
+    ("patch", "/todos/check", {"ids": ["{todo_id}"], "checked": True}),
+    ("patch", "/todos/{todo_id}/toggle_parent", {"parent_id": "{other_todo_id}"}),
+    ("delete", "/todos/{todo_id}", None),
+    ("delete", "/todos", {"ids": ["{todo_id}"]}),
+])
+def test_mutating_routes_change_etag(authenticated_client, create_todo, method, url, data):
+
+    todo = create_todo()
+    other_todo = create_todo(title="Other Todo")
+    ids = {"{todo_id}": todo.id, "{other_todo_id}": other_todo.id}
+    if isinstance(data, dict):
+        data = {key: [ids.get(item, item) for item in value] if isinstance(value, list) else ids.get(value, value)
+                for key, value in data.items()}
+    etag = get_etag(authenticated_client)
+
+    response = getattr(authenticated_client, method)(url.format(todo_id=todo.id), json=data)
+
+    assert response.status_code in (200, 201)
+    assert get_etag(authenticated_client) != etag
+
+
+def test_failed_mutation_does_not_change_etag(authenticated_client, create_todo):
+
+    create_todo(title="Taken Title")
+    etag = get_etag(authenticated_client)
+
+    response = authenticated_client.post("/todos", json={"title": "Taken Title"})
+
+    assert response.status_code == 400
+    assert get_etag(authenticated_client) == etag
+
+
+def test_etag_is_per_user(authenticated_client, create_user_flex):
+
+    etag = get_etag(authenticated_client)
+    other_user = create_user_flex(username="otheruser")
+
+    bump_todo_version(other_user.id)
+    db.session.commit()
+
+    assert get_etag(authenticated_client) == etag
+    assert get_todo_etag(other_user.id) != etag
+
+
+def test_error_responses_have_no_etag(authenticated_client):
+
+    response = authenticated_client.get("/todos/1000")
+
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from tests.conftest import *
+from todoApp.exceptions.authentication_exception import AuthenticationException
+from todoApp.utils.token_cache import TokenCache
+
+
+def test_token_cache_hit_and_miss():
+
+    token_cache = TokenCache(2)
+
+    assert token_cache.get("token 1") is None
+    token_cache.put("token 1", "public id 1", time.time() + 60)
+
+    assert token_cache.get("token 1") == "public id 1"
+    assert token_cache.stats() == {"hits": 1, "misses": 1, "size": 1, "max_size": 2}
+
+
+def test_token_cache_evicts_least_recently_used():
+
+    token_cache = TokenCache(2)
+    token_cache.put("token 1", "public id 1", time.time() + 60)
+    token_cache.put("token 2", "public id 2", time.time() + 60)
+    token_cache.get("token 1")
+    token_cache.put("token 3", "public id 3", time.time() + 60)
+
+    assert token_cache.get("token 2") is None
+    assert token_cache.get("token 1") == "public id 1"
+    assert token_cache.get("token 3") == "public id 3"
+
+
+def test_token_cache_respects_entry_expiry():
+
+    token_cache = TokenCache(2)
+    token_cache.put("token 1", "public id 1", time.time() - 1)
+
+    with pytest.raises(AuthenticationException) as exception_info:
+        token_cache.get("token 1")
+    assert "Token has expired" in str(exception_info.value)
+    # expired entries are dropped, not kept around
+    assert token_cache.stats()["size"] == 0
+
+
+def test_token_cache_disabled():
+
+    token_cache = TokenCache(0)
+    token_cache.put("token 1", "public id 1", time.time() + 60)
+
+    assert token_cache.get("token 1") is None
+
+
+def test_repeated_requests_use_cached_token(app, authenticated_client):
+
+    token_cache = app.extensions['token_cache']
+
+    for _ in range(3):
+        assert authenticated_client.get("/todos").status_code == 200
+
+    assert token_cache.hits == 2
+    assert token_cache.misses == 1
+
+
+def test_cached_token_still_expires(app, create_user):
+
+    token = make_test_token(create_user.public_id, datetime.utcnow(), datetime.utcnow() + timedelta(seconds=1))
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {token}"
+
+    assert client.get("/todos").status_code == 200
+    time.sleep(1.1)
+    response = client.get("/todos")
+
+    assert_unsuccessful_response_generic(response, 401, EXPIRED_TOKEN_ERROR)
+    assert app.extensions['token_cache'].hits == 1
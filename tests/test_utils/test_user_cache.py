@@ -0,0 +1,84 @@
+import time
+
+from tests.conftest import *
+from todoApp.utils.user_cache import CurrentUser, UserCache
+
+
+def make_current_user(public_id="public id 1"):
+    return CurrentUser(1, public_id, "janwest", "Jan", "West")
+
+
+def test_user_cache_hit_and_miss():
+
+    user_cache = UserCache(60, 2)
+    current_user = make_current_user()
+
+    assert user_cache.get("public id 1") is None
+    user_cache.put(current_user)
+
+    assert user_cache.get("public id 1") is current_user
+    assert user_cache.stats() == {"hits": 1, "misses": 1, "size": 1, "max_size": 2}
+
+
+def test_user_cache_entries_time_out():
+
+    user_cache = UserCache(0.1, 2)
+    user_cache.put(make_current_user())
+    time.sleep(0.2)
+
+    assert user_cache.get("public id 1") is None
+    assert user_cache.stats()["size"] == 0
+
+
+def test_user_cache_evicts_least_recently_used():
+
+    user_cache = UserCache(60, 1)
+    user_cache.put(make_current_user("public id 1"))
+    user_cache.put(make_current_user("public id 2"))
+
+    assert user_cache.get("public id 1") is None
+    assert user_cache.get("public id 2").public_id == "public id 2"
+
+
+def test_repeated_requests_do_not_look_up_user(authenticated_client):
+
+    authenticated_client.get("/todos")
+
+    with count_queries() as statements:
+        response = authenticated_client.get("/todos")
+
+    assert response.status_code == 200
+    # the todo version is still read from the user table, but not the user itself
+    assert not [statement for statement in statements if "user.public_id" in statement]
+
+
+def test_deleting_user_invalidates_cached_user(authenticated_client):
+
+    assert authenticated_client.get("/todos").status_code == 200
+    db.session.delete(authenticated_client.current_user)
+    db.session.commit()
+
+    response = authenticated_client.get("/todos")
+
+    assert_unsuccessful_response_generic(response, 404, "Error: User not found.")
+
+
+def test_changing_user_invalidates_cached_user(app, authenticated_client):
+
+    authenticated_client.get("/todos")
+    user_cache = app.extensions['user_cache']
+    public_id = authenticated_client.current_user.public_id
+    assert user_cache.get(public_id).first_name == "Jan"
+
+    authenticated_client.current_user.first_name = "Janet"
+    db.session.commit()
+
+    assert user_cache.get(public_id) is None
+
+
+def test_current_user_loads_full_user(app, create_user):
+
+    current_user = CurrentUser(create_user.id, create_user.public_id, create_user.username, create_user.first_name,
+                               create_user.last_name)
+
+    assert current_user.load() is create_user
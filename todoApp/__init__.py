@@ -1,12 +1,25 @@
-from flask import Flask
-from flask_cors import CORS
-
-from .blueprints.user_routes import users
-from .extensions.db import db
-from .models.Todo import Todo, serialize_todo
-from todoApp.blueprints.todo_routes import todos
 from .config import *
 
+# Importing the package only loads the config; Flask, SQLAlchemy, the models and the blueprints are imported by
+# create_app, so tools that import todoApp without starting it don't pay for them. The names the package used to
+# import eagerly are still available as attributes, loaded on first access
+LAZY_ATTRIBUTES = {
+    "db": ".extensions.db",
+    "Todo": ".models.Todo",
+    "serialize_todo": ".models.Todo",
+    "TodoClosure": ".models.TodoClosure",
+    "SchemaVersion": ".models.SchemaVersion",
+    "users": ".blueprints.user_routes",
+    "todos": ".blueprints.todo_routes",
+}
+
+
+def __getattr__(name):
+    if name not in LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    return getattr(import_module(LAZY_ATTRIBUTES[name], __name__), name)
+
 
 # Do not try and initialise with a default config and then overwrite it elsewhere, IT DOES NOT WORK!
 # "The issue might be related to the fact that configuration settings, once set in the create_app function,
@@ -14,21 +27,50 @@ from .config import *
 # test file and try to override the configuration, you might be encountering limitations in how Flask handles
 # these configurations."
 def create_app(config_class=DevelopmentConfig):
+    from dotenv import load_dotenv
+    from flask import Flask
+    from flask_cors import CORS
+
+    from .blueprints.todo_routes import todos
+    from .blueprints.user_routes import users
+    from .extensions.db import db
+    from .extensions.engine_options import apply_sqlite_pragmas
+    from .extensions.json_provider import make_json_provider
+    from .utils.closure_table import backfill_todo_closure_command
+    from .utils.data_generator import seed_command
+    from .utils.password_hashing import PasswordHasher
+    from .utils.request_timing import init_request_timing
+    from .utils.startup import make_fork_safe, prepare_schema
+    from .utils.token_cache import TokenCache
+    from .utils.user_cache import UserCache
 
+    # .env is only read once an app is actually being created; the settings that come from the environment
+    # are properties of the config, so they're looked up here rather than when config.py was imported
+    load_dotenv()
     app = Flask(__name__)
     # TODO configure CORS
     CORS(app)
-    app.config.from_object(config_class)
+    app.config.from_object(config_class() if isinstance(config_class, type) else config_class)
+    app.json = make_json_provider(app)
 
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+        init_request_timing(app, db.engine)
+    app.extensions['token_cache'] = TokenCache(app.config['TOKEN_CACHE_SIZE'])
+    app.extensions['user_cache'] = UserCache(app.config['USER_CACHE_TTL'], app.config['USER_CACHE_SIZE'])
+    app.extensions['password_hasher'] = PasswordHasher(app.config['PASSWORD_HASH_ITERATIONS'],
+                                                       app.config['PASSWORD_HASH_EXECUTOR'],
+                                                       app.config['PASSWORD_HASH_WORKERS'])
 
     app.register_blueprint(users)
     app.register_blueprint(todos)
+    app.cli.add_command(backfill_todo_closure_command)
+    app.cli.add_command(seed_command)
 
 
     with app.app_context():
-        # development only
-        db.drop_all()
-        db.create_all()
+        prepare_schema(app.config['SCHEMA_STARTUP'])
+    make_fork_safe(app)
 
     return app
@@ -1,19 +1,34 @@
 import json
 import re
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
 from sqlalchemy.exc import NoResultFound
 
 from todoApp.blueprints.user_routes import require_token
 from todoApp.exceptions.validation_exception import ValidationException
 from todoApp.extensions.db import db
-from todoApp.models.Todo import Todo, serialize_todo, serialize_todo_with_children
-from todoApp.utils.cascading_functions import apply_todo_tree, make_todo_checked, make_todo_matcher
-from todoApp.utils.validation_utils import validate_todo_route_param
+from todoApp.models.Todo import Todo, check_top_level_titles, serialize_todo, serialize_todo_list, serialize_todo_tree, \
+    serialize_todo_with_children, stream_serialized_todos, unique_top_level_title
+from todoApp.utils.batch_utils import insert_todo_level, order_todo_batch, validate_todo_batch
+from todoApp.utils.cascading_functions import apply_todo_tree, check_todo_forest, check_todo_subtree, \
+    delete_todo_forest, is_in_todo_subtree, load_todo_subtree, make_todo_checked, uncheck_todos
+from todoApp.utils.closure_table import closure_is_in_subtree
+from todoApp.utils.pagination import decode_cursor, encode_cursor
+from todoApp.utils.streaming import encode_json_tree, stream_json_array
+from todoApp.utils.todo_versions import bump_todo_version, todo_etag
+from todoApp.utils.validation_utils import validate_page_limit, validate_todo_id_list, validate_todo_route_param, \
+    validate_tree_depth
 
 todos = Blueprint('todos', __name__)
 
 
+def check_todo_ids_found(todo_ids, found_ids):
+    # Bulk routes are all or nothing, so every id has to belong to the user before anything is changed
+    missing_ids = sorted(set(todo_ids) - set(found_ids))
+    if missing_ids:
+        raise NoResultFound(", ".join(map(str, missing_ids)))
+
+
 @todos.post('/todos')
 @require_token
 def add_todo(current_user):
@@ -26,25 +41,23 @@ def add_todo(current_user):
             # checking that parent_todo actually exists; throw error if not
             db.session.scalars(db.session.query(Todo).filter_by(user_id=current_user.id, id=parent_id)).one()
 
-        # If am only imposing unique title constraint on top-level parent todos, need to filter this by whether
-        # a parent_id has been sent in the request
-        if parent_id is None and db.session.scalars(db.select(Todo).filter_by(user_id=current_user.id, title=title)).first():
-            raise ValidationException("Your todo title must be unique")
-
         # create instance of To*do model
         todo_to_add = Todo(title=title, description=description, user_id=current_user.id, parent_id=parent_id)
 
-        # add new instance to SQLAlchemy session and schedule it for insertion into db
-        db.session.add(todo_to_add)
+        # Only top-level todos need unique titles; the unique index on (user_id, title) for todos without a
+        # parent enforces that when the todo is inserted, or a SELECT beforehand on backends without it
+        if parent_id is None:
+            check_top_level_titles(current_user.id, [title], "Your todo title must be unique")
+        with unique_top_level_title("Your todo title must be unique"):
+            # add new instance to SQLAlchemy session and schedule it for insertion into db
+            db.session.add(todo_to_add)
 
-        # commits scheduled changes to db and EXPIRES SESSION OBJECT (it's empty now)
-        db.session.commit()
-
-        # actual magic here
-        # gets todo_to_add out of the identity map for the session and then refreshes it with the current
-        # values from the db
-        db.session.refresh(todo_to_add)
-        return jsonify(serialize_todo(todo_to_add)), 201
+            bump_todo_version(current_user.id)
+            # the INSERT has been flushed by now, so todo_to_add has its id. Serializing it before the commit
+            # EXPIRES SESSION OBJECT means it doesn't have to be read back from the db afterwards
+            serialized_todo = serialize_todo(todo_to_add)
+            db.session.commit()
+        return jsonify(serialized_todo), 201
 
     except ValidationException as exception_message:
         error = exception_message
@@ -54,20 +67,101 @@ def add_todo(current_user):
 
 
 
+@todos.post('/todos/batch')
+@require_token
+def add_todo_batch(current_user):
+    todo_data_list = request.get_json()
+    try:
+        validate_todo_batch(todo_data_list, current_app.config['MAX_BATCH_SIZE'])
+        levels = order_todo_batch(todo_data_list)
+        # everything is checked before anything is written, starting with the title and description validators
+        # keyed by temp_ids as strings, which is how validate_todo_batch compares them
+        todos_by_temp_id = {str(todo_data["temp_id"]): Todo(title=todo_data.get("title"),
+                                                       description=todo_data.get("description"),
+                                                       user_id=current_user.id, parent_id=todo_data.get("parent_id"))
+                            for todo_data in todo_data_list}
+
+        # existing parents in one query
+        parent_ids = {todo_data["parent_id"] for todo_data in levels[0] if todo_data.get("parent_id") is not None}
+        if parent_ids:
+            found_parent_ids = db.session.scalars(db.select(Todo.id).where(Todo.user_id == current_user.id,
+                                                                           Todo.id.in_(parent_ids))).all()
+            if len(found_parent_ids) != len(parent_ids):
+                raise NoResultFound()
+
+        # top-level titles repeated within the batch are caught here, clashes with existing todos by the unique
+        # index when they're inserted
+        top_level_titles = [todo_data["title"] for todo_data in levels[0] if todo_data.get("parent_id") is None]
+        if len(set(top_level_titles)) != len(top_level_titles):
+            raise ValidationException("Your todo title must be unique")
+        check_top_level_titles(current_user.id, top_level_titles, "Your todo title must be unique")
+
+        # then one batched INSERT per level of the batch, all in one transaction
+        with unique_top_level_title("Your todo title must be unique"):
+            for level in levels:
+                level_todos = []
+                for todo_data in level:
+                    todo_to_add = todos_by_temp_id[str(todo_data["temp_id"])]
+                    if todo_data.get("parent_temp_id") is not None:
+                        todo_to_add.parent_id = todos_by_temp_id[str(todo_data["parent_temp_id"])].id
+                    level_todos.append(todo_to_add)
+                for todo_data, added_todo in zip(level, insert_todo_level(level_todos)):
+                    todos_by_temp_id[str(todo_data["temp_id"])] = added_todo
+
+            # serialized before the commit expires them, so this doesn't need to read them back
+            serialized_todos = [serialize_todo(todos_by_temp_id[str(todo_data["temp_id"])])
+                                for todo_data in todo_data_list]
+            temp_ids = {temp_id: todo.id for temp_id, todo in todos_by_temp_id.items()}
+            bump_todo_version(current_user.id)
+            db.session.commit()
+        return jsonify({"todos": serialized_todos, "temp_ids": temp_ids}), 201
+    except ValidationException as error:
+        return jsonify(f"Error: {error}."), 400
+    except NoResultFound:
+        return jsonify(f"Error: Parent todo does not exist."), 404
+
+
 @todos.get('/todos')
 @require_token
+@todo_etag
 def get_all_todos(current_user):
     # Change so found todos is a list of top-level todos only. Can fetch subtodos from
     # database on click.
-    found_todos = db.session.scalars(db.select(Todo).filter_by(user_id=current_user.id
-                                                               , parent_id=None
-                                                               )).all()
-    serialized_todos = [serialize_todo(found_todo) for found_todo in found_todos]
-    return jsonify(serialized_todos)
+    limit, cursor = request.args.get('limit'), request.args.get('cursor')
+    try:
+        todos_query = db.select(Todo).filter_by(user_id=current_user.id, parent_id=None).order_by(Todo.id)
+        # Clients that don't ask for a page get the whole list, as before
+        if limit is None and cursor is None:
+            if current_app.config['STREAM_TODO_LISTS']:
+                serialized_todos = stream_serialized_todos(current_user.id, todos_query,
+                                                           current_app.config['STREAM_BATCH_SIZE'])
+                # stream_with_context keeps the request, and with it the db session, alive while the
+                # response is being sent
+                return Response(stream_with_context(stream_json_array(serialized_todos)),
+                                mimetype='application/json')
+            found_todos = db.session.scalars(todos_query).all()
+            return jsonify(serialize_todo_list(current_user.id, found_todos))
+
+        # Keyset pagination: carry on from the last id the client saw rather than using an OFFSET, so
+        # later pages cost the same as the first one
+        max_limit = current_app.config['MAX_PAGE_LIMIT']
+        if limit is not None:
+            validate_page_limit(limit, max_limit)
+        page_size = int(limit) if limit is not None else max_limit
+        if cursor is not None:
+            todos_query = todos_query.where(Todo.id > decode_cursor(cursor))
+        # fetch one extra row to find out whether there is another page
+        found_todos = db.session.scalars(todos_query.limit(page_size + 1)).all()
+        next_cursor = encode_cursor(found_todos[page_size - 1].id) if len(found_todos) > page_size else None
+        return jsonify({"todos": serialize_todo_list(current_user.id, found_todos[:page_size]),
+                        "next_cursor": next_cursor})
+    except ValidationException as error:
+        return jsonify(f"Error: {error}."), 400
 
 
 @todos.get('/todos/<todo_id>')
 @require_token
+@todo_etag
 def get_todo(current_user, todo_id):
     try:
         validate_todo_route_param(todo_id)
@@ -80,13 +174,39 @@ def get_todo(current_user, todo_id):
         return jsonify(f"Error: {error}."), 404
 
 
+@todos.get('/todos/<todo_id>/tree')
+@require_token
+@todo_etag
+def get_todo_tree(current_user, todo_id):
+    depth = request.args.get('depth')
+    try:
+        validate_todo_route_param(todo_id)
+        if depth is not None:
+            validate_tree_depth(depth, current_app.config['MAX_TREE_DEPTH'])
+        max_depth = int(depth) if depth is not None else None
+        found_todo = db.session.scalars(db.select(Todo).filter_by(user_id=current_user.id, id=todo_id)).one()
+        # every level comes back from one recursive query, however deep the tree is, and is encoded without
+        # recursing too, which jsonify can't do for trees more than a few hundred levels deep
+        load_todo_subtree(found_todo, max_depth)
+        encoded_tree = encode_json_tree(serialize_todo_tree(found_todo, max_depth))
+        return current_app.response_class(encoded_tree + "\n", mimetype=current_app.json.mimetype)
+    except ValidationException as error:
+        return jsonify(f"Error: {error}."), 400
+    except NoResultFound:
+        error = f"No result found for todo ID {todo_id}"
+        return jsonify(f"Error: {error}."), 404
+
+
 @todos.delete('/todos/<todo_id>')
 @require_token
 def delete_todo(current_user, todo_id):
     try:
         validate_todo_route_param(todo_id)
-        todo_to_delete = db.session.scalars(db.select(Todo).filter_by(user_id=current_user.id, id=todo_id)).one()
-        db.session.delete(todo_to_delete)
+        db.session.scalars(db.select(Todo.id).filter_by(user_id=current_user.id, id=todo_id)).one()
+        # deletes the todo and its children with set-based DELETEs, rather than loading every child for the
+        # ORM cascade
+        delete_todo_forest([int(todo_id)], current_user.id)
+        bump_todo_version(current_user.id)
         db.session.commit()
         return jsonify("Todo successfully deleted.")
     except ValidationException as error:
@@ -96,6 +216,27 @@ def delete_todo(current_user, todo_id):
         return jsonify(f"Error: {error}."), 404
 
 
+@todos.delete('/todos')
+@require_token
+def delete_todos(current_user):
+    data = request.get_json()
+    # a body that isn't an object has no ids, and gets the same 400 as a missing list
+    todo_ids = data.get("ids") if isinstance(data, dict) else None
+    try:
+        validate_todo_id_list(todo_ids, current_app.config['MAX_BATCH_SIZE'])
+        check_todo_ids_found(todo_ids, db.session.scalars(
+            db.select(Todo.id).where(Todo.user_id == current_user.id, Todo.id.in_(todo_ids))))
+        # children go too, as they do when delete_todo removes a single todo
+        delete_todo_forest(todo_ids, current_user.id)
+        bump_todo_version(current_user.id)
+        db.session.commit()
+        return jsonify("Todos successfully deleted.")
+    except ValidationException as error:
+        return jsonify(f"Error: {error}."), 400
+    except NoResultFound as error:
+        return jsonify(f"Error: Cannot delete todos, no result found for todo IDs {error}."), 404
+
+
 @todos.patch('/todos/<todo_id>')
 @require_token
 def edit_todo(current_user, todo_id):
@@ -115,14 +256,19 @@ def edit_todo(current_user, todo_id):
 
         # Explicit attribute names rather than a loop to ensure data integrity
         if "title" in data:
-            if todo_to_edit.title != data.get("title") and db.session.scalars(db.select(Todo).filter_by(user_id=current_user.id, title=data.get("title"))).first():
-                raise ValidationException('Your todo must have a unique title')
+            if todo_to_edit.parent_id is None:
+                check_top_level_titles(current_user.id, [data.get("title")], 'Your todo must have a unique title',
+                                       exclude_id=todo_to_edit.id)
             setattr(todo_to_edit, "title", data.get("title"))
         if "description" in data:
             setattr(todo_to_edit, "description", data.get("description"))
-        db.session.commit()
-        edited_todo = db.session.get(Todo, todo_id)
-        return jsonify(serialize_todo(edited_todo))
+        # a top-level title that's already taken fails the unique index when the change is flushed
+        with unique_top_level_title('Your todo must have a unique title'):
+            bump_todo_version(current_user.id)
+            # serialized from the object in hand, before the commit expires it
+            serialized_todo = serialize_todo(todo_to_edit)
+            db.session.commit()
+        return jsonify(serialized_todo)
     except ValidationException as error:
         return jsonify(f"Error: {error}."), 400
     except NoResultFound:
@@ -143,22 +289,61 @@ def toggle_parent(current_user, todo_id):
             if parent_id_to_add == int(todo_id):
                 raise ValidationException('Todo cannot be its own parent')
             # checking that parent_todo actually exists; throw error if not
-            parent_todo = db.session.scalars(db.session.query(Todo).filter_by(user_id=current_user.id, id=parent_id_to_add)).one()
+            db.session.scalars(db.session.query(Todo).filter_by(user_id=current_user.id, id=parent_id_to_add)).one()
 
-            # check that we're not trying to create a circular relationship anywhere in the tree
-            todo_matcher = make_todo_matcher(parent_todo)
-            if apply_todo_tree(child_todo, todo_matcher, return_result=True):
+            # check that we're not trying to create a circular relationship anywhere in the tree, i.e. that the
+            # new parent isn't somewhere underneath the child already
+            if current_app.config['TODO_CLOSURE_TABLE']:
+                circular = closure_is_in_subtree(parent_id_to_add, child_todo.id)
+            else:
+                circular = is_in_todo_subtree(parent_id_to_add, child_todo.id, current_user.id)
+            if circular:
                 raise ValidationException('Cannot create circular parent-child relationship')
 
-        child_todo.parent_id = parent_id_to_add
-        db.session.commit()
-        updated_child_todo = db.session.get(Todo, todo_id)
-        return jsonify(serialize_todo(updated_child_todo))
+        # moving a todo to the top level needs its title to be free there
+        if parent_id_to_add is None and child_todo.parent_id is not None:
+            check_top_level_titles(current_user.id, [child_todo.title], 'Your todo title must be unique',
+                                   exclude_id=child_todo.id)
+        with unique_top_level_title('Your todo title must be unique'):
+            child_todo.parent_id = parent_id_to_add
+            bump_todo_version(current_user.id)
+            serialized_todo = serialize_todo(child_todo)
+            db.session.commit()
+        return jsonify(serialized_todo)
     except ValidationException as error:
         return jsonify(f"Error: {error}."), 400
     except NoResultFound:
         return jsonify(f"Error: Parent or child todo does not exist."), 404
 
+@todos.patch('/todos/check')
+@require_token
+def check_todos(current_user):
+    data = request.get_json()
+    # a body that isn't an object has no ids, and gets the same 400 as a missing list
+    todo_ids, checked = (data.get("ids"), data.get("checked")) if isinstance(data, dict) else (None, None)
+    try:
+        validate_todo_id_list(todo_ids, current_app.config['MAX_BATCH_SIZE'])
+        if not isinstance(checked, bool):
+            raise ValidationException("Checked must be true or false")
+        found_todos = db.session.scalars(db.select(Todo).where(Todo.user_id == current_user.id,
+                                                               Todo.id.in_(todo_ids)).order_by(Todo.id)).all()
+        check_todo_ids_found(todo_ids, [todo.id for todo in found_todos])
+        # Same rules as check_todo, applied to every todo at once: checking cascades down to all children,
+        # unchecking also unchecks the parent. Both UPDATEs bring the new values back into found_todos
+        if checked:
+            check_todo_forest(todo_ids, current_user.id)
+        else:
+            uncheck_todos(todo_ids, current_user.id)
+        bump_todo_version(current_user.id)
+        serialized_todos = [serialize_todo(todo) for todo in found_todos]
+        db.session.commit()
+        return jsonify(serialized_todos)
+    except ValidationException as error:
+        return jsonify(f"Error: {error}."), 400
+    except NoResultFound as error:
+        return jsonify(f"Error: No result found for todo IDs {error}."), 404
+
+
 @todos.patch('/todos/<todo_id>/check')
 @require_token
 def check_todo(current_user, todo_id):
@@ -168,18 +353,16 @@ def check_todo(current_user, todo_id):
         validate_todo_route_param(todo_id)
         todo_to_update = db.session.scalars(db.session.query(Todo).filter_by(user_id=current_user.id, id=todo_id)).one()
 
-        # Unchecking a to*do only affects that to*do
+        # Unchecking a to*do also unchecks its parent, if it has one, in the same UPDATE
         if checked is False:
-            todo_to_update.checked = checked
+            uncheck_todos([todo_to_update.id], current_user.id)
         # Checking a to*do also checks all children
         if checked is True:
-            apply_todo_tree(todo_to_update, make_todo_checked)
-        # Behavior for todos with parents
-        if todo_to_update.parent_id is not None:
-            todo_parent = db.session.scalars(db.session.query(Todo).filter_by(user_id=current_user.id, id=todo_to_update.parent_id)).one()
-            # Unchecking a sub to*do also unchecks its parent
-            if checked is False:
-                todo_parent.checked = False
+            if current_app.config['CASCADE_CHECK_IN_SQL']:
+                check_todo_subtree(todo_to_update)
+            else:
+                load_todo_subtree(todo_to_update)
+                apply_todo_tree(todo_to_update, make_todo_checked)
             # If there are no remaining unchecked children, check the parent
             # if checked is True:
             #     unchecked_sibling_flag = False
@@ -189,9 +372,11 @@ def check_todo(current_user, todo_id):
             #             break
             #     if not unchecked_sibling_flag:
             #         todo_parent.checked = True
+        bump_todo_version(current_user.id)
+        # the UPDATEs above have already put the new checked value on todo_to_update
+        serialized_todo = serialize_todo(todo_to_update)
         db.session.commit()
-        db.session.refresh(todo_to_update)
-        return jsonify(serialize_todo(todo_to_update))
+        return jsonify(serialized_todo)
     except ValidationException as error:
         return jsonify(f"Error: {error}."), 400
     except NoResultFound:
@@ -1,28 +1,98 @@
+import hashlib
 import json
 import re
-from datetime import datetime, timedelta
+import secrets
+import uuid
+from datetime import datetime
 from functools import wraps
 
-import jwt
 from flask import Blueprint, jsonify, request, current_app
 from sqlalchemy.exc import NoResultFound
 
 from todoApp.exceptions.authentication_exception import AuthenticationException
 from todoApp.exceptions.validation_exception import ValidationException
 from todoApp.extensions.db import db
+from todoApp.models.RefreshToken import RefreshToken
 from todoApp.models.User import User, serialize_user
+from todoApp.utils.request_timing import timed
+from todoApp.utils.user_cache import find_current_user
 
 users = Blueprint('users', __name__)
 
 
 def make_token(public_user_id):
-    payload = {"sub": public_user_id, "iat": datetime.utcnow(), "exp": datetime.utcnow() + timedelta(hours=2)}
-    return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm="HS256")
+    # jwt is imported on first use rather than with the blueprint
+    import jwt
+    payload = {"sub": public_user_id, "iat": datetime.utcnow(),
+               "exp": datetime.utcnow() + current_app.config['ACCESS_TOKEN_LIFETIME']}
+    with timed("jwt"):
+        return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm="HS256")
+
+
+def hash_refresh_token(refresh_token):
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+def issue_refresh_token(user_id, family_id=None):
+    # Adds the new token to the session; the caller commits it. A login starts a new family, a refresh carries
+    # on the family of the token it replaces
+    refresh_token = secrets.token_urlsafe(32)
+    db.session.add(RefreshToken(token_hash=hash_refresh_token(refresh_token), family_id=family_id or str(uuid.uuid4()),
+                                user_id=user_id,
+                                expires_at=datetime.utcnow() + current_app.config['REFRESH_TOKEN_LIFETIME']))
+    return refresh_token
+
+
+def revoke_refresh_token_family(family_id):
+    db.session.execute(db.update(RefreshToken).filter_by(family_id=family_id).values(revoked=True))
+
+
+def reject_reused_refresh_token(family_id):
+    # an already used token coming back means someone else has a copy of it, so nothing issued from the same
+    # login can be trusted any more
+    revoke_refresh_token_family(family_id)
+    db.session.commit()
+    raise AuthenticationException("Invalid refresh token")
+
+
+def get_refresh_token_from_body():
+    # A missing body or token is left for find_refresh_token to report. Anything that isn't an object with a
+    # string token in it is a bad request rather than a failed login
+    data = request.get_json(silent=True)
+    if data is None:
+        return None
+    if not isinstance(data, dict):
+        raise ValidationException("Request body must be a JSON object")
+    refresh_token = data.get("refresh_token")
+    if refresh_token is not None and not isinstance(refresh_token, str):
+        raise ValidationException("Refresh token must be a string")
+    return refresh_token
+
+
+def find_refresh_token(refresh_token):
+    if not refresh_token:
+        raise AuthenticationException("Refresh token is missing")
+    found_refresh_token = db.session.execute(
+        db.select(RefreshToken, User.public_id).join(User, RefreshToken.user_id == User.id)
+        .filter(RefreshToken.token_hash == hash_refresh_token(refresh_token))
+    ).first()
+    if found_refresh_token is None:
+        raise AuthenticationException("Invalid refresh token")
+    return found_refresh_token
 
 
 def decode_token(token):
+    token_cache = current_app.extensions['token_cache']
+    # raises straight away if the cached token has expired since it was verified
+    public_user_id = token_cache.get(token)
+    if public_user_id is not None:
+        return public_user_id
+    import jwt
     try:
-        payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+        with timed("jwt"):
+            payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+        if "exp" in payload:
+            token_cache.put(token, payload["sub"], payload["exp"])
         return payload["sub"]
     # Dealing with straight-up bad tokens here
     except jwt.ExpiredSignatureError:
@@ -41,9 +111,14 @@ def require_token(f):
                 raise AuthenticationException("Token is missing")
             token = raw_token.replace('Bearer ', '')
             public_user_id = decode_token(token)
-            current_user = db.session.scalars(db.select(User).filter_by(public_id=public_user_id)).first()
-            if not current_user:
-                raise NoResultFound("User not found")
+            # routes get a CurrentUser rather than the full User; most of them only need its id
+            user_cache = current_app.extensions['user_cache']
+            current_user = user_cache.get(public_user_id)
+            if current_user is None:
+                current_user = find_current_user(public_user_id)
+                if not current_user:
+                    raise NoResultFound("User not found")
+                user_cache.put(current_user)
             return f(current_user, *args, **kwargs)
         except AuthenticationException as exception_message:
             error = exception_message
@@ -68,10 +143,14 @@ def create_user():
             raise ValidationException("Passwords must match")
         user_to_add = User(first_name=first_name, last_name=last_name, username=username, password_plaintext=password_plaintext)
         db.session.add(user_to_add)
+        # flushed rather than committed, so the user gets its id and goes in with its refresh token in one
+        # transaction; serialized before the commit expires it
+        db.session.flush()
+        refresh_token = issue_refresh_token(user_to_add.id)
+        serialized_user = serialize_user(user_to_add)
         db.session.commit()
-        added_user = db.session.scalars(db.select(User).filter_by(id=user_to_add.id)).one()
-        token = make_token(added_user.public_id)
-        return jsonify({"token": token, "user": serialize_user(added_user)}), 201
+        token = make_token(user_to_add.public_id)
+        return jsonify({"token": token, "refresh_token": refresh_token, "user": serialized_user}), 201
     except ValidationException as error:
         return jsonify(f"Error: {error}."), 400
 
@@ -88,9 +167,55 @@ def login_user():
             raise NoResultFound("User not found")
         if found_user.check_password(password_plaintext) is False:
             raise ValidationException("Incorrect password")
+        # we only ever have the plaintext here, so this is where old hashes get brought up to date
+        found_user.upgrade_password_hash(password_plaintext)
+        refresh_token = issue_refresh_token(found_user.id)
+        db.session.commit()
         token = make_token(found_user.public_id)
-        return jsonify({"token": token}), 200
+        return jsonify({"token": token, "refresh_token": refresh_token}), 200
     except ValidationException as error:
         return jsonify(f"Error: {error}."), 401, {"WWW-Authenticate": "Basic"}
     except NoResultFound as error:
         return jsonify(f"Error: {error}."), 404
+
+
+@users.post('/refresh')
+def refresh_access_token():
+    try:
+        stored_refresh_token, public_user_id = find_refresh_token(get_refresh_token_from_body())
+        if stored_refresh_token.revoked:
+            reject_reused_refresh_token(stored_refresh_token.family_id)
+        if stored_refresh_token.expires_at <= datetime.utcnow():
+            raise AuthenticationException("Refresh token has expired")
+        # rotate: this token is used up, and its replacement carries on the same family. Only an UPDATE that
+        # still finds it unrevoked gets to use it, so of two requests racing with the same token just one wins
+        # and the other is treated as reuse
+        claimed = db.session.execute(
+            db.update(RefreshToken)
+            .where(RefreshToken.id == stored_refresh_token.id, RefreshToken.revoked == False)
+            .values(revoked=True)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed == 0:
+            reject_reused_refresh_token(stored_refresh_token.family_id)
+        refresh_token = issue_refresh_token(stored_refresh_token.user_id, stored_refresh_token.family_id)
+        db.session.commit()
+        token = make_token(public_user_id)
+        return jsonify({"token": token, "refresh_token": refresh_token}), 200
+    except ValidationException as error:
+        return jsonify(f"Error: {error}."), 400
+    except AuthenticationException as error:
+        return jsonify(f"Error: {error}."), 401
+
+
+@users.post('/logout')
+def revoke_refresh_token():
+    try:
+        stored_refresh_token, public_user_id = find_refresh_token(get_refresh_token_from_body())
+        revoke_refresh_token_family(stored_refresh_token.family_id)
+        db.session.commit()
+        return jsonify("Refresh token revoked."), 200
+    except ValidationException as error:
+        return jsonify(f"Error: {error}."), 400
+    except AuthenticationException as error:
+        return jsonify(f"Error: {error}."), 401
@@ -1,22 +1,111 @@
 import os
-from dotenv import load_dotenv
+from datetime import timedelta
 
-load_dotenv()
+# Settings taken from the environment are properties, so they are read when create_app loads the config, after it
+# has read .env, rather than when this module is imported
 
 
 class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     TESTING = False
+    # Checking a todo cascades to its whole subtree in one UPDATE statement; set to False to walk the tree
+    # through the ORM instead
+    CASCADE_CHECK_IN_SQL = True
+    # Maintain the todo_closure hierarchy index on every insert, move and delete. Run `flask backfill-todo-closure`
+    # after switching this on for a database that already has todos
+    TODO_CLOSURE_TABLE = False
+    # Largest page GET /todos will return when a client asks for ?limit=
+    MAX_PAGE_LIMIT = 500
+    # Largest ?depth= GET /todos/<id>/tree accepts; leaving depth out returns the whole tree however deep it is
+    MAX_TREE_DEPTH = 10000
+    # Most todos POST /todos/batch will create, or PATCH /todos/check and DELETE /todos will touch, in one request
+    MAX_BATCH_SIZE = 1000
+    # Send the unpaginated GET /todos list as a streamed response, fetching STREAM_BATCH_SIZE rows at a time,
+    # instead of building the whole list in memory first
+    STREAM_TODO_LISTS = False
+    STREAM_BATCH_SIZE = 500
+    # "auto" encodes responses with orjson when it is installed, falling back to the stdlib json module
+    JSON_PROVIDER = "auto"
+    # How many verified bearer tokens to remember so they don't need decoding again; 0 turns the cache off
+    TOKEN_CACHE_SIZE = 4096
+    # How long, in seconds, require_token remembers which user a public_id belongs to; 0 turns the cache off
+    USER_CACHE_TTL = 60
+    USER_CACHE_SIZE = 4096
+    # pbkdf2 cost for new password hashes. Existing hashes made with other settings are re-hashed on login
+    PASSWORD_HASH_ITERATIONS = 1000000
+    # "thread" or "process" to hash on a pool of PASSWORD_HASH_WORKERS, None to hash on the request thread
+    PASSWORD_HASH_EXECUTOR = "thread"
+    PASSWORD_HASH_WORKERS = 4
+    # Access tokens are kept short-lived; clients swap their refresh token at /refresh for a new one instead of
+    # logging in again
+    ACCESS_TOKEN_LIFETIME = timedelta(minutes=15)
+    REFRESH_TOKEN_LIFETIME = timedelta(days=30)
+    # What create_app does to the database schema: "create_missing" creates tables and indexes that don't exist
+    # yet, skipping all DDL when the stored schema version is current; "recreate" drops and recreates everything,
+    # wiping the data; "none" leaves the schema to be managed elsewhere
+    SCHEMA_STARTUP = "create_missing"
+    # PRAGMAs run on every new connection when the database is SQLite, e.g. {"journal_mode": "WAL"}
+    SQLITE_PRAGMAS = {}
+    # Add a Server-Timing header and a JSON log line to every response, with the SQL statement count and time
+    # and the time spent on JWTs, password hashing and serialization. See utils/request_timing.py
+    REQUEST_TIMING = False
 
 
 class DevelopmentConfig(Config):
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_URI')
     SQLALCHEMY_ECHO = True
-    SECRET_KEY = os.environ.get('DEV_SECRET_KEY')
+
+    @property
+    def SQLALCHEMY_DATABASE_URI(self):
+        return os.environ.get('DEV_URI')
+
+    @property
+    def SECRET_KEY(self):
+        return os.environ.get('DEV_SECRET_KEY')
+
+    # development only, starts every run with an empty database
+    SCHEMA_STARTUP = "recreate"
 
 
 class TestConfig(Config):
-    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_URI')
     SQLALCHEMY_ECHO = True
     SECRET_KEY = "this is a secret key"
     TESTING = True
+    SCHEMA_STARTUP = "recreate"
+    # Hashing strength doesn't matter for tests, and the full cost dominates the run time of the suite
+    PASSWORD_HASH_ITERATIONS = 1000
+    # SQLite leaves foreign keys unchecked unless told otherwise, while the production databases always check them
+    SQLITE_PRAGMAS = {"foreign_keys": "ON"}
+
+    @property
+    def SQLALCHEMY_DATABASE_URI(self):
+        return os.environ.get('TEST_URI')
+
+
+class ProductionConfig(Config):
+    SQLALCHEMY_ECHO = False
+
+    @property
+    def SQLALCHEMY_DATABASE_URI(self):
+        return os.environ.get('DATABASE_URI')
+
+    @property
+    def SECRET_KEY(self):
+        return os.environ.get('SECRET_KEY')
+
+    @property
+    def SQLALCHEMY_ENGINE_OPTIONS(self):
+        from .extensions.engine_options import make_engine_options
+        # pool size, overflow, timeout, recycle and pre-ping come from DB_* environment variables
+        return make_engine_options(self.SQLALCHEMY_DATABASE_URI, os.environ)
+
+    @property
+    def SQLITE_PRAGMAS(self):
+        # WAL lets readers carry on while a write is committing, and with it synchronous=NORMAL only syncs at
+        # checkpoints rather than on every commit. busy_timeout makes a writer wait for the lock instead of
+        # failing straight away with "database is locked"; a negative cache_size is in KiB
+        return {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+            "cache_size": -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64000)),
+        }
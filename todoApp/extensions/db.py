@@ -1,3 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
+
+# MySQL and MariaDB refuse an UPDATE or DELETE with a subquery that reads the table being changed (error 1093)
+SUBQUERY_ON_TARGET_UNSUPPORTED_DIALECTS = ('mysql', 'mariadb')
+
+
+def target_table_subquery(id_select, connection=None):
+    # Use in place of a subquery on the table an UPDATE or DELETE is changing. Where the database can't take it,
+    # the subquery is run on its own first and its ids are passed in as a list instead. connection is for mapper
+    # events, which have to run their statements on the connection they're given
+    if db.engine.dialect.name not in SUBQUERY_ON_TARGET_UNSUPPORTED_DIALECTS:
+        return id_select
+    return (connection or db.session).scalars(id_select).all()
+
+
+# InnoDB checks foreign keys one row at a time as a statement runs, rather than once the statement has finished,
+# so a DELETE can't take a parent before the children that point to it
+FOREIGN_KEYS_CHECKED_PER_ROW_DIALECTS = ('mysql', 'mariadb')
+
+
+def foreign_keys_checked_per_row():
+    return db.engine.dialect.name in FOREIGN_KEYS_CHECKED_PER_ROW_DIALECTS
@@ -0,0 +1,51 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def env_flag(value):
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def make_engine_options(database_uri, environ):
+    # SQLALCHEMY_ENGINE_OPTIONS for ProductionConfig, read from DB_* environment variables. SQLite in-memory
+    # databases use a pool that takes none of these settings, so they are left alone
+    if not database_uri:
+        return {}
+    url = make_url(database_uri)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    engine_options = {
+        "pool_size": int(environ.get("DB_POOL_SIZE", 10)),
+        "max_overflow": int(environ.get("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": int(environ.get("DB_POOL_TIMEOUT", 30)),
+        # seconds before a pooled connection is replaced, to stay under the server's idle timeout
+        "pool_recycle": int(environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": env_flag(environ.get("DB_POOL_PRE_PING", "true")),
+    }
+    # set per connection at connect time, so a runaway query is cancelled by the server. MySQL's
+    # max_execution_time only covers SELECTs; MariaDB has its own max_statement_time, in seconds, which covers
+    # everything but needs a mariadb:// URL to be picked. SQLite has no statement timeout
+    statement_timeout = int(environ.get("DB_STATEMENT_TIMEOUT_MS", 30000))
+    if statement_timeout:
+        if url.get_backend_name() == "postgresql":
+            engine_options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+        elif url.get_backend_name() == "mysql":
+            engine_options["connect_args"] = {"init_command": f"SET SESSION max_execution_time={statement_timeout}"}
+        elif url.get_backend_name() == "mariadb":
+            engine_options["connect_args"] = {
+                "init_command": f"SET SESSION max_statement_time={statement_timeout / 1000}"
+            }
+    return engine_options
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    # Runs the SQLITE_PRAGMAS on every new connection, since most pragmas only last as long as the connection
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
@@ -0,0 +1,54 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Encodes compact responses with orjson, producing exactly the bytes the default provider would. Anything
+    # orjson can't reproduce byte for byte is handed back to the default provider: indented (debug) output,
+    # non-ASCII text while ensure_ascii is on, and values orjson refuses such as very deeply nested trees or
+    # integers wider than 64 bits. Types orjson doesn't know go through the same default() as the stdlib
+    compact_separators = (",", ":")
+
+    def orjson_dumps(self, obj):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            encoded = orjson.dumps(obj, default=self.default, option=option)
+        except (orjson.JSONEncodeError, TypeError):
+            return None
+        if self.ensure_ascii and not encoded.isascii():
+            return None
+        return encoded
+
+    def dumps(self, obj, **kwargs):
+        if kwargs == {"separators": self.compact_separators}:
+            encoded = self.orjson_dumps(obj)
+            if encoded is not None:
+                return encoded.decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        encoded = self.orjson_dumps(self._prepare_response_obj(args, kwargs))
+        if encoded is None:
+            return super().response(*args, **kwargs)
+        # skips the bytes -> str -> bytes round trip the default provider goes through
+        return self._app.response_class(encoded + b"\n", mimetype=self.mimetype)
+
+
+def make_json_provider(app):
+    # JSON_PROVIDER is "orjson", "stdlib", or "auto" for orjson when it is installed and the stdlib otherwise
+    provider_name = app.config['JSON_PROVIDER']
+    if provider_name not in ("auto", "orjson", "stdlib"):
+        raise ValueError(f"Unknown JSON_PROVIDER '{provider_name}'")
+    if provider_name == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER is 'orjson' but orjson is not installed")
+    if provider_name == "stdlib" or orjson is None:
+        return DefaultJSONProvider(app)
+    return OrjsonProvider(app)
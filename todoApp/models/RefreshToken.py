@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped
+
+from ..extensions.db import db
+
+
+class RefreshToken(db.Model):
+    # Only a SHA-256 digest of the token is stored, and it is looked up by that digest, so checking a refresh
+    # token is a single indexed read. Each token can be used once: using it revokes it and issues its
+    # replacement in the same family
+    id: Mapped[int] = db.mapped_column(primary_key=True)
+    token_hash: Mapped[str] = db.mapped_column(db.String(64), unique=True)
+    family_id: Mapped[str] = db.mapped_column(db.String(36), index=True)
+    user_id: Mapped[int] = db.mapped_column(ForeignKey('user.id'))
+    expires_at: Mapped[datetime] = db.mapped_column(db.DateTime)
+    revoked: Mapped[bool] = db.mapped_column(db.Boolean)
+
+    def __init__(self, token_hash, family_id, user_id, expires_at):
+        self.token_hash = token_hash
+        self.family_id = family_id
+        self.user_id = user_id
+        self.expires_at = expires_at
+        self.revoked = False
@@ -0,0 +1,17 @@
+from sqlalchemy.orm import Mapped
+
+from ..extensions.db import db
+
+# Bump whenever a model gains a table, column or index, so apps started with SCHEMA_STARTUP = "create_missing"
+# know to look for what's new
+SCHEMA_VERSION = 2
+
+
+class SchemaVersion(db.Model):
+    # Single row recording which SCHEMA_VERSION the database's tables were last brought up to
+    id: Mapped[int] = db.mapped_column(primary_key=True)
+    version: Mapped[int] = db.mapped_column(db.Integer)
+
+    def __init__(self, version):
+        self.id = 1
+        self.version = version
@@ -1,14 +1,58 @@
+from contextlib import contextmanager
 from typing import Optional, List
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import validates, Mapped
 
 from ..exceptions.validation_exception import ValidationException
 from ..extensions.db import db
-from ..utils.serialize_function import serialize_model
+from ..utils.request_timing import timed_function
+from ..utils.serialize_function import make_model_serializer
+
+
+# Name of the unique index on top-level titles, for telling its IntegrityErrors apart from others
+TOP_LEVEL_TITLE_INDEX = 'uq_todo_user_id_top_level_title'
+# Backends that can limit that index to top-level todos with a WHERE clause
+PARTIAL_INDEX_DIALECTS = ('sqlite', 'postgresql')
+# MySQL has no partial indexes, but from 8.0.13 it can index an expression. There the index covers
+# CASE WHEN parent_id IS NULL THEN title END instead, which is NULL for every sub todo, and a unique index lets
+# NULLs repeat. MariaDB and older MySQL versions get neither, see has_top_level_title_index
+FUNCTIONAL_INDEX_MYSQL_VERSION = (8, 0, 13)
+
+
+def has_top_level_title_index(dialect):
+    # Whether the database gets one of the unique indexes on top-level titles. Without one, a plain index on
+    # (user_id, parent_id, title) is created instead, for check_top_level_titles to look for duplicates with.
+    # A MySQL dialect that hasn't connected yet doesn't know its server version, and is taken to be current
+    if dialect.name in PARTIAL_INDEX_DIALECTS:
+        return True
+    return (dialect.name == 'mysql' and not dialect.is_mariadb
+            and (dialect.server_version_info or FUNCTIONAL_INDEX_MYSQL_VERSION) >= FUNCTIONAL_INDEX_MYSQL_VERSION)
+
+
+def top_level_title_index_is(present):
+    # ddl_if callable creating an index only where has_top_level_title_index is, or isn't, true
+    return lambda ddl, target, bind, dialect, **kwargs: has_top_level_title_index(dialect) is present
 
 
 class Todo(db.Model):
+    __table_args__ = (
+        # Covers listing a user's todos at one level of the tree, in id order for keyset pagination, and any
+        # other lookup on (user_id, parent_id)
+        db.Index('ix_todo_user_id_parent_id_id', 'user_id', 'parent_id', 'id'),
+        # Top-level titles are unique per user; sub todos can share titles. Only one of these is created
+        db.Index(TOP_LEVEL_TITLE_INDEX, 'user_id', 'title', unique=True,
+                 sqlite_where=text('parent_id IS NULL'), postgresql_where=text('parent_id IS NULL'))
+        .ddl_if(dialect=PARTIAL_INDEX_DIALECTS),
+        # MySQL wants an expression in an index in its own brackets
+        db.Index(TOP_LEVEL_TITLE_INDEX, 'user_id', text('(CASE WHEN parent_id IS NULL THEN title END)'),
+                 unique=True)
+        .ddl_if(dialect='mysql', callable_=top_level_title_index_is(True)),
+        db.Index('ix_todo_user_id_parent_id_title', 'user_id', 'parent_id', 'title')
+        .ddl_if(callable_=top_level_title_index_is(False)),
+    )
+
     id: Mapped[int] = db.mapped_column(primary_key=True)
     title: Mapped[str] = db.mapped_column(db.String(40))
     description: Mapped[Optional[str]] = db.mapped_column(db.String(250))
@@ -61,15 +105,110 @@ class Todo(db.Model):
             return description
 
 
+@contextmanager
+def unique_top_level_title(error_message):
+    # Wrap the statements that write todos. The unique index does the checking, so there's no SELECT beforehand
+    # and no gap for a concurrent request to slip a duplicate in; a clash is turned back into the usual
+    # ValidationException. Any other IntegrityError is left alone
+    try:
+        yield
+    except IntegrityError as error:
+        db.session.rollback()
+        # Postgres and MySQL name the index in their error messages, SQLite lists the columns instead
+        message = str(error.orig)
+        if TOP_LEVEL_TITLE_INDEX not in message and "todo.user_id, todo.title" not in message:
+            raise
+        raise ValidationException(error_message)
+
+
+def check_top_level_titles(user_id, titles, error_message, exclude_id=None):
+    # For backends without a unique index on top-level titles: raises the ValidationException
+    # unique_top_level_title would if any of the titles already belongs to one of the user's top-level todos,
+    # other than exclude_id. Does nothing where the index is there to do the checking
+    if has_top_level_title_index(db.engine.dialect) or not titles:
+        return
+    taken_title = (db.select(Todo.id)
+                   .where(Todo.user_id == user_id, Todo.parent_id.is_(None), Todo.title.in_(titles)))
+    if exclude_id is not None:
+        taken_title = taken_title.where(Todo.id != exclude_id)
+    if db.session.scalars(taken_title).first() is not None:
+        raise ValidationException(error_message)
+
+
+serialize_todo_columns = make_model_serializer(Todo)
+
+
+@timed_function("serialize")
 def serialize_todo_with_children(todo_to_serialize):
-    serialized_todo = {**serialize_model(todo_to_serialize, Todo)}
-    serialized_todo['children'] = todo_to_serialize.children
-    return {**serialize_model(todo_to_serialize, Todo)}
+    serialized_todo = serialize_todo_columns(todo_to_serialize)
+    # does not return an empty children list, in line with the other empty values
+    if todo_to_serialize.children:
+        serialized_todo['children'] = [serialize_todo_columns(child) for child in todo_to_serialize.children]
+    return serialized_todo
+
+
+@timed_function("serialize")
+def serialize_todo_tree(root_todo, max_depth=None):
+    # Nests each todo's serialized children under 'children'. Built with an explicit stack rather than recursion
+    # so deep trees can't hit the recursion limit. Todos at the max_depth cut-off have no 'children' key at all,
+    # to tell them apart from todos that have no children
+    serialized_root = serialize_todo_columns(root_todo)
+    stack = [(root_todo, serialized_root, 0)]
+    while stack:
+        todo, serialized_todo, depth = stack.pop()
+        if max_depth is not None and depth >= max_depth:
+            continue
+        serialized_todo['children'] = []
+        for child in todo.children:
+            serialized_child = serialize_todo_columns(child)
+            serialized_todo['children'].append(serialized_child)
+            stack.append((child, serialized_child, depth + 1))
+    return serialized_root
 
 
-def serialize_todo(todo_to_serialize):
-    # TODO change this so I can get some sort of indication of how many
-    #  children and (maybe) their checked status
-    serialized_todo = {**serialize_model(todo_to_serialize, Todo)}
+def get_child_counts(user_id, parent_ids):
+    # One grouped query for the number of direct children, and how many of them are checked, of every todo in
+    # parent_ids. Todos without children don't appear in the result
+    if not parent_ids:
+        return {}
+    rows = db.session.execute(
+        db.select(Todo.parent_id, db.func.count(Todo.id), db.func.count(db.case((Todo.checked == True, Todo.id))))
+        .where(Todo.user_id == user_id, Todo.parent_id.in_(parent_ids))
+        .group_by(Todo.parent_id)
+    ).all()
+    return {parent_id: (child_count, checked_child_count) for parent_id, child_count, checked_child_count in rows}
+
+
+def stream_serialized_todos(user_id, todos_query, batch_size):
+    # Serializes the todos selected by todos_query, which has to be in Todo.id order, batch_size at a time. Each
+    # batch is a keyset query carrying on from the last id of the one before, followed by get_child_counts for
+    # just that batch, so the first todos go out after work bounded by batch_size rather than by how many todos
+    # the user has. Every query is read to the end before the next one runs; MySQL can't start a query on a
+    # connection that is still streaming another's results
+    last_id = None
+    while True:
+        batch_query = todos_query if last_id is None else todos_query.where(Todo.id > last_id)
+        batch = db.session.scalars(batch_query.limit(batch_size)).all()
+        child_counts = get_child_counts(user_id, [todo.id for todo in batch])
+        for todo in batch:
+            yield serialize_todo(todo, child_counts)
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1].id
+
+
+def serialize_todo(todo_to_serialize, child_counts=None):
+    serialized_todo = serialize_todo_columns(todo_to_serialize)
+    # child_counts is the result of get_child_counts, fetched up front for a whole list of todos
+    if child_counts is not None:
+        child_count, checked_child_count = child_counts.get(todo_to_serialize.id, (0, 0))
+        serialized_todo['child_count'] = child_count
+        serialized_todo['checked_child_count'] = checked_child_count
     return serialized_todo
 
+
+@timed_function("serialize")
+def serialize_todo_list(user_id, todos_to_serialize):
+    # child and checked child counts for the progress indicator, all in one query rather than one per todo
+    child_counts = get_child_counts(user_id, [todo.id for todo in todos_to_serialize])
+    return [serialize_todo(todo, child_counts) for todo in todos_to_serialize]
@@ -0,0 +1,18 @@
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped
+
+from ..extensions.db import db
+
+
+class TodoClosure(db.Model):
+    # One row for every (ancestor, descendant) pair in the todo tree, including each todo paired with itself at
+    # depth 0. Lets subtree and ancestor questions be answered with a single indexed lookup instead of recursion
+    ancestor_id: Mapped[int] = db.mapped_column(ForeignKey('todo.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id: Mapped[int] = db.mapped_column(ForeignKey('todo.id', ondelete='CASCADE'), primary_key=True,
+                                                  index=True)
+    depth: Mapped[int] = db.mapped_column(db.Integer)
+
+    def __init__(self, ancestor_id, descendant_id, depth):
+        self.ancestor_id = ancestor_id
+        self.descendant_id = descendant_id
+        self.depth = depth
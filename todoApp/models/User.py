@@ -2,12 +2,14 @@ import re
 import uuid
 from typing import Optional, List
 from sqlalchemy.orm import validates, Mapped
-from werkzeug.security import generate_password_hash, check_password_hash
 
 from todoApp.exceptions.validation_exception import ValidationException
 from todoApp.extensions.db import db
+from todoApp.models.RefreshToken import RefreshToken
 from todoApp.models.Todo import Todo
-from todoApp.utils.serialize_function import serialize_model
+from todoApp.utils.password_hashing import get_password_hasher
+from todoApp.utils.request_timing import timed_function
+from todoApp.utils.serialize_function import make_model_serializer
 from todoApp.utils.validation_utils import *
 
 
@@ -18,7 +20,10 @@ class User(db.Model):
     last_name: Mapped[str] = db.mapped_column(db.String(50))
     username: Mapped[str] = db.mapped_column(db.String(50), unique=True)
     _password: Mapped[str] = db.mapped_column(db.String(128))
+    # Bumped by every route that changes the user's todos; GET responses use it as their ETag
+    _todo_version: Mapped[int] = db.mapped_column("todo_version", db.Integer, default=0, server_default="0")
     todos: Mapped[List["Todo"]] = db.relationship(back_populates="user", cascade="all, delete")
+    refresh_tokens: Mapped[List["RefreshToken"]] = db.relationship(cascade="all, delete")
 
     def __init__(self, first_name, last_name, username, password_plaintext):
         self.public_id = str(uuid.uuid4())
@@ -32,10 +37,19 @@ class User(db.Model):
         validate_data_type("password", password_plaintext, str)
         validate_length("password", password_plaintext, 50)
         check_valid_password_string(password_plaintext)
-        self._password = generate_password_hash(password_plaintext, method='pbkdf2')
+        self._password = get_password_hasher().hash_password(password_plaintext)
 
     def check_password(self, password_plaintext):
-        return check_password_hash(self._password, password_plaintext)
+        return get_password_hasher().check_password(self._password, password_plaintext)
+
+    def upgrade_password_hash(self, password_plaintext):
+        # Re-hashes an already checked password if it was hashed with different parameters from the current config.
+        # Skips the validation in set_password, which the password may predate
+        password_hasher = get_password_hasher()
+        if not password_hasher.needs_rehash(self._password):
+            return False
+        self._password = password_hasher.hash_password(password_plaintext)
+        return True
 
     @validates("first_name", "last_name", "username")
     def validate_all(self, key, value):
@@ -46,7 +60,11 @@ class User(db.Model):
         return value
 
 
+serialize_user_columns = make_model_serializer(User)
+
+
+@timed_function("serialize")
 def serialize_user(user_to_serialize):
-    return serialize_model(user_to_serialize, User)
+    return serialize_user_columns(user_to_serialize)
 
 
@@ -0,0 +1,86 @@
+from todoApp.exceptions.validation_exception import ValidationException
+from todoApp.extensions.db import db
+from todoApp.models.Todo import Todo
+from todoApp.utils.closure_table import closure_table_enabled, insert_todo_closure_rows
+from todoApp.utils.validation_utils import MAX_DATABASE_ID, is_database_id
+
+
+def validate_todo_batch(todo_data_list, max_batch_size):
+    if not isinstance(todo_data_list, list) or not todo_data_list:
+        raise ValidationException("Todos must be sent as a non-empty list")
+    if len(todo_data_list) > max_batch_size:
+        raise ValidationException(f"A batch can contain at most {max_batch_size} todos")
+    temp_ids = set()
+    for todo_data in todo_data_list:
+        if not isinstance(todo_data, dict):
+            raise ValidationException("Each todo in the batch must be an object")
+        temp_id = todo_data.get("temp_id")
+        if not is_temp_id(temp_id):
+            raise ValidationException("Every todo in the batch needs a temp_id")
+        # temp_ids are compared as strings, as they are the keys of a JSON object in the response, so 1 and "1"
+        # are the same temp_id
+        if str(temp_id) in temp_ids:
+            raise ValidationException("Todo temp_ids must be unique")
+        temp_ids.add(str(temp_id))
+        parent_id, parent_temp_id = todo_data.get("parent_id"), todo_data.get("parent_temp_id")
+        if parent_id is not None and (not isinstance(parent_id, int) or isinstance(parent_id, bool)):
+            raise ValidationException("Parent ID must be an integer")
+        if parent_id is not None and not is_database_id(parent_id):
+            raise ValidationException(f"Parent ID must be between 1 and {MAX_DATABASE_ID}")
+        if parent_temp_id is not None and not is_temp_id(parent_temp_id):
+            raise ValidationException("Parent temp_id must be a string or an integer")
+        if parent_id is not None and parent_temp_id is not None:
+            raise ValidationException("A todo cannot have both a parent_id and a parent_temp_id")
+    for todo_data in todo_data_list:
+        parent_temp_id = todo_data.get("parent_temp_id")
+        if parent_temp_id is not None and str(parent_temp_id) not in temp_ids:
+            raise ValidationException(f"Parent temp_id {parent_temp_id} does not match any todo in the batch")
+
+
+def is_temp_id(value):
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+
+def order_todo_batch(todo_data_list):
+    # Splits an already validated batch into levels: the first holds todos whose parent already exists (or that
+    # have none), each later one the todos whose parents are in the level before. Inserting level by level means
+    # every parent has its real id before its children need it
+    children_by_parent_temp_id = {}
+    levels = [[]]
+    for todo_data in todo_data_list:
+        parent_temp_id = todo_data.get("parent_temp_id")
+        if parent_temp_id is None:
+            levels[0].append(todo_data)
+        else:
+            children_by_parent_temp_id.setdefault(str(parent_temp_id), []).append(todo_data)
+    placed = len(levels[0])
+    while True:
+        next_level = [child for todo_data in levels[-1]
+                      for child in children_by_parent_temp_id.get(str(todo_data["temp_id"]), [])]
+        if not next_level:
+            break
+        levels.append(next_level)
+        placed += len(next_level)
+    # anything never reached hangs off a loop of parent_temp_ids
+    if placed != len(todo_data_list):
+        raise ValidationException("Cannot create circular parent-child relationship")
+    return levels
+
+
+def insert_todo_level(level_todos):
+    # Inserts todos that don't depend on each other with one multi-row INSERT ... RETURNING, and returns the
+    # inserted todos in the same order. The ORM would otherwise insert self-referencing todos one row at a time.
+    # Asking SQLAlchemy to keep parameter order makes it go row by row on backends without a sentinel column,
+    # so the returned todos are put back in order by id instead, which one statement hands out in VALUES order.
+    # Backends without RETURNING for multi-row inserts fall back to an ordinary flush
+    if not db.engine.dialect.insert_executemany_returning:
+        db.session.add_all(level_todos)
+        db.session.flush()
+        return level_todos
+    rows = [{"title": todo.title, "description": todo.description, "checked": todo.checked, "user_id": todo.user_id,
+             "parent_id": todo.parent_id} for todo in level_todos]
+    inserted_todos = sorted(db.session.scalars(db.insert(Todo).returning(Todo), rows).all(), key=lambda todo: todo.id)
+    # bulk inserts skip the mapper events that keep the closure table up to date
+    if closure_table_enabled():
+        insert_todo_closure_rows([todo.id for todo in inserted_todos])
+    return inserted_todos
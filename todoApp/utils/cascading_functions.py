@@ -1,3 +1,14 @@
+from collections import defaultdict
+
+from sqlalchemy import literal
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ..extensions.db import db, foreign_keys_checked_per_row, target_table_subquery
+from ..models.Todo import Todo
+from ..models.TodoClosure import TodoClosure
+from .closure_table import closure_table_enabled
+
+
 # def search_todo_tree(todo, target_todo):
 #     if todo == target_todo:
 #         return True
@@ -7,6 +18,149 @@
 #                 return True
 #     return False
 
+def todo_subtree_ids(todo_id, user_id, max_depth=None):
+    # Recursive CTE of the ids of a todo and all of its descendants, scoped to the owning user, along with how
+    # many levels below the todo each one is. max_depth stops the recursion that many levels down
+    subtree_ids = (db.select(Todo.id, literal(0).label("depth"))
+                   .filter_by(user_id=user_id, id=todo_id)
+                   .cte(name="subtree_ids", recursive=True))
+    next_level = (db.select(Todo.id, subtree_ids.c.depth + 1)
+                  .where(Todo.parent_id == subtree_ids.c.id, Todo.user_id == user_id))
+    if max_depth is not None:
+        next_level = next_level.where(subtree_ids.c.depth < max_depth)
+    return subtree_ids.union(next_level)
+
+
+def todo_forest_ids(todo_ids, user_id):
+    # Like todo_subtree_ids but starting from several todos at once. UNION drops the duplicates when one of the
+    # todos is underneath another
+    forest_ids = (db.select(Todo.id)
+                  .where(Todo.user_id == user_id, Todo.id.in_(todo_ids))
+                  .cte(name="forest_ids", recursive=True))
+    return forest_ids.union(
+        db.select(Todo.id).where(Todo.parent_id == forest_ids.c.id, Todo.user_id == user_id)
+    )
+
+
+def todo_ancestor_ids(todo_id, user_id):
+    # Recursive CTE walking up from a todo through its parent_ids; includes the todo itself
+    ancestor_ids = (db.select(Todo.id, Todo.parent_id)
+                    .filter_by(user_id=user_id, id=todo_id)
+                    .cte(name="ancestor_ids", recursive=True))
+    return ancestor_ids.union(
+        db.select(Todo.id, Todo.parent_id).where(Todo.id == ancestor_ids.c.parent_id, Todo.user_id == user_id)
+    )
+
+
+def is_in_todo_subtree(todo_id, root_id, user_id):
+    # True if todo_id is root_id or one of its descendants. Only walks the ancestor chain of todo_id,
+    # so it costs O(depth) primary key lookups rather than a visit to every node under root_id
+    ancestor_ids = todo_ancestor_ids(todo_id, user_id)
+    return db.session.scalar(
+        db.select(db.exists().where(ancestor_ids.c.id == root_id))
+    )
+
+
+def load_todo_subtree(todo, max_depth=None):
+    # Fetches every descendant of todo (down to max_depth levels, if given) in one WITH RECURSIVE query and fills
+    # in the .children lists in memory, so walking the tree afterwards doesn't fire a lazy SELECT for each level.
+    # Todos at the max_depth cut-off keep their lazy .children
+    subtree_ids = todo_subtree_ids(todo.id, todo.user_id, max_depth)
+    rows = db.session.execute(
+        db.select(Todo, subtree_ids.c.depth).join(subtree_ids, Todo.id == subtree_ids.c.id)
+        .where(Todo.id != todo.id).order_by(Todo.id)
+    ).all()
+
+    children_by_parent_id = defaultdict(list)
+    for descendant, depth in rows:
+        children_by_parent_id[descendant.parent_id].append(descendant)
+    # set_committed_value marks the collection as loaded without flagging it as a change to flush
+    for node, depth in [(todo, 0), *rows]:
+        if max_depth is None or depth < max_depth:
+            set_committed_value(node, "children", children_by_parent_id[node.id])
+    return todo
+
+
+def check_todo_subtree(todo):
+    # Checks todo and every descendant with a single UPDATE instead of loading each row into the session.
+    # Objects already in the session, todo included, are updated in place from the ids the UPDATE returns
+    subtree_ids = todo_subtree_ids(todo.id, todo.user_id)
+    db.session.execute(
+        db.update(Todo)
+        .where(Todo.user_id == todo.user_id, Todo.id.in_(target_table_subquery(db.select(subtree_ids.c.id))))
+        .values(checked=True)
+        .execution_options(synchronize_session="fetch")
+    )
+
+
+def check_todo_forest(todo_ids, user_id):
+    # Bulk version of check_todo_subtree: checks every todo in todo_ids and everything underneath them
+    forest_ids = todo_forest_ids(todo_ids, user_id)
+    db.session.execute(
+        db.update(Todo)
+        .where(Todo.user_id == user_id, Todo.id.in_(target_table_subquery(db.select(forest_ids.c.id))))
+        .values(checked=True)
+        .execution_options(synchronize_session="fetch")
+    )
+
+
+def uncheck_todos(todo_ids, user_id):
+    # Unchecks the todos and their direct parents in one UPDATE, the same rule check_todo applies to a single
+    # todo. Like check_todo_subtree, it updates objects already in the session as it goes
+    parent_ids = db.select(Todo.parent_id).where(Todo.user_id == user_id, Todo.id.in_(todo_ids),
+                                                 Todo.parent_id.is_not(None))
+    db.session.execute(
+        db.update(Todo)
+        .where(Todo.user_id == user_id,
+               db.or_(Todo.id.in_(todo_ids), Todo.id.in_(target_table_subquery(parent_ids))))
+        .values(checked=False)
+        .execution_options(synchronize_session="fetch")
+    )
+
+
+def todo_forest_levels(todo_ids, user_id):
+    # The ids of the todos and all of their descendants, one list per level of the trees, deepest level first
+    forest_ids = todo_forest_ids(todo_ids, user_id)
+    rows = db.session.execute(db.select(Todo.id, Todo.parent_id).join(forest_ids, Todo.id == forest_ids.c.id)).all()
+    forest_id_set = {todo_id for todo_id, parent_id in rows}
+    child_ids_by_parent_id = defaultdict(list)
+    for todo_id, parent_id in rows:
+        child_ids_by_parent_id[parent_id].append(todo_id)
+    levels = []
+    level = [todo_id for todo_id, parent_id in rows if parent_id not in forest_id_set]
+    while level:
+        levels.append(level)
+        level = [child_id for todo_id in level for child_id in child_ids_by_parent_id[todo_id]]
+    return levels[::-1]
+
+
+def delete_todo_forest(todo_ids, user_id):
+    # Deletes the todos and all of their descendants with set-based DELETEs rather than loading every row for
+    # the ORM cascade. That skips the before_delete mapper event, so closure rows go first, while the subtree
+    # can still be found through parent_id; any row linking to a deleted todo has it as its descendant.
+    # Where foreign keys are checked row by row, the forest is fetched first and deleted a level at a time from
+    # the bottom up, so no todo goes while its children still point to it. Everywhere else it's one DELETE.
+    # Deleted todos that are in the session are taken out of it, as they would be by an ORM delete
+    if foreign_keys_checked_per_row():
+        levels = todo_forest_levels(todo_ids, user_id)
+        forest_ids = [todo_id for level in levels for todo_id in level]
+    else:
+        forest_ids = target_table_subquery(db.select(todo_forest_ids(todo_ids, user_id).c.id))
+        levels = [forest_ids]
+    if closure_table_enabled():
+        db.session.execute(
+            db.delete(TodoClosure)
+            .where(TodoClosure.descendant_id.in_(forest_ids))
+            .execution_options(synchronize_session=False)
+        )
+    for level in levels:
+        db.session.execute(
+            db.delete(Todo)
+            .where(Todo.user_id == user_id, Todo.id.in_(level))
+            .execution_options(synchronize_session="fetch")
+        )
+
+
 def apply_todo_tree(todo, function, return_result=False):
     function(todo)
     if return_result and function(todo):
@@ -21,11 +175,3 @@ def apply_todo_tree(todo, function, return_result=False):
 
 def make_todo_checked(todo):
     todo.checked = True
-
-
-def make_todo_matcher(target_todo):
-    def match_todo(todo):
-        if target_todo == todo:
-            return True
-    return match_todo
-
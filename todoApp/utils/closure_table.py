@@ -0,0 +1,131 @@
+import click
+from flask import current_app
+from sqlalchemy import event, inspect, literal
+from sqlalchemy.orm import aliased
+
+from ..extensions.db import db, target_table_subquery
+from ..models.Todo import Todo
+from ..models.TodoClosure import TodoClosure
+
+# The closure table is kept up to date from mapper events, so anything that goes through the ORM (add_todo,
+# toggle_parent, delete_todo and its cascade to children) maintains it without the routes having to know.
+# Bulk statements that bypass the ORM need to maintain it themselves, or be followed by a backfill.
+
+
+def closure_table_enabled():
+    return current_app.config['TODO_CLOSURE_TABLE']
+
+
+@event.listens_for(Todo, "after_insert")
+def insert_todo_closure(mapper, connection, todo):
+    if not closure_table_enabled():
+        return
+    connection.execute(db.insert(TodoClosure).values(ancestor_id=todo.id, descendant_id=todo.id, depth=0))
+    if todo.parent_id is not None:
+        # every ancestor of the parent is also an ancestor of the new todo, one level further away
+        connection.execute(db.insert(TodoClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            db.select(TodoClosure.ancestor_id, literal(todo.id), TodoClosure.depth + 1)
+            .where(TodoClosure.descendant_id == todo.parent_id)
+        ))
+
+
+@event.listens_for(Todo, "after_update")
+def move_todo_closure(mapper, connection, todo):
+    if not closure_table_enabled() or not inspect(todo).attrs.parent_id.history.has_changes():
+        return
+    subtree_ids = db.select(TodoClosure.descendant_id).where(TodoClosure.ancestor_id == todo.id)
+    old_ancestor_ids = db.select(TodoClosure.ancestor_id).where(TodoClosure.descendant_id == todo.id,
+                                                                TodoClosure.ancestor_id != todo.id)
+    # detach the subtree from everything above it; the links inside the subtree stay as they are
+    connection.execute(db.delete(TodoClosure).where(
+        TodoClosure.descendant_id.in_(target_table_subquery(subtree_ids, connection)),
+        TodoClosure.ancestor_id.in_(target_table_subquery(old_ancestor_ids, connection))
+    ))
+    if todo.parent_id is not None:
+        # then link every ancestor of the new parent to every node in the subtree
+        supertree = aliased(TodoClosure)
+        subtree = aliased(TodoClosure)
+        connection.execute(db.insert(TodoClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            db.select(supertree.ancestor_id, subtree.descendant_id, supertree.depth + subtree.depth + 1)
+            .join(subtree, db.true())
+            .where(supertree.descendant_id == todo.parent_id, subtree.ancestor_id == todo.id)
+        ))
+
+
+@event.listens_for(Todo, "before_delete")
+def delete_todo_closure(mapper, connection, todo):
+    if not closure_table_enabled():
+        return
+    connection.execute(db.delete(TodoClosure).where(
+        db.or_(TodoClosure.ancestor_id == todo.id, TodoClosure.descendant_id == todo.id)
+    ))
+
+
+def insert_todo_closure_rows(todo_ids):
+    # Set-based version of insert_todo_closure for todos inserted in bulk. Their parents must already have
+    # closure rows, so todos have to be passed in one level of the tree at a time
+    db.session.execute(db.insert(TodoClosure).from_select(
+        ["ancestor_id", "descendant_id", "depth"],
+        db.select(Todo.id, Todo.id, literal(0)).where(Todo.id.in_(todo_ids))
+    ))
+    db.session.execute(db.insert(TodoClosure).from_select(
+        ["ancestor_id", "descendant_id", "depth"],
+        db.select(TodoClosure.ancestor_id, Todo.id, TodoClosure.depth + 1)
+        .join(TodoClosure, TodoClosure.descendant_id == Todo.parent_id)
+        .where(Todo.id.in_(todo_ids))
+    ))
+
+
+def backfill_todo_closure():
+    # Rebuilds the whole closure table from parent_id, one INSERT ... SELECT per level of the deepest tree
+    db.session.execute(db.delete(TodoClosure))
+    db.session.execute(db.insert(TodoClosure).from_select(
+        ["ancestor_id", "descendant_id", "depth"],
+        db.select(Todo.id, Todo.id, literal(0))
+    ))
+    depth = 0
+    while True:
+        result = db.session.execute(db.insert(TodoClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            db.select(TodoClosure.ancestor_id, Todo.id, literal(depth + 1))
+            .join(Todo, Todo.parent_id == TodoClosure.descendant_id)
+            .where(TodoClosure.depth == depth)
+        ))
+        if result.rowcount == 0:
+            break
+        depth += 1
+    db.session.commit()
+    return depth
+
+
+@click.command('backfill-todo-closure')
+def backfill_todo_closure_command():
+    """Rebuild the todo closure table from the existing parent_id data."""
+    max_depth = backfill_todo_closure()
+    click.echo(f"Todo closure table rebuilt, deepest todo is {max_depth} levels down.")
+
+
+def closure_descendant_ids(todo_id):
+    return db.session.scalars(db.select(TodoClosure.descendant_id)
+                              .where(TodoClosure.ancestor_id == todo_id, TodoClosure.depth > 0)
+                              .order_by(TodoClosure.descendant_id)).all()
+
+
+def closure_ancestor_ids(todo_id):
+    # nearest ancestor first
+    return db.session.scalars(db.select(TodoClosure.ancestor_id)
+                              .where(TodoClosure.descendant_id == todo_id, TodoClosure.depth > 0)
+                              .order_by(TodoClosure.depth)).all()
+
+
+def closure_todo_depth(todo_id):
+    # top-level todos are at depth 0
+    return db.session.scalar(db.select(db.func.max(TodoClosure.depth)).where(TodoClosure.descendant_id == todo_id))
+
+
+def closure_is_in_subtree(todo_id, root_id):
+    # True if todo_id is root_id or one of its descendants
+    return db.session.scalar(db.select(db.exists().where(TodoClosure.ancestor_id == root_id,
+                                                         TodoClosure.descendant_id == todo_id)))
@@ -0,0 +1,165 @@
+import random
+import time
+import uuid
+
+import click
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions.db import db
+from ..models.Todo import Todo
+from ..models.User import User
+from .closure_table import backfill_todo_closure, closure_table_enabled
+from .password_hashing import get_password_hasher
+
+# Builds synthetic users and todo trees straight into the database for benchmarks and local testing. Everything
+# is inserted with bulk INSERTs, bypassing the routes and the per-row ORM work, so large shapes take seconds.
+# Used by `flask seed` and the route benchmarks. All functions need an app context; finish with
+# commit_generated_data
+
+
+def insert_users(count, username_prefix="user", password_plaintext="Password123"):
+    # Every user gets the same password, hashed once up front rather than once per user. Returns the new users'
+    # ids, in the same order as their usernames, user_0, user_1, .... Ids are handed out as insert_todo_forests
+    # does, since not every database can return them from a multi-row INSERT; nothing else may insert users
+    # while it runs
+    password_hash = get_password_hasher().hash_password(password_plaintext)
+    first_id = first_free_id(User.__table__)
+    user_ids = list(range(first_id, first_id + count))
+    columns = ["id", "public_id", "first_name", "last_name", "username", "_password", "todo_version"]
+    rows = [(user_id, str(uuid.uuid4()), "Test", f"User {index}", f"{username_prefix}_{index}", password_hash, 0)
+            for index, user_id in enumerate(user_ids)]
+    execute_many(User.__table__, columns, rows)
+    advance_id_sequence(User.__table__, first_id, first_id + count)
+    return user_ids
+
+
+def insert_todo_forest(user_id, roots, fan_out=0, depth=1, checked_ratio=0.0, title_prefix="Todo", seed=0):
+    # Inserts `roots` top-level todos, each the root of a tree `depth` levels deep (counting the root) in which
+    # every todo has `fan_out` children. Some shapes:
+    #   wide flat list  roots=1000, depth=1
+    #   deep chain      roots=1, fan_out=1, depth=600
+    #   bushy tree      roots=1, fan_out=4, depth=6
+    # About checked_ratio of the todos are checked. Ids are handed out as in insert_todo_forests, and the rows go
+    # in with one executemany. Returns the ids level by level, so levels[0] are the roots and levels[-1] the
+    # leaves
+    random_checked = random.Random(seed)
+    first_id = next_id = first_free_id(Todo.__table__)
+    rows = []
+    levels = []
+    parent_ids = [None] * roots
+    for level in range(depth):
+        level_ids = []
+        for parent_index, parent_id in enumerate(parent_ids):
+            for child_index in range(1 if level == 0 else fan_out):
+                rows.append((next_id, todo_title(title_prefix, level, parent_index, child_index), None,
+                             random_checked.random() < checked_ratio, user_id, parent_id))
+                level_ids.append(next_id)
+                next_id += 1
+        if not level_ids:
+            break
+        levels.append(level_ids)
+        parent_ids = level_ids
+    # parents come before their children, so the foreign key holds row by row
+    execute_many(Todo.__table__, ["id", "title", "description", "checked", "user_id", "parent_id"], rows)
+    advance_id_sequence(Todo.__table__, first_id, next_id)
+    return levels
+
+
+def insert_todo_forests(user_ids, roots, fan_out=0, depth=1, checked_ratio=0.0, title_prefix="Todo", seed=0,
+                        chunk_size=10000):
+    # The same forest as insert_todo_forest for every user in user_ids, built for seeding millions of todos. Ids
+    # are handed out from the current highest id instead of being read back with RETURNING, so rows go in through
+    # plain executemany, chunk_size at a time; nothing else may insert todos while it runs. Returns how many
+    # todos were inserted
+    random_checked = random.Random(seed)
+    first_id = next_id = first_free_id(Todo.__table__)
+    columns = ["id", "title", "description", "checked", "user_id", "parent_id"]
+    rows = []
+    for user_id in user_ids:
+        parent_ids = [None] * roots
+        for level in range(depth):
+            level_ids = []
+            for parent_index, parent_id in enumerate(parent_ids):
+                for child_index in range(1 if level == 0 else fan_out):
+                    rows.append((next_id, todo_title(title_prefix, level, parent_index, child_index), None,
+                                 random_checked.random() < checked_ratio, user_id, parent_id))
+                    level_ids.append(next_id)
+                    next_id += 1
+            parent_ids = level_ids
+            # parents always come before their children, so any chunk boundary is safe for the foreign key
+            if len(rows) >= chunk_size:
+                execute_many(Todo.__table__, columns, rows)
+                rows = []
+    if rows:
+        execute_many(Todo.__table__, columns, rows)
+    advance_id_sequence(Todo.__table__, first_id, next_id)
+    return next_id - first_id
+
+
+def first_free_id(table):
+    return (db.session.scalar(db.select(db.func.max(table.c.id))) or 0) + 1
+
+
+def advance_id_sequence(table, first_id, next_id):
+    # explicit ids don't advance a PostgreSQL sequence, so move it past them for inserts made later. The table
+    # name is quoted, as "user" is a reserved word there
+    if next_id > first_id and db.engine.dialect.name == "postgresql":
+        db.session.execute(db.text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :last_id)"),
+                           {"table": db.engine.dialect.identifier_preparer.format_table(table),
+                            "last_id": next_id - 1})
+
+
+def execute_many(table, columns, rows):
+    # Runs a core INSERT with executemany on the driver cursor directly. Going through session.execute would
+    # build and type-process a parameter dict per row, which takes longer than the inserts themselves.
+    # rows are tuples of plain values in the order of columns
+    if not rows:
+        return
+    compiled = db.insert(table).compile(dialect=db.engine.dialect, column_keys=columns)
+    if compiled.positional:
+        positions = [columns.index(name) for name in compiled.positiontup]
+        if positions != list(range(len(columns))):
+            rows = [tuple(row[position] for position in positions) for row in rows]
+    else:
+        rows = [dict(zip(columns, row)) for row in rows]
+    db.session.connection().exec_driver_sql(str(compiled), rows)
+
+
+def todo_title(title_prefix, level, parent_index, child_index):
+    # top-level titles have to be unique per user, lower ones just help tell todos apart
+    return f"{title_prefix} {level}.{parent_index}.{child_index}"[:40]
+
+
+def commit_generated_data():
+    # Bulk inserts skip the mapper events that keep the closure table up to date, so it is rebuilt once at the
+    # end rather than after every forest
+    if closure_table_enabled():
+        backfill_todo_closure()
+    db.session.commit()
+
+
+@click.command('seed')
+@click.option('--users', default=10, show_default=True, type=click.IntRange(min=1), help="Users to create.")
+@click.option('--roots', default=10, show_default=True, type=click.IntRange(min=1),
+              help="Top-level todos per user.")
+@click.option('--fan-out', default=3, show_default=True, type=click.IntRange(min=0), help="Children per todo.")
+@click.option('--depth', default=4, show_default=True, type=click.IntRange(min=1),
+              help="Levels in each tree, counting the top-level todo.")
+@click.option('--checked-ratio', default=0.3, show_default=True, type=click.FloatRange(0, 1),
+              help="Fraction of todos that are checked.")
+@click.option('--username-prefix', default="user", show_default=True,
+              help="Users are named <prefix>_0, <prefix>_1, ...")
+@click.option('--password', default="Password123", show_default=True, help="Password for every user.")
+@click.option('--seed', default=0, show_default=True, help="Random seed for which todos are checked.")
+def seed_command(users, roots, fan_out, depth, checked_ratio, username_prefix, password, seed):
+    """Bulk-insert synthetic users, each with the same forest of todos."""
+    started = time.perf_counter()
+    try:
+        user_ids = insert_users(users, username_prefix, password)
+    except IntegrityError:
+        db.session.rollback()
+        raise click.ClickException(f"Usernames starting {username_prefix}_ are already taken, "
+                                   f"choose another --username-prefix")
+    todo_count = insert_todo_forests(user_ids, roots, fan_out, depth, checked_ratio, seed=seed)
+    commit_generated_data()
+    click.echo(f"Created {len(user_ids)} users and {todo_count} todos in {time.perf_counter() - started:.1f}s.")
@@ -0,0 +1,23 @@
+import base64
+import binascii
+import json
+
+from todoApp.exceptions.validation_exception import ValidationException
+from todoApp.utils.validation_utils import is_database_id
+
+
+# Cursors are opaque to clients; they only need to hand back whatever next_cursor they were given
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValidationException("Invalid cursor")
+    if not is_database_id(last_id):
+        raise ValidationException("Invalid cursor")
+    return last_id
@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from .request_timing import timed
+
+
+class PasswordHasher:
+    # Runs pbkdf2 hashing on a bounded pool, so a burst of /signup and /login requests can only ever tie up
+    # `workers` cores between them rather than one per request. hashlib releases the GIL while it hashes, so a
+    # thread pool is enough for that; a process pool also moves the Python overhead off the worker.
+    # With no executor the hash runs inline on the request thread, as it used to.
+    # Pools are created on first use, so nothing is started in a process that is about to be forked
+
+    def __init__(self, iterations, executor_type=None, workers=4):
+        if executor_type not in (None, "thread", "process"):
+            raise ValueError(f"Unknown PASSWORD_HASH_EXECUTOR '{executor_type}'")
+        self.method = f"pbkdf2:sha256:{iterations}"
+        self.executor_type = executor_type
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                executor_class = ThreadPoolExecutor if self.executor_type == "thread" else ProcessPoolExecutor
+                self.executor = executor_class(max_workers=self.workers)
+            return self.executor
+
+    def run(self, function, *args):
+        if self.executor_type is None:
+            return function(*args)
+        return self.get_executor().submit(function, *args).result()
+
+    def hash_password(self, password_plaintext):
+        with timed("hash"):
+            return self.run(generate_password_hash, password_plaintext, self.method)
+
+    def check_password(self, password_hash, password_plaintext):
+        with timed("hash"):
+            return self.run(check_password_hash, password_hash, password_plaintext)
+
+    def needs_rehash(self, password_hash):
+        # werkzeug hashes start with the method they were made with, e.g. pbkdf2:sha256:600000$salt$hash
+        return password_hash.split("$", 1)[0] != self.method
+
+    def reset_after_fork(self):
+        # the pool's threads or processes belong to the parent; a forked child starts a pool of its own
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+def get_password_hasher():
+    return current_app.extensions['password_hasher']
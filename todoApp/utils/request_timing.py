@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+# Opt-in per-request instrumentation, switched on with REQUEST_TIMING. Each request records how many SQL
+# statements it ran and how long they took, plus the time spent decoding and encoding JWTs, hashing passwords
+# and serializing responses. The totals go out in a Server-Timing header, which browser dev tools display, and
+# in one JSON log line per request on the todoApp.request_timing logger at INFO level.
+# Time spent in SQL inside a step is left out of that step, so no time is counted under two names. Streamed
+# responses are measured up to the point the body starts streaming
+
+logger = logging.getLogger("todoApp.request_timing")
+
+TIMED_STEPS = ("jwt", "hash", "serialize")
+
+
+class RequestTiming:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statement_count = 0
+        self.db_time = 0.0
+        self.step_times = dict.fromkeys(TIMED_STEPS, 0.0)
+        self.running_steps = set()
+
+    def milliseconds(self):
+        return {"total": (time.perf_counter() - self.started) * 1000, "db": self.db_time * 1000,
+                **{step: step_time * 1000 for step, step_time in self.step_times.items()}}
+
+
+def get_request_timing():
+    # None outside a request, or when instrumentation is off
+    return g.get("request_timing") if has_app_context() else None
+
+
+@contextmanager
+def timed(step):
+    # Adds the time spent in the with block to one of TIMED_STEPS for the current request. Does nothing when
+    # there's no request being timed, or when the step is already being timed further up the stack
+    request_timing = get_request_timing()
+    if request_timing is None or step in request_timing.running_steps:
+        yield
+        return
+    request_timing.running_steps.add(step)
+    started, db_time_before = time.perf_counter(), request_timing.db_time
+    try:
+        yield
+    finally:
+        request_timing.running_steps.discard(step)
+        request_timing.step_times[step] += (time.perf_counter() - started
+                                            - (request_timing.db_time - db_time_before))
+
+
+def timed_function(step):
+    def decorator(function):
+        @wraps(function)
+        def decorated(*args, **kwargs):
+            with timed(step):
+                return function(*args, **kwargs)
+        return decorated
+    return decorator
+
+
+class TimedJSONProvider:
+    # Mixed into the app's JSON provider so that encoding response bodies counts as serializing
+
+    def dumps(self, obj, **kwargs):
+        with timed("serialize"):
+            return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        with timed("serialize"):
+            return super().response(*args, **kwargs)
+
+
+def server_timing_header(request_timing):
+    timings = request_timing.milliseconds()
+    metrics = [f'db;desc="{request_timing.statement_count} queries";dur={timings.pop("db"):.3f}']
+    metrics += [f"{name};dur={duration:.3f}" for name, duration in timings.items()]
+    return ", ".join(metrics)
+
+
+def init_request_timing(app, engine):
+    if not app.config['REQUEST_TIMING']:
+        return
+    provider_class = type(app.json)
+    app.json = type(f"Timed{provider_class.__name__}", (TimedJSONProvider, provider_class), {})(app)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        if get_request_timing() is not None:
+            conn.info.setdefault("request_timing_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_statement(conn, cursor, statement, parameters, context, executemany):
+        record_statement(conn)
+
+    @event.listens_for(engine, "handle_error")
+    def failed_statement(exception_context):
+        if exception_context.connection is not None:
+            record_statement(exception_context.connection)
+
+    @app.before_request
+    def start_request_timing():
+        g.request_timing = RequestTiming()
+
+    @app.after_request
+    def add_request_timing(response):
+        request_timing = get_request_timing()
+        if request_timing is None:
+            return response
+        response.headers["Server-Timing"] = server_timing_header(request_timing)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "method": request.method, "path": request.path, "endpoint": request.endpoint,
+                "status": response.status_code, "db_statements": request_timing.statement_count,
+                **{f"{name}_ms": round(duration, 3) for name, duration in request_timing.milliseconds().items()},
+            }, sort_keys=True))
+        return response
+
+    # the app context can outlive the request, as it does under the test client, so SQL run afterwards
+    # mustn't be added to a finished request
+    @app.teardown_request
+    def end_request_timing(exception):
+        g.pop("request_timing", None)
+
+
+def record_statement(conn):
+    started = conn.info.get("request_timing_started")
+    if not started:
+        return
+    request_timing = get_request_timing()
+    duration = time.perf_counter() - started.pop()
+    if request_timing is not None:
+        request_timing.statement_count += 1
+        request_timing.db_time += duration
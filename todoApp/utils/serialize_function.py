@@ -1,3 +1,8 @@
+from operator import attrgetter, itemgetter
+
+from sqlalchemy import inspect
+
+
 def serialize_model(obj, model_class):
     if isinstance(obj, model_class):
         data = {}
@@ -14,4 +19,31 @@ def serialize_model(obj, model_class):
                 else:
                     data[key] = value
         return data
-    raise TypeError(f"Object of type '{type(obj).__name__}' is not JSON serializable")
\ No newline at end of file
+    raise TypeError(f"Object of type '{type(obj).__name__}' is not JSON serializable")
+
+
+def make_model_serializer(model_class):
+    # Does the reflection serialize_model does on every call just once per model: the public column attributes
+    # are read off the mapper, and each call then fetches them all with one itemgetter on the instance dict.
+    # Relationships are never included; they need to be handled explicitly within the specific model
+    # serialization functions. The mapper can only be inspected once every model it refers to exists, so the
+    # keys are worked out on the first call
+    keys, get_loaded_values, get_values = None, None, None
+
+    def serialize(obj):
+        nonlocal keys, get_loaded_values, get_values
+        if not isinstance(obj, model_class):
+            raise TypeError(f"Object of type '{type(obj).__name__}' is not JSON serializable")
+        if keys is None:
+            keys = tuple(attribute.key for attribute in inspect(model_class).column_attrs
+                         if not attribute.key.startswith('_'))
+            get_loaded_values, get_values = itemgetter(*keys), attrgetter(*keys)
+        try:
+            values = get_loaded_values(obj.__dict__)
+        except KeyError:
+            # some attributes are expired or were never set, go through the instrumented attributes instead
+            values = get_values(obj)
+        # does not return None or empty values but DOES return False
+        return {key: value for key, value in zip(keys, values) if value is False or value}
+
+    return serialize
@@ -0,0 +1,84 @@
+import os
+import weakref
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from ..extensions.db import db
+from ..models.SchemaVersion import SCHEMA_VERSION, SchemaVersion
+
+SCHEMA_STARTUP_MODES = ("recreate", "create_missing", "none")
+
+
+def get_stored_schema_version():
+    # None when the database has never been set up by create_missing, including when there is no
+    # schema_version table at all
+    try:
+        return db.session.scalar(db.select(SchemaVersion.version).filter_by(id=1))
+    except (OperationalError, ProgrammingError):
+        db.session.rollback()
+        return None
+
+
+def store_schema_version():
+    db.session.merge(SchemaVersion(SCHEMA_VERSION))
+    db.session.commit()
+
+
+def create_missing_schema():
+    # create_all only checks for whole tables, so indexes added to a table that already exists are created here
+    db.create_all()
+    with db.engine.begin() as connection:
+        existing_tables = set(inspect(connection).get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name in existing_tables:
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+
+
+def prepare_schema(schema_startup):
+    # Called by create_app inside an app context.
+    # "recreate" drops and recreates every table, for development and tests only.
+    # "create_missing" reads the stored schema version, which is the only query when the database is
+    # already current. Otherwise it creates whatever tables and indexes are missing, then records the version.
+    # It never drops or alters anything; changes to existing columns still need a migration.
+    # "none" leaves the database alone, for when the schema is managed elsewhere
+    if schema_startup not in SCHEMA_STARTUP_MODES:
+        raise ValueError(f"Unknown SCHEMA_STARTUP '{schema_startup}'")
+    if schema_startup == "recreate":
+        db.drop_all()
+        db.create_all()
+        store_schema_version()
+    elif schema_startup == "create_missing":
+        stored_version = get_stored_schema_version()
+        if stored_version == SCHEMA_VERSION:
+            return
+        if stored_version is not None and stored_version > SCHEMA_VERSION:
+            raise RuntimeError(f"Database schema version {stored_version} is newer than this app's "
+                               f"version {SCHEMA_VERSION}")
+        create_missing_schema()
+        store_schema_version()
+
+
+def make_fork_safe(app):
+    # WSGI servers that preload the app (gunicorn --preload, uwsgi without lazy-apps) create it once and then fork
+    # workers from it. Pooled connections and hashing pools copied into a worker would be shared with the parent,
+    # so each worker drops its copies straight after the fork and opens its own on first use.
+    # Only weak references are kept, so registering with os doesn't keep every app ever created alive
+    if not hasattr(os, "register_at_fork"):
+        return
+    with app.app_context():
+        engine_refs = [weakref.ref(engine) for engine in db.engines.values()]
+    password_hasher_ref = weakref.ref(app.extensions['password_hasher'])
+
+    def reset_after_fork():
+        for engine_ref in engine_refs:
+            engine = engine_ref()
+            if engine is not None:
+                # close=False leaves the parent's connections open for the parent to carry on using
+                engine.dispose(close=False)
+        password_hasher = password_hasher_ref()
+        if password_hasher is not None:
+            password_hasher.reset_after_fork()
+
+    os.register_at_fork(after_in_child=reset_after_fork)
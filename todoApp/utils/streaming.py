@@ -0,0 +1,68 @@
+from flask import current_app
+
+
+def stream_json_array(items):
+    # Encodes one item at a time, so only the item being written has to be held in memory rather than the
+    # whole list and its JSON string. Uses the app's JSON provider with the same compact separators as jsonify,
+    # so the output matches it
+    yield "["
+    for index, item in enumerate(items):
+        if index:
+            yield ","
+        yield current_app.json.dumps(item, separators=(",", ":"))
+    yield "]"
+
+
+# Subtrees up to this many levels tall are handed to the JSON provider whole. orjson can nest 254 containers and
+# each level of a tree takes two, a dict and its children list
+ENCODE_WHOLE_HEIGHT = 100
+
+
+def encode_json_tree(tree, children_key="children"):
+    # Encodes nested dicts, each holding a list of more of them under children_key, without recursing.
+    # json.dumps and orjson both recurse once per level of nesting and fail a few hundred levels down, so a long
+    # chain of todos could not otherwise be sent at all. Subtrees short enough for the provider go to it in one
+    # piece; the dicts above them are written one at a time, their other values split around children_key so the
+    # keys come out in the same order. Either way the output matches jsonify
+    provider = current_app.json
+    separators = (",", ":")
+    heights = subtree_heights(tree, children_key)
+    parts = []
+    # holds dicts still to encode, and strings to write out as they are
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        if children_key not in node or heights[id(node)] <= ENCODE_WHOLE_HEIGHT:
+            parts.append(provider.dumps(node, separators=separators))
+            continue
+        keys = sorted(node) if provider.sort_keys else list(node)
+        children_position = keys.index(children_key)
+        before = provider.dumps({key: node[key] for key in keys[:children_position]}, separators=separators)
+        after = provider.dumps({key: node[key] for key in keys[children_position + 1:]}, separators=separators)
+        parts.append(before[:-1] + ("," if len(before) > 2 else "") + f'"{children_key}":[')
+        stack.append("]" + ("," + after[1:] if len(after) > 2 else "}"))
+        children = node[children_key]
+        for index in range(len(children) - 1, -1, -1):
+            stack.append(children[index])
+            if index:
+                stack.append(",")
+    return "".join(parts)
+
+
+def subtree_heights(tree, children_key):
+    # Levels in the subtree under each dict, itself included, keyed by id() of the dict; worked out children
+    # first with an explicit stack
+    heights = {}
+    stack = [(tree, False)]
+    while stack:
+        node, children_done = stack.pop()
+        children = node.get(children_key) or ()
+        if children_done:
+            heights[id(node)] = 1 + max((heights[id(child)] for child in children), default=0)
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+    return heights
@@ -0,0 +1,56 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from todoApp.exceptions.authentication_exception import AuthenticationException
+
+
+class TokenCache:
+    # Bounded LRU of tokens that have already passed jwt.decode, so a client reusing the same bearer token doesn't
+    # pay for signature verification on every request. Entries are keyed by a digest of the token rather than the
+    # token itself and keep the token's own exp, so a cached token still expires on time.
+    # One instance per app (app.extensions['token_cache']), so tokens verified with one SECRET_KEY are never
+    # trusted by an app with another
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        # Returns the cached sub, or None if the token hasn't been verified yet
+        key = self.make_key(token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            sub, exp = entry
+            if exp <= time.time():
+                del self.entries[key]
+                self.hits += 1
+                raise AuthenticationException("Token has expired")
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return sub
+
+    def put(self, token, sub, exp):
+        if self.max_size <= 0:
+            return
+        key = self.make_key(token)
+        with self.lock:
+            self.entries[key] = (sub, exp)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "max_size": self.max_size}
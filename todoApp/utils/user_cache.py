@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event, inspect
+
+from ..extensions.db import db
+from ..models.User import User
+
+
+class CurrentUser:
+    # Lightweight stand-in for the authenticated User that require_token hands to routes. Holds the columns
+    # routes need all the time; call load() for the full User when a route needs more than that
+    __slots__ = ("id", "public_id", "username", "first_name", "last_name")
+
+    def __init__(self, id, public_id, username, first_name, last_name):
+        self.id = id
+        self.public_id = public_id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+
+    def load(self):
+        return db.session.get(User, self.id)
+
+
+def find_current_user(public_id):
+    row = db.session.execute(
+        db.select(User.id, User.public_id, User.username, User.first_name, User.last_name).filter_by(public_id=public_id)
+    ).first()
+    return CurrentUser(*row) if row else None
+
+
+class UserCache:
+    # public_id -> CurrentUser, so require_token doesn't have to look the user up on every request. Entries live
+    # for ttl seconds, and are dropped straight away when the User is changed or deleted through the ORM.
+    # Changes made outside this process are only picked up once the entry times out
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, public_id):
+        with self.lock:
+            entry = self.entries.get(public_id)
+            if entry is None or entry[1] <= time.monotonic():
+                self.entries.pop(public_id, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(public_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, current_user):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[current_user.public_id] = (current_user, time.monotonic() + self.ttl)
+            self.entries.move_to_end(current_user.public_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, public_id):
+        with self.lock:
+            self.entries.pop(public_id, None)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "max_size": self.max_size}
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_cached_user(mapper, connection, user):
+    user_cache = current_app.extensions.get('user_cache')
+    if user_cache is None:
+        return
+    # covers the public_id itself being changed as well
+    public_id_history = inspect(user).attrs.public_id.history
+    for public_id in [user.public_id, *public_id_history.deleted]:
+        user_cache.invalidate(public_id)
@@ -3,6 +3,15 @@ import re
 from todoApp.exceptions.validation_exception import ValidationException
 
 
+# Ids are 64-bit integers in the database; anything outside this range can't even be bound as a parameter
+MAX_DATABASE_ID = 2**63 - 1
+
+
+def is_database_id(value):
+    # bool is a subclass of int, but true isn't an id
+    return isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= MAX_DATABASE_ID
+
+
 def get_nice_name(prop_name):
     return prop_name.replace('_', ' ')
 
@@ -14,6 +23,28 @@ def validate_todo_route_param(param):
         raise ValidationException('ID route parameter must be an integer')
 
 
+def validate_page_limit(limit, max_limit):
+    only_digits = re.compile(r'^\d+$')
+    if not only_digits.match(limit) or not 0 < int(limit) <= max_limit:
+        raise ValidationException(f'Limit must be an integer between 1 and {max_limit}')
+
+
+def validate_tree_depth(depth, max_depth):
+    only_digits = re.compile(r'^\d+$')
+    if not only_digits.match(depth) or int(depth) > max_depth:
+        raise ValidationException(f'Depth must be an integer between 0 and {max_depth}')
+
+
+def validate_todo_id_list(todo_ids, max_size):
+    if not isinstance(todo_ids, list) or not todo_ids or \
+            not all(isinstance(todo_id, int) and not isinstance(todo_id, bool) for todo_id in todo_ids):
+        raise ValidationException('Todo IDs must be sent as a non-empty list of integers')
+    if not all(is_database_id(todo_id) for todo_id in todo_ids):
+        raise ValidationException(f'Todo IDs must be between 1 and {MAX_DATABASE_ID}')
+    if len(todo_ids) > max_size:
+        raise ValidationException(f'A request can contain at most {max_size} todo IDs')
+
+
 def validate_presence(field, value):
     if not value:
         raise ValidationException(f'Your user needs a {get_nice_name(field)}')